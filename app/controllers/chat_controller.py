@@ -3,6 +3,7 @@
 import time
 from typing import Any, Dict
 from fastapi import APIRouter, Request
+from app.core.snapshots import pin_snapshot
 from app.schemas.chat import AIRecPlanRequest, AIRecPlanResponse
 from app.services.chat_service import generate_ai_plan
 from llm.base import BaseLLM
@@ -20,7 +21,8 @@ def chat_api(req: AIRecPlanRequest, request: Request):
 
     llm: BaseLLM = request.app.state.llm
     score_model_manager: ModelManager = request.app.state.model_manager
-    config: Dict[str, Any] = request.app.state.config
+    # 请求期间固定一个数据快照版本
+    config: Dict[str, Any] = pin_snapshot(request.app.state.config)
 
     start_time = time.time()
 
@@ -28,6 +30,7 @@ def chat_api(req: AIRecPlanRequest, request: Request):
         f"[CHAT_API_START] user_id={req.user_id} " f"patient_code={req.patient_code} "
     )
 
+    # 同步 handler 在默认线程池执行：其中的 LLM 调用可能阻塞数十秒，不占用 v2 的 CPU 线程池
     result = generate_ai_plan(
         req, llm, model_manager=score_model_manager, config=config
     )
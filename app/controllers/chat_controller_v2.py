@@ -1,11 +1,28 @@
+import asyncio
 import time
 from typing import Any, Dict
 
 from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 
+from app.core.errors.error_codes import ErrorCode
+from app.core.errors.exceptions import BizError
+from app.core.executor import get_cpu_executor
+from app.core.profiling import profile_call
+from app.core.security import is_request_profile_allowed
+from app.core.snapshots import pin_snapshot
 from app.schemas.chat import AIRecPlanRequest
-from app.schemas.chat_v2 import AIRecPlanResponseV2
-from app.services.chat_service import generate_ai_plan_v2
+from app.schemas.chat_v2 import (
+    AIRecPlanBatchRequestV2,
+    AIRecPlanBatchResponseV2,
+    AIRecPlanResponseV2,
+    BatchResponseMetaV2,
+)
+from app.services.chat_service import (
+    generate_ai_plan_v2,
+    generate_ai_plans_v2_chunk,
+    resolve_batch_chunk_size,
+)
 from models.model_factory import ModelManager
 from utils.logger import get_logger
 
@@ -15,9 +32,10 @@ router = APIRouter(prefix="/v2", tags=["chat-v2"])
 
 
 @router.post("/chat", response_model=AIRecPlanResponseV2)
-def chat_api_v2(req: AIRecPlanRequest, request: Request):
+async def chat_api_v2(req: AIRecPlanRequest, request: Request, profile: bool = False):
     score_model_manager: ModelManager = request.app.state.model_manager
-    config: Dict[str, Any] = request.app.state.config
+    # 请求期间固定一个数据快照版本
+    config: Dict[str, Any] = pin_snapshot(request.app.state.config)
 
     start_time = time.time()
 
@@ -25,10 +43,131 @@ def chat_api_v2(req: AIRecPlanRequest, request: Request):
         f"[CHAT_API_V2_START] user_id={req.user_id} patient_code={req.patient_code}"
     )
 
-    result = generate_ai_plan_v2(req, model_manager=score_model_manager, config=config)
+    # ?profile=1（仅白名单客户端）：附带本次方案生成的 cProfile 摘要
+    if profile:
+        if is_request_profile_allowed(request, config):
+            result, profile_summary = await get_cpu_executor(config).run(
+                "chat_v2_profile",
+                profile_call,
+                generate_ai_plan_v2,
+                req,
+                model_manager=score_model_manager,
+                config=config,
+                top_n=int(config.get("profiling", {}).get("request_profile_top_n", 30)),
+            )
+            logger.info(f"[CHAT_API_V2_PROFILED] user_id={req.user_id}")
+            return JSONResponse(
+                {**result.model_dump(mode="json"), "profile": profile_summary}
+            )
+
+        logger.warning(
+            f"[CHAT_API_V2_PROFILE_DENIED] client={request.client.host if request.client else None}"
+        )
+
+    # CPU 阶段放到有界线程池，排队过深时直接返回 503
+    result = await get_cpu_executor(config).run(
+        "chat_v2",
+        generate_ai_plan_v2,
+        req,
+        model_manager=score_model_manager,
+        config=config,
+    )
 
     duration = round(time.time() - start_time, 3)
 
     logger.info(f"[CHAT_API_V2_SUCCESS] user_id={req.user_id} duration={duration}s")
 
     return result
+
+
+# 首批之后线程池已满时，批量请求等待后重试（响应已开始，不能再返回 503）
+BATCH_BUSY_RETRY_SECONDS = 0.05
+
+
+async def _run_batch_chunks(items, model_manager, config, first_result):
+    """
+    其余各批依次提交到 CPU 线程池：同一时间只占一个名额，批与批之间让出给单用户请求
+    """
+
+    executor = get_cpu_executor(config)
+    chunk_size = resolve_batch_chunk_size(config)
+
+    yield first_result
+    for chunk_start in range(chunk_size, len(items), chunk_size):
+        while True:
+            try:
+                yield await executor.run(
+                    "chat_v2_batch",
+                    generate_ai_plans_v2_chunk,
+                    items[chunk_start:chunk_start + chunk_size],
+                    chunk_start,
+                    model_manager,
+                    config,
+                )
+                break
+            except BizError as e:
+                if e.code != ErrorCode.SERVER_BUSY:
+                    raise
+                await asyncio.sleep(BATCH_BUSY_RETRY_SECONDS)
+
+
+@router.post("/chat/batch", response_model=AIRecPlanBatchResponseV2)
+async def chat_batch_api_v2(req: AIRecPlanBatchRequestV2, request: Request):
+    score_model_manager: ModelManager = request.app.state.model_manager
+    # 请求期间固定一个数据快照版本
+    config: Dict[str, Any] = pin_snapshot(request.app.state.config)
+
+    max_items = int(config.get("chat_batch", {}).get("max_items", 2000))
+    if len(req.items) > max_items:
+        raise BizError(
+            ErrorCode.BATCH_TOO_LARGE,
+            size=len(req.items),
+            max_items=max_items,
+        )
+
+    start_time = time.time()
+
+    logger.info(
+        f"[CHAT_BATCH_API_V2_START] size={len(req.items)} stream={req.stream}"
+    )
+
+    # 首批在返回响应前执行：线程池排队过深时与单用户接口一样直接返回 503
+    chunk_size = resolve_batch_chunk_size(config)
+    first_result = await get_cpu_executor(config).run(
+        "chat_v2_batch",
+        generate_ai_plans_v2_chunk,
+        req.items[:chunk_size],
+        0,
+        score_model_manager,
+        config,
+    )
+    chunks = _run_batch_chunks(req.items, score_model_manager, config, first_result)
+
+    if req.stream:
+
+        async def ndjson():
+            async for chunk_results in chunks:
+                for result in chunk_results:
+                    yield result.model_dump_json() + "\n"
+
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+    results = [result async for chunk_results in chunks for result in chunk_results]
+    succeeded = sum(result.success for result in results)
+
+    duration = round(time.time() - start_time, 3)
+
+    logger.info(
+        f"[CHAT_BATCH_API_V2_SUCCESS] size={len(results)} succeeded={succeeded} "
+        f"duration={duration}s"
+    )
+
+    return AIRecPlanBatchResponseV2(
+        meta=BatchResponseMetaV2(
+            version="v2",
+            total=len(results),
+            succeeded=succeeded,
+            failed=len(results) - succeeded,
+        ),
+        results=results,
+    )
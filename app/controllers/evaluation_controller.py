@@ -1,23 +1,23 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 
+from app.core.registry import ResourceRegistry
 from app.services.evaluation_service import EvaluationService
 from app.services.score_prediction_evaluation_service import (
     ScorePredictionEvaluationService,
 )
-from configs.loader import load_config
 
 router = APIRouter()
 
 
 @router.post("/recommendation/evaluate")
-def evaluate():
-    service = EvaluationService()
+def evaluate(request: Request):
+    registry: ResourceRegistry = request.app.state.registry
+    service = EvaluationService(registry=registry)
     return service.evaluate_all_users()
 
 
 @router.post("/score-prediction/evaluate")
-def evaluate_score_prediction():
-    service = ScorePredictionEvaluationService(
-        config=load_config(),
-    )
+def evaluate_score_prediction(request: Request):
+    registry: ResourceRegistry = request.app.state.registry
+    service = ScorePredictionEvaluationService(registry=registry)
     return service.evaluate_all_users()
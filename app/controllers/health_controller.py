@@ -28,3 +28,19 @@ def readiness_check(request: Request):
 
     logger.info("Readiness check passed: LLM is ready")
     return {"status": "ready"}
+
+
+@router.get("/health/models")
+def model_stats(request: Request):
+    """
+    分数预测模型运行指标（微批队列深度、批次数等）
+    """
+    model_manager = getattr(request.app.state, "model_manager", None)
+
+    if model_manager is None:
+        return JSONResponse(status_code=503, content={"status": "not_ready"})
+
+    return {
+        "models": sorted(model_manager.models),
+        "micro_batching": model_manager.batching_stats(),
+    }
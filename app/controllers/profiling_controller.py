@@ -0,0 +1,53 @@
+# app/controllers/profiling_controller.py
+
+import asyncio
+import time
+from typing import Any, Dict, Literal
+
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from app.core.profiling import sample_stacks, to_collapsed, to_speedscope
+from app.core.security import verify_admin_token
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+@router.get("/profile")
+async def sampling_profile_api(
+    request: Request,
+    seconds: float = Query(5.0, gt=0),
+    rate_hz: float | None = Query(None, gt=0),
+    format: Literal["collapsed", "speedscope"] = "collapsed",
+):
+    """
+    采样请求处理线程的调用栈 seconds 秒（需 X-Admin-Token）
+
+    format=collapsed 返回 collapsed stack 文本，format=speedscope 返回 speedscope JSON
+    """
+
+    config: Dict[str, Any] = request.app.state.config
+    profiling_cfg = config.get("profiling", {})
+
+    verify_admin_token(request, profiling_cfg.get("admin_token"))
+
+    seconds = min(seconds, float(profiling_cfg.get("max_seconds", 30)))
+    rate_hz = min(
+        rate_hz or float(profiling_cfg.get("default_rate_hz", 100)),
+        float(profiling_cfg.get("max_rate_hz", 1000)),
+    )
+
+    logger.info(f"[PROFILER_START] seconds={seconds} rate_hz={rate_hz} format={format}")
+
+    samples = await asyncio.to_thread(sample_stacks, seconds, rate_hz)
+
+    logger.info(f"[PROFILER_DONE] samples={sum(samples.values())}")
+
+    if format == "speedscope":
+        return JSONResponse(
+            to_speedscope(samples, rate_hz, name=f"profile-{time.strftime('%Y%m%dT%H%M%S')}")
+        )
+    return PlainTextResponse(to_collapsed(samples))
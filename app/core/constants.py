@@ -81,6 +81,24 @@ class ExcludedParadigm(str, Enum):
     UFOV_GO_NO_GO = ParadigmType.UFOV_GO_NO_GO.value
 
 
+class TreemapSampler(str, Enum):
+    """
+    L2 树图任务采样实现
+    """
+
+    NUMPY = "numpy"
+    LEGACY = "legacy"
+
+
+class TreemapMode(str, Enum):
+    """
+    L2 树图分布计算方式
+    """
+
+    SAMPLED = "sampled"  # 按权重采样任务后计数
+    EXPECTED = "expected"  # 直接由任务得分计算期望占比（确定性）
+
+
 class Level1Score:
     """
     一级脑能力分数体系
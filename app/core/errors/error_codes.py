@@ -36,6 +36,9 @@ class ErrorCode(str, Enum):
 
     # AI 推荐
     AI_PLAN_GENERATION_FAILED = "AI_PLAN_GENERATION_FAILED"
+    BATCH_TOO_LARGE = "BATCH_TOO_LARGE"
 
     # 通用
+    FORBIDDEN = "FORBIDDEN"
+    SERVER_BUSY = "SERVER_BUSY"
     INTERNAL_ERROR = "INTERNAL_ERROR"
@@ -7,17 +7,37 @@ from fastapi.responses import JSONResponse
 from .exceptions import BizError
 from .error_messages import ERROR_MESSAGES
 from .error_codes import ErrorCode
+from app.core.metrics import BIZ_ERRORS
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
 
+# 非 400 的业务错误码
+ERROR_STATUS_CODES = {
+    ErrorCode.FORBIDDEN: 403,
+    ErrorCode.SERVER_BUSY: 503,
+}
+
+
 async def biz_error_handler(request: Request, exc: BizError):
 
+    status_code = ERROR_STATUS_CODES.get(exc.code, 400)
+    BIZ_ERRORS.inc(code=exc.code.value)
+
+    if exc.code == ErrorCode.SERVER_BUSY:
+        # 过载时不打印堆栈，避免日志放大压力
+        logger.warning(str(exc))
+        return JSONResponse(
+            status_code=status_code,
+            content={"message": exc.message},
+            headers={"Retry-After": "1"},
+        )
+
     logger.exception(str(exc))
 
     return JSONResponse(
-        status_code=400,
+        status_code=status_code,
         content={"message": exc.message},
     )
 
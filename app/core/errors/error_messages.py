@@ -21,5 +21,8 @@ ERROR_MESSAGES = {
     ErrorCode.SCORE_PREDICTION_FAILED: "能力预测失败",
     ErrorCode.LLM_CALL_FAILED: "大模型调用失败",
     ErrorCode.AI_PLAN_GENERATION_FAILED: "AI训练方案生成失败",
+    ErrorCode.BATCH_TOO_LARGE: "批量请求数量超过上限",
+    ErrorCode.FORBIDDEN: "无权访问",
+    ErrorCode.SERVER_BUSY: "服务繁忙，请稍后重试",
     ErrorCode.INTERNAL_ERROR: "系统内部错误",
 }
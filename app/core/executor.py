@@ -0,0 +1,139 @@
+# app/core/executor.py
+"""
+CPU 阶段专用线程池（有界排队）
+
+请求处理中的 pandas / LightGBM 计算放到固定大小的线程池中执行，
+同时在途（执行中 + 排队中）数量超过上限时直接拒绝（SERVER_BUSY → 503），
+避免突发流量下所有请求一起变慢。排队等待与执行耗时分别记录
+"""
+
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from app.core.errors.error_codes import ErrorCode
+from app.core.errors.exceptions import BizError
+from app.core.timing import record_stage
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_MAX_QUEUE = 32
+
+
+class CpuExecutor:
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS, max_queue: int = DEFAULT_MAX_QUEUE):
+        self.max_workers = max(int(max_workers), 1)
+        self.max_queue = max(int(max_queue), 0)
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="cpu-executor"
+        )
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def _release(self, _future) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    async def run(self, label: str, func: Callable, *args: Any, **kwargs: Any) -> Any:
+        """
+        在线程池中执行 func；在途数量已达 max_workers + max_queue 时抛出 SERVER_BUSY
+
+        调用方的 contextvars 会复制到工作线程中
+        """
+
+        with self._lock:
+            if self._in_flight >= self.max_workers + self.max_queue:
+                raise BizError(
+                    ErrorCode.SERVER_BUSY,
+                    label=label,
+                    in_flight=self._in_flight,
+                )
+            self._in_flight += 1
+
+        ctx = contextvars.copy_context()
+        call = functools.partial(func, *args, **kwargs)
+        submitted_at = time.perf_counter()
+        timings: Dict[str, float] = {}
+
+        def _call():
+            started_at = time.perf_counter()
+            timings["queue_wait"] = started_at - submitted_at
+            try:
+                return ctx.run(call)
+            finally:
+                timings["exec"] = time.perf_counter() - started_at
+
+        try:
+            future = self._executor.submit(_call)
+        except Exception:
+            self._release(None)
+            raise
+        # 在 future 结束（含排队中被取消）时释放名额，而不是在协程被取消时
+        future.add_done_callback(self._release)
+
+        try:
+            return await asyncio.wrap_future(future)
+        finally:
+            queue_wait = timings.get("queue_wait", time.perf_counter() - submitted_at)
+            exec_time = timings.get("exec", 0.0)
+            record_stage("cpu_queue", queue_wait)
+            record_stage("cpu_exec", exec_time)
+            logger.info(
+                "[CPU_EXECUTOR] label=%s queue_wait=%.3fs exec=%.3fs in_flight=%s",
+                label,
+                queue_wait,
+                exec_time,
+                self._in_flight,
+            )
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_executor_lock = threading.Lock()
+_executor: Optional[CpuExecutor] = None
+
+
+def get_cpu_executor(config: Dict[str, Any]) -> CpuExecutor:
+    """
+    获取进程级 CPU 线程池，首次调用时按 config.cpu_executor 创建
+    """
+
+    global _executor
+
+    if _executor is not None:
+        return _executor
+
+    with _executor_lock:
+        if _executor is None:
+            executor_cfg = config.get("cpu_executor", {})
+            _executor = CpuExecutor(
+                max_workers=executor_cfg.get("max_workers", DEFAULT_MAX_WORKERS),
+                max_queue=executor_cfg.get("max_queue", DEFAULT_MAX_QUEUE),
+            )
+            logger.info(
+                "[CPU_EXECUTOR_STARTED] max_workers=%s max_queue=%s",
+                _executor.max_workers,
+                _executor.max_queue,
+            )
+        return _executor
+
+
+def shutdown_cpu_executor() -> None:
+    global _executor
+
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown()
+            _executor = None
@@ -0,0 +1,457 @@
+# app/core/metrics.py
+"""
+进程内指标注册表（Prometheus 文本格式导出）
+
+- Counter / Gauge / Histogram 按标签值聚合，每个指标一把锁，热路径只有一次 dict 更新
+- 多个 uvicorn worker（以及独立同步 worker）各自把快照写入
+  metrics.multiprocess_dir/metrics-<pid>.json，/api/metrics 读取全部文件后合并：
+  Counter / Histogram 求和（已退出进程的计数保留），Gauge 按 multiprocess_mode 合并
+- 已退出进程的文件在抓取时合并进 metrics-aggregate.json 并删除（计数跨重启保留）
+- 进程级状态（缓存命中、已加载版本等）通过 collector 在快照前刷新
+"""
+
+import asyncio
+import bisect
+import fcntl
+import json
+import math
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.core.timing import STAGE_BUCKETS, StageHistograms, stage_histograms
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_FLUSH_INTERVAL_SECONDS = 5
+
+# 已退出进程的快照在抓取时合并到该文件
+AGGREGATE_FILE = "metrics-aggregate.json"
+LOCK_FILE = ".metrics.lock"
+
+# Gauge 跨进程合并方式
+GAUGE_MODE_MAX = "max"            # 全部进程（含已退出）取最大值，如最近成功时间
+GAUGE_MODE_LIVE_SUM = "livesum"   # 存活进程求和，如在途请求数
+GAUGE_MODE_LIVE_MAX = "livemax"   # 存活进程取最大值，如已加载版本
+
+
+class _Metric:
+    type = ""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        multiprocess_mode: Optional[str] = None,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.multiprocess_mode = multiprocess_mode
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], Any] = {}
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def dump(self) -> Dict[str, Any]:
+        with self._lock:
+            # 直方图状态是可变 list，导出副本
+            values = [
+                [list(key), list(value) if isinstance(value, list) else value]
+                for key, value in self._values.items()
+            ]
+        return {
+            "type": self.type,
+            "help": self.documentation,
+            "labelnames": list(self.labelnames),
+            "mode": self.multiprocess_mode,
+            "values": values,
+        }
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def __init__(self, *args, multiprocess_mode: str = GAUGE_MODE_LIVE_SUM, **kwargs):
+        super().__init__(*args, multiprocess_mode=multiprocess_mode, **kwargs)
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, *args, buckets=STAGE_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            # [各桶计数..., +Inf 桶计数, sum]
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[index] += 1
+            state[-1] += value
+
+    def dump(self) -> Dict[str, Any]:
+        data = super().dump()
+        data["buckets"] = list(self.buckets)
+        return data
+
+
+class StageHistogramsMetric(Histogram):
+    """
+    以 StageHistograms（请求分阶段耗时）为数据源的直方图，按 stage 标签导出
+    """
+
+    def __init__(self, name: str, documentation: str, histograms: StageHistograms):
+        super().__init__(name, documentation, ("stage",), buckets=histograms.buckets)
+        self._histograms = histograms
+
+    def dump(self) -> Dict[str, Any]:
+        data = super().dump()
+        data["values"] = [
+            [[name], item["counts"] + [item["sum"]]]
+            for name, item in self._histograms.snapshot().items()
+        ]
+        return data
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+        self.multiprocess_dir: Optional[Path] = None
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Duplicated metric: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """
+        注册快照前调用的回调（用于刷新进程级 Gauge）
+        """
+
+        with self._lock:
+            self._collectors.append(collector)
+
+    def clear_collectors(self) -> None:
+        with self._lock:
+            self._collectors.clear()
+
+    def dump(self) -> Dict[str, Any]:
+        for collector in list(self._collectors):
+            try:
+                collector()
+            except Exception:
+                logger.exception("Metrics collector failed")
+
+        return {name: metric.dump() for name, metric in list(self._metrics.items())}
+
+    def flush(self) -> None:
+        """
+        将本进程快照原子写入 multiprocess_dir（未配置时不写）
+        """
+
+        if self.multiprocess_dir is None:
+            return
+
+        path = self.multiprocess_dir / f"metrics-{os.getpid()}.json"
+        _write_snapshot(path, {"pid": os.getpid(), "metrics": self.dump()})
+
+    def collect(self) -> Dict[str, Any]:
+        """
+        合并后的全部指标：多进程模式下合并所有进程文件，否则只有本进程
+        """
+
+        if self.multiprocess_dir is None:
+            return self.dump()
+
+        self.flush()
+
+        # 合并与压缩在目录锁内进行，避免多个 worker 同时抓取时重复计入已退出进程的计数
+        with open(self.multiprocess_dir / LOCK_FILE, "a") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            snapshots = self._compact_dead_snapshots(self._read_snapshots())
+
+        return merge_snapshots(snapshots)
+
+    def _read_snapshots(self) -> List[Tuple[Path, Dict[str, Any]]]:
+        snapshots = []
+        for path in sorted(self.multiprocess_dir.glob("metrics-*.json")):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    snapshots.append((path, json.load(f)))
+            except (OSError, ValueError):
+                # 文件可能正被替换或已被删除
+                continue
+        return snapshots
+
+    def _compact_dead_snapshots(
+        self, snapshots: List[Tuple[Path, Dict[str, Any]]]
+    ) -> List[Dict[str, Any]]:
+        """
+        已退出进程的文件合并进 metrics-aggregate.json 后删除，目录中的文件数不随重启增长
+        """
+
+        live = []
+        dead = []
+        for path, snapshot in snapshots:
+            pid = snapshot.get("pid")
+            if pid is not None and _pid_alive(int(pid)):
+                live.append(snapshot)
+            else:
+                dead.append((path, snapshot))
+
+        aggregate_path = self.multiprocess_dir / AGGREGATE_FILE
+        if not dead:
+            return live
+        if len(dead) == 1 and dead[0][0] == aggregate_path:
+            return live + [dead[0][1]]
+
+        # 合并时已退出进程的非 max Gauge 被丢弃，聚合文件只保留累计值
+        aggregate = {"pid": None, "metrics": merge_snapshots([s for _, s in dead])}
+        _write_snapshot(aggregate_path, aggregate)
+        for path, _ in dead:
+            if path != aggregate_path:
+                path.unlink(missing_ok=True)
+
+        logger.info("[METRICS_COMPACTED] merged_files=%s", len(dead))
+        return live + [aggregate]
+
+    def render(self) -> str:
+        return render_prometheus(self.collect())
+
+
+def _write_snapshot(path: Path, snapshot: Dict[str, Any]) -> None:
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def merge_snapshots(snapshots: List[Dict[str, Any]]) -> Dict[str, Any]:
+    merged: Dict[str, Dict[str, Any]] = {}
+
+    for snapshot in snapshots:
+        pid = snapshot.get("pid")
+        alive = pid is not None and _pid_alive(int(pid))
+
+        for name, data in snapshot.get("metrics", {}).items():
+            target = merged.setdefault(name, {**data, "values": {}})
+            values = target["values"]
+            mode = data.get("mode")
+
+            if data["type"] == "gauge" and mode != GAUGE_MODE_MAX and not alive:
+                continue
+
+            for key, value in data["values"]:
+                key = tuple(key)
+                if key not in values:
+                    values[key] = list(value) if isinstance(value, list) else value
+                elif data["type"] == "histogram":
+                    values[key] = [a + b for a, b in zip(values[key], value)]
+                elif data["type"] == "gauge" and mode in (GAUGE_MODE_MAX, GAUGE_MODE_LIVE_MAX):
+                    values[key] = max(values[key], value)
+                else:
+                    values[key] += value
+
+    for data in merged.values():
+        data["values"] = [[list(key), value] for key, value in data["values"].items()]
+
+    return merged
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def render_prometheus(metrics: Dict[str, Any]) -> str:
+    """
+    按 Prometheus 文本格式（0.0.4）输出
+    """
+
+    lines = []
+    for name in sorted(metrics):
+        data = metrics[name]
+        labelnames = data["labelnames"]
+        lines.append(f"# HELP {name} {data['help']}")
+        lines.append(f"# TYPE {name} {data['type']}")
+
+        for key, value in sorted(data["values"], key=lambda item: item[0]):
+            if data["type"] != "histogram":
+                lines.append(f"{name}{_format_labels(labelnames, key)} {_format_value(value)}")
+                continue
+
+            cumulative = 0
+            for bound, count in zip(list(data["buckets"]) + [math.inf], value[:-1]):
+                cumulative += count
+                le = "+Inf" if math.isinf(bound) else repr(float(bound))
+                lines.append(
+                    f"{name}_bucket{_format_labels(labelnames, key, ('le', le))} {cumulative}"
+                )
+            lines.append(f"{name}_sum{_format_labels(labelnames, key)} {_format_value(value[-1])}")
+            lines.append(f"{name}_count{_format_labels(labelnames, key)} {cumulative}")
+
+    return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+HTTP_REQUESTS = registry.register(
+    Counter("http_requests_total", "HTTP 请求数", ("method", "route", "status"))
+)
+HTTP_REQUEST_DURATION = registry.register(
+    Histogram("http_request_duration_seconds", "HTTP 请求耗时", ("method", "route"))
+)
+BIZ_ERRORS = registry.register(
+    Counter("biz_errors_total", "业务异常数（按错误码）", ("code",))
+)
+PLAN_STAGE_DURATION = registry.register(
+    StageHistogramsMetric("plan_stage_duration_seconds", "方案生成各阶段耗时", stage_histograms)
+)
+MODEL_PREDICT_DURATION = registry.register(
+    Histogram("model_predict_duration_seconds", "分数预测模型 predict 耗时", ("domain",))
+)
+CACHE_LOOKUPS = registry.register(
+    Counter("cache_lookups_total", "缓存查找次数（命中率 = hit / 全部）", ("cache", "result"))
+)
+SYNC_STAGE_DURATION = registry.register(
+    Histogram(
+        "sync_stage_duration_seconds",
+        "同步流水线各阶段耗时（仅实际执行的阶段）",
+        ("stage",),
+        buckets=(0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 1800.0),
+    )
+)
+SYNC_STAGE_LAST_SUCCESS = registry.register(
+    Gauge(
+        "sync_stage_last_success_timestamp_seconds",
+        "同步阶段最近一次成功（执行或跳过）的时间",
+        ("stage",),
+        multiprocess_mode=GAUGE_MODE_MAX,
+    )
+)
+SYNC_PIPELINE_LAST_SUCCESS = registry.register(
+    Gauge(
+        "sync_pipeline_last_success_timestamp_seconds",
+        "同步流水线最近一次完整结束的时间",
+        multiprocess_mode=GAUGE_MODE_MAX,
+    )
+)
+DATA_VERSION_INFO = registry.register(
+    Gauge(
+        "data_version_info",
+        "当前加载的数据版本",
+        ("data_version", "snapshot"),
+        multiprocess_mode=GAUGE_MODE_LIVE_MAX,
+    )
+)
+MODEL_INFO = registry.register(
+    Gauge(
+        "model_checkpoint_info",
+        "已加载的模型（checkpoint 修改时间）",
+        ("domain", "checkpoint", "mtime"),
+        multiprocess_mode=GAUGE_MODE_LIVE_MAX,
+    )
+)
+CPU_EXECUTOR_IN_FLIGHT = registry.register(
+    Gauge("cpu_executor_in_flight", "CPU 线程池在途（执行 + 排队）数", multiprocess_mode=GAUGE_MODE_LIVE_SUM)
+)
+
+
+def configure_metrics(config: Dict[str, Any]) -> None:
+    """
+    按 config.metrics 设置多进程目录
+    """
+
+    metrics_cfg = config.get("metrics", {})
+    directory = metrics_cfg.get("multiprocess_dir")
+    if directory:
+        registry.multiprocess_dir = Path(directory)
+        registry.multiprocess_dir.mkdir(parents=True, exist_ok=True)
+
+
+async def run_metrics_flusher(config: Dict[str, Any]) -> None:
+    """
+    周期性写出本进程快照，供其它 worker 的 /api/metrics 合并
+    """
+
+    interval = float(
+        config.get("metrics", {}).get("flush_interval_seconds", DEFAULT_FLUSH_INTERVAL_SECONDS)
+    )
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(registry.flush)
+        except Exception:
+            logger.exception("Metrics flush failed")
+
+
+def record_model_checkpoints(config: Dict[str, Any], model_names) -> None:
+    score_cfg = config.get("score_prediction", {})
+    checkpoints = (score_cfg.get(score_cfg.get("type", ""), {}) or {}).get("checkpoints") or {}
+
+    MODEL_INFO.clear()
+    for name in model_names:
+        path = checkpoints.get(name)
+        if path is None:
+            continue
+        try:
+            mtime = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(os.stat(path).st_mtime))
+        except OSError:
+            mtime = ""
+        MODEL_INFO.set(1, domain=name, checkpoint=str(path), mtime=mtime)
@@ -0,0 +1,150 @@
+# app/core/profiling.py
+"""
+线上排查用的性能剖析
+
+- sample_stacks：按固定频率采样请求处理线程的调用栈，输出 collapsed stack
+  （flamegraph.pl / speedscope 均可直接导入）或 speedscope JSON
+- profile_call：对单次调用开启 cProfile，返回结果与按累计耗时排序的摘要
+
+两者同一时间只允许一个会话，避免叠加开销
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+from app.core.errors.error_codes import ErrorCode
+from app.core.errors.exceptions import BizError
+
+# 处理请求的线程：CPU 线程池、Starlette 同步 handler 线程池、事件循环主线程
+REQUEST_THREAD_PREFIXES = ("cpu-executor", "AnyIO worker thread", "MainThread")
+
+_sampler_lock = threading.Lock()
+_cprofile_lock = threading.Lock()
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _stack_of(frame) -> Tuple[str, ...]:
+    stack = []
+    while frame is not None:
+        stack.append(_frame_label(frame))
+        frame = frame.f_back
+    stack.reverse()
+    return tuple(stack)
+
+
+def sample_stacks(
+    duration_seconds: float,
+    rate_hz: float,
+    thread_prefixes: Iterable[str] = REQUEST_THREAD_PREFIXES,
+) -> Counter:
+    """
+    采样 duration_seconds 秒，返回 {(线程名, 栈帧...): 次数}
+
+    已有采样会话进行中时抛出 SERVER_BUSY
+    """
+
+    if not _sampler_lock.acquire(blocking=False):
+        raise BizError(ErrorCode.SERVER_BUSY, label="profiler")
+
+    try:
+        prefixes = tuple(thread_prefixes)
+        interval = 1.0 / rate_hz
+        own_ident = threading.get_ident()
+        samples: Counter = Counter()
+        deadline = time.perf_counter() + duration_seconds
+
+        while time.perf_counter() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                name = names.get(ident, str(ident))
+                if ident == own_ident or not name.startswith(prefixes):
+                    continue
+                samples[(name, *_stack_of(frame))] += 1
+            time.sleep(interval)
+
+        return samples
+    finally:
+        _sampler_lock.release()
+
+
+def to_collapsed(samples: Counter) -> str:
+    """
+    collapsed stack 格式：每行 "线程;外层帧;...;内层帧 次数"
+    """
+
+    return "\n".join(
+        f"{';'.join(stack)} {count}" for stack, count in samples.most_common()
+    ) + "\n"
+
+
+def to_speedscope(samples: Counter, rate_hz: float, name: str = "profile") -> Dict[str, Any]:
+    """
+    speedscope 文件格式（sampled profile，每个线程一个 profile）
+    """
+
+    frame_index: Dict[str, int] = {}
+    frames: List[Dict[str, Any]] = []
+    by_thread: Dict[str, Tuple[List[List[int]], List[float]]] = {}
+
+    for (thread_name, *stack), count in samples.items():
+        indices = []
+        for label in stack:
+            if label not in frame_index:
+                frame_index[label] = len(frames)
+                frames.append({"name": label})
+            indices.append(frame_index[label])
+
+        thread_samples, weights = by_thread.setdefault(thread_name, ([], []))
+        thread_samples.append(indices)
+        weights.append(count / rate_hz)
+
+    profiles = [
+        {
+            "type": "sampled",
+            "name": thread_name,
+            "unit": "seconds",
+            "startValue": 0,
+            "endValue": sum(weights),
+            "samples": thread_samples,
+            "weights": weights,
+        }
+        for thread_name, (thread_samples, weights) in sorted(by_thread.items())
+    ]
+
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "exporter": "ai_recommendation_generator",
+        "shared": {"frames": frames},
+        "profiles": profiles,
+    }
+
+
+def profile_call(func: Callable, *args: Any, top_n: int = 30, **kwargs: Any) -> Tuple[Any, str]:
+    """
+    用 cProfile 执行一次 func，返回 (结果, 按累计耗时排序的前 top_n 项摘要)
+    """
+
+    if not _cprofile_lock.acquire(blocking=False):
+        raise BizError(ErrorCode.SERVER_BUSY, label="request_profile")
+
+    try:
+        profiler = cProfile.Profile()
+        result = profiler.runcall(func, *args, **kwargs)
+    finally:
+        _cprofile_lock.release()
+
+    stream = io.StringIO()
+    pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(top_n)
+    return result, stream.getvalue()
@@ -0,0 +1,91 @@
+# app/core/registry.py
+
+import json
+import threading
+from typing import Any, Dict
+
+from app.core.cognitive_l1.constants import (
+    CognitiveL1DatasetName,
+    TaskColumnName,
+    UserTrainingColumnName,
+)
+from app.core.snapshots import pin_snapshot
+from app.repositories.user_repo import UserProfileStore, get_user_profile_store
+from app.services.task_processor import get_task_repository
+from llm.base import BaseLLM
+from models.model_factory import ModelManager
+from utils.dataframe_utils import ColumnAccessor
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DATASET_COLUMN_ENUMS = {
+    CognitiveL1DatasetName.USER_BRAIN_SCORE: UserTrainingColumnName,
+    CognitiveL1DatasetName.TRAINING_TASK: TaskColumnName,
+}
+
+
+class ResourceRegistry:
+    """
+    进程内共享的只读资源：config / 模型 / LLM / 列映射 / 任务仓库 / 用户画像
+
+    启动时由 lifespan 构建并挂到 app.state.registry，
+    评估等服务直接复用，避免每次请求重新读取配置和加载模型
+    """
+
+    def __init__(
+        self,
+        config: Dict[str, Any],
+        model_manager: ModelManager,
+        llm: BaseLLM | None = None,
+    ):
+        self.config = config
+        self.model_manager = model_manager
+        self.llm = llm
+
+        self._lock = threading.Lock()
+        self._column_mappings: Dict[CognitiveL1DatasetName, Dict[str, str]] = {}
+        self._column_accessors: Dict[CognitiveL1DatasetName, ColumnAccessor] = {}
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "ResourceRegistry":
+        """
+        脱离 API 进程（脚本 / 离线评估）时按配置构建
+        """
+
+        model_manager = ModelManager()
+        model_manager.load_models(config)
+        return cls(config=config, model_manager=model_manager)
+
+    def column_mapping(self, dataset: CognitiveL1DatasetName) -> Dict[str, str]:
+        mapping = self._column_mappings.get(dataset)
+        if mapping is not None:
+            return mapping
+
+        with self._lock:
+            if dataset not in self._column_mappings:
+                with open(
+                    self.config["column_mapping"][dataset.value], encoding="utf-8"
+                ) as f:
+                    self._column_mappings[dataset] = json.load(f)
+            return self._column_mappings[dataset]
+
+    def column_accessor(self, dataset: CognitiveL1DatasetName) -> ColumnAccessor:
+        accessor = self._column_accessors.get(dataset)
+        if accessor is not None:
+            return accessor
+
+        mapping = self.column_mapping(dataset)
+        with self._lock:
+            if dataset not in self._column_accessors:
+                self._column_accessors[dataset] = ColumnAccessor(
+                    mapping, DATASET_COLUMN_ENUMS[dataset]
+                )
+            return self._column_accessors[dataset]
+
+    def task_repository(self) -> Dict[str, Any]:
+        # 任务仓库由 task_processor 按文件版本缓存，数据同步后自动切换
+        return get_task_repository(config=pin_snapshot(self.config))
+
+    def user_profile_store(self) -> UserProfileStore:
+        return get_user_profile_store(pin_snapshot(self.config))
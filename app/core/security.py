@@ -0,0 +1,44 @@
+# app/core/security.py
+
+import hmac
+from typing import Any, Dict, Iterable
+
+from fastapi import Request
+
+from app.core.errors.error_codes import ErrorCode
+from app.core.errors.exceptions import BizError
+
+ADMIN_TOKEN_HEADER = "X-Admin-Token"
+
+
+def verify_admin_token(request: Request, expected_token: str | None) -> None:
+    """
+    校验管理接口令牌（请求头 X-Admin-Token）；未配置令牌时一律拒绝
+    """
+
+    provided = request.headers.get(ADMIN_TOKEN_HEADER, "")
+
+    if not expected_token or not hmac.compare_digest(
+        provided.encode("utf-8"), str(expected_token).encode("utf-8")
+    ):
+        raise BizError(ErrorCode.FORBIDDEN, path=request.url.path)
+
+
+def client_in_allowlist(request: Request, allowlist: Iterable[str]) -> bool:
+    """
+    客户端地址是否在白名单中（按 request.client.host 精确匹配）
+    """
+
+    client = request.client
+    return client is not None and client.host in set(allowlist or ())
+
+
+def is_request_profile_allowed(request: Request, config: Dict[str, Any]) -> bool:
+    """
+    ?profile=1 是否生效：需开启 profiling 且客户端在 request_profile_allowlist 中
+    """
+
+    profiling_cfg = config.get("profiling", {})
+    return bool(profiling_cfg.get("enabled", False)) and client_in_allowlist(
+        request, profiling_cfg.get("request_profile_allowlist", [])
+    )
@@ -0,0 +1,350 @@
+# app/core/snapshots.py
+"""
+加工后数据的版本化快照
+
+同步流水线在工作目录中构建产物，完成后链接到 snapshots/<version>/（硬链接，
+失败时复制），在该目录中构建用户画像存储与方案存储，最后写入 manifest.json
+并原子替换 snapshots/current 软链接。
+
+读取方在请求开始时调用 pin_snapshot 固定一个版本：返回的 config 中各产物路径
+指向该版本目录，请求期间 current 切换也不会读到混合版本或写了一半的文件。
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+from copy import deepcopy
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.cognitive_l1.constants import CognitiveL1DatasetName
+from app.core.sync_state import SyncManifest, compute_data_version
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_SNAPSHOT_ROOT = "data/internal/snapshots"
+DEFAULT_KEEP_SNAPSHOTS = 3
+CURRENT_LINK = "current"
+MANIFEST_FILE = "manifest.json"
+
+# 发布到快照中的产物（config 中的路径位置）
+SNAPSHOT_ARTIFACTS: List[Tuple[str, ...]] = [
+    ("task", "user_brain_score"),
+    ("task", "training_task"),
+    ("task", "repository"),
+    ("task", "repository_json_export"),
+    ("task", "level2_to_level1_map"),
+    ("train_eval_dataset", CognitiveL1DatasetName.USER_BRAIN_SCORE.value, "dataset"),
+]
+
+# 在版本目录内生成的产物（方案存储按固定后的 config 预计算，直接写入版本目录）
+SNAPSHOT_LOCAL_ARTIFACTS: List[Tuple[str, ...]] = [
+    ("plan_store", "path"),
+]
+
+_pinned_configs: Dict[str, Dict[str, Any]] = {}
+_pinned_lock = threading.Lock()
+
+
+def _snapshot_cfg(config: Dict[str, Any]) -> Dict[str, Any]:
+    return config.get("snapshots", {}) or {}
+
+
+def snapshots_enabled(config: Dict[str, Any]) -> bool:
+    return bool(_snapshot_cfg(config).get("enabled", False))
+
+
+def resolve_snapshot_root(config: Dict[str, Any]) -> Path:
+    return Path(_snapshot_cfg(config).get("root", DEFAULT_SNAPSHOT_ROOT))
+
+
+def _get_path(config: Dict[str, Any], keys: Tuple[str, ...]) -> Optional[str]:
+    value: Any = config
+    for key in keys:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value or None
+
+
+def _set_path(config: Dict[str, Any], keys: Tuple[str, ...], value: str) -> None:
+    target = config
+    for key in keys[:-1]:
+        target = target.setdefault(key, {})
+    target[keys[-1]] = value
+
+
+def _artifact_key(keys: Tuple[str, ...]) -> str:
+    return ".".join(keys)
+
+
+def _link_or_copy(src: Path, dst: Path) -> None:
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def read_snapshot_manifest(snapshot_dir: Path) -> Optional[Dict[str, Any]]:
+    try:
+        with open(snapshot_dir / MANIFEST_FILE, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def current_snapshot_dir(config: Dict[str, Any]) -> Optional[Path]:
+    """
+    current 指向的版本目录（已解析软链接），不存在时返回 None
+    """
+
+    link = resolve_snapshot_root(config) / CURRENT_LINK
+    if not link.exists():
+        return None
+    return Path(os.path.realpath(link))
+
+
+@dataclass
+class StagedSnapshot:
+    """
+    已在版本目录中准备好、尚未切换 current 的快照
+    """
+
+    version: str
+    path: Path
+    config: Dict[str, Any]
+    manifest: Dict[str, Any]
+
+
+def _snapshot_config(
+    config: Dict[str, Any], snapshot_dir: Path, manifest: Dict[str, Any]
+) -> Dict[str, Any]:
+    pinned = deepcopy(config)
+    for keys in SNAPSHOT_ARTIFACTS + SNAPSHOT_LOCAL_ARTIFACTS:
+        path = _get_path(config, keys)
+        if path is None:
+            continue
+        # 未发布的产物也指向版本目录，读取方按文件不存在处理
+        name = manifest["files"].get(_artifact_key(keys), {}).get("name", Path(path).name)
+        _set_path(pinned, keys, str(snapshot_dir / name))
+
+    pinned["snapshot"] = {"version": manifest["version"], "path": str(snapshot_dir)}
+    return pinned
+
+
+def stage_snapshot(
+    config: Dict[str, Any], require_local: bool = False
+) -> Optional[StagedSnapshot]:
+    """
+    将工作目录中的产物链接到新的版本目录，但不切换 current
+
+    返回的 config 指向该版本目录，调用方在其中构建用户画像存储、预计算方案存储，
+    全部完成后再 commit_snapshot。产物与当前版本一致（内容哈希）时返回 None；
+    require_local 为 True 时当前版本还需已包含版本内产物（方案存储），否则重新准备
+    """
+
+    root = resolve_snapshot_root(config)
+    root.mkdir(parents=True, exist_ok=True)
+    sync_manifest = SyncManifest.from_config(config)
+
+    files: Dict[str, Dict[str, Any]] = {}
+    sources: Dict[str, Path] = {}
+    for keys in SNAPSHOT_ARTIFACTS:
+        path = _get_path(config, keys)
+        if path is None or not Path(path).exists():
+            continue
+
+        key = _artifact_key(keys)
+        signature = sync_manifest.signature(path)
+        files[key] = {"name": Path(path).name, "sha256": signature["sha256"], "size": signature["size"]}
+        sources[key] = Path(path)
+
+    names = [item["name"] for item in files.values()]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Snapshot artifact file names must be unique: {names}")
+
+    data_version = compute_data_version(config)
+
+    current_dir = current_snapshot_dir(config)
+    current_manifest = read_snapshot_manifest(current_dir) if current_dir else None
+    if current_manifest is not None:
+        current_files = {
+            key: item for key, item in current_manifest.get("files", {}).items() if key in files
+        }
+        local_ready = not require_local or all(
+            _artifact_key(keys) in current_manifest.get("files", {})
+            for keys in SNAPSHOT_LOCAL_ARTIFACTS
+            if _get_path(config, keys) is not None
+        )
+        if (
+            current_files == files
+            and len(current_files) == len(files)
+            and current_manifest.get("source_data_version") == data_version
+            and local_ready
+        ):
+            logger.info("[SNAPSHOT_UNCHANGED] version=%s", current_manifest.get("version"))
+            return None
+
+    # 直接在最终目录中准备：current 切换前读取方看不到该目录；manifest.json 最后写入，作为完整标记
+    version = f"{datetime.now().strftime('%Y%m%dT%H%M%S%f')}-{data_version[:8]}"
+    snapshot_dir = root / version
+    snapshot_dir.mkdir()
+
+    try:
+        for key, src in sources.items():
+            _link_or_copy(src, snapshot_dir / files[key]["name"])
+    except Exception:
+        shutil.rmtree(snapshot_dir, ignore_errors=True)
+        raise
+
+    manifest = {
+        "version": version,
+        "source_data_version": data_version,
+        "files": files,
+    }
+
+    logger.info("[SNAPSHOT_STAGED] version=%s files=%s", version, sorted(files))
+    return StagedSnapshot(
+        version=version,
+        path=snapshot_dir,
+        config=_snapshot_config(config, snapshot_dir, manifest),
+        manifest=manifest,
+    )
+
+
+def commit_snapshot(config: Dict[str, Any], staged: StagedSnapshot) -> str:
+    """
+    写入 manifest（含版本目录内已生成的产物）并原子切换 current
+    """
+
+    root = resolve_snapshot_root(config)
+    sync_manifest = SyncManifest.from_config(config)
+
+    manifest = {
+        **staged.manifest,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "files": dict(staged.manifest["files"]),
+    }
+    for keys in SNAPSHOT_LOCAL_ARTIFACTS:
+        path = _get_path(staged.config, keys)
+        if path is None or not Path(path).exists():
+            continue
+        signature = sync_manifest.signature(path)
+        manifest["files"][_artifact_key(keys)] = {
+            "name": Path(path).name,
+            "sha256": signature["sha256"],
+            "size": signature["size"],
+        }
+
+    tmp_manifest = staged.path / f".{MANIFEST_FILE}.{os.getpid()}.tmp"
+    with open(tmp_manifest, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_manifest, staged.path / MANIFEST_FILE)
+
+    # 软链接原子替换：先建临时链接再 rename 覆盖 current
+    tmp_link = root / f".{CURRENT_LINK}.{os.getpid()}.tmp"
+    tmp_link.unlink(missing_ok=True)
+    os.symlink(staged.version, tmp_link)
+    os.replace(tmp_link, root / CURRENT_LINK)
+
+    logger.info("[SNAPSHOT_PUBLISHED] version=%s files=%s", staged.version, sorted(manifest["files"]))
+
+    prune_snapshots(config)
+    return staged.version
+
+
+def discard_snapshot(staged: StagedSnapshot) -> None:
+    shutil.rmtree(staged.path, ignore_errors=True)
+    logger.warning("[SNAPSHOT_DISCARDED] version=%s", staged.version)
+
+
+def publish_snapshot(config: Dict[str, Any]) -> Optional[str]:
+    """
+    发布工作目录中的产物并切换 current（不构建版本内产物）
+
+    产物与当前版本完全一致时不发布，返回 None；否则返回新版本号
+    """
+
+    staged = stage_snapshot(config)
+    if staged is None:
+        return None
+    return commit_snapshot(config, staged)
+
+
+def prune_snapshots(config: Dict[str, Any]) -> List[str]:
+    """
+    只保留最近 keep 个版本（current 指向的版本始终保留）
+
+    比 current 更早且没有 manifest 的目录是中途失败的残留，一并清理；
+    比 current 更新的未完成目录可能正在准备中，保留
+    """
+
+    root = resolve_snapshot_root(config)
+    keep = max(int(_snapshot_cfg(config).get("keep", DEFAULT_KEEP_SNAPSHOTS)), 1)
+    current_dir = current_snapshot_dir(config)
+    current_name = current_dir.name if current_dir is not None else None
+
+    versions = []
+    removed = []
+    for path in sorted(root.iterdir(), key=lambda path: path.name):
+        if not path.is_dir() or path.is_symlink() or path.name.startswith("."):
+            continue
+        if (path / MANIFEST_FILE).exists():
+            versions.append(path)
+        elif current_name is not None and path.name < current_name:
+            shutil.rmtree(path, ignore_errors=True)
+            removed.append(path.name)
+
+    for path in versions[:-keep]:
+        if current_dir is not None and path.resolve() == current_dir:
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        removed.append(path.name)
+
+    if removed:
+        logger.info("[SNAPSHOT_PRUNED] removed=%s", removed)
+    return removed
+
+
+def pin_snapshot(config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    固定当前快照版本：返回产物路径指向该版本目录的 config（按版本缓存）
+
+    未启用快照或尚未发布任何版本时原样返回 config
+    """
+
+    if not snapshots_enabled(config):
+        return config
+
+    snapshot_dir = current_snapshot_dir(config)
+    if snapshot_dir is None:
+        return config
+
+    cache_key = str(snapshot_dir)
+    pinned = _pinned_configs.get(cache_key)
+    if pinned is not None:
+        return pinned
+
+    with _pinned_lock:
+        pinned = _pinned_configs.get(cache_key)
+        if pinned is not None:
+            return pinned
+
+        manifest = read_snapshot_manifest(snapshot_dir)
+        if manifest is None:
+            logger.warning("[SNAPSHOT_INVALID] path=%s", snapshot_dir)
+            return config
+
+        pinned = _snapshot_config(config, snapshot_dir, manifest)
+
+        # 只缓存最近几个版本
+        if len(_pinned_configs) >= DEFAULT_KEEP_SNAPSHOTS + 1:
+            _pinned_configs.clear()
+        _pinned_configs[cache_key] = pinned
+
+        return pinned
@@ -0,0 +1,335 @@
+# app/core/sync_state.py
+"""
+数据同步状态
+
+- SyncManifest 记录每个同步阶段的输入签名（size / mtime / 内容哈希）、
+  配置指纹与输出签名，输入未变化时跳过该阶段
+- data_version 标识「一次完整同步后的输入数据 + 模型」组合，
+  用于判断预计算结果（如方案存储）是否仍与当前数据一致
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_MANIFEST_PATH = "data/internal/sync_manifest.json"
+HASH_CHUNK_SIZE = 1024 * 1024
+
+_known_signatures_cache: Tuple[Optional[Tuple[str, int, int]], Dict[str, dict]] = (None, {})
+_known_signatures_lock = threading.Lock()
+
+
+def _hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _fingerprint(value: Any) -> str:
+    payload = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def resolve_manifest_path(config: Dict[str, Any]) -> Path:
+    return Path(
+        config.get("sync_state", {}).get("manifest", DEFAULT_MANIFEST_PATH)
+    )
+
+
+class SyncManifest:
+    """
+    同步清单：stage -> {inputs, config, outputs, updated_at}
+
+    - 输入按内容哈希比较；size + mtime 与已记录一致时直接复用哈希，不重新读文件
+    - 输出只比较 size + mtime（被外部改动或删除时重跑）
+    - 每次 record 后原子写回磁盘，中途失败的阶段不会被记录
+    """
+
+    def __init__(self, path: Path, skip_unchanged: bool = True):
+        self.path = Path(path)
+        self.skip_unchanged = skip_unchanged
+        self._lock = threading.Lock()
+        self._stages: Dict[str, dict] = {}
+
+        if self.path.exists():
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    self._stages = json.load(f).get("stages", {})
+            except (OSError, ValueError):
+                logger.warning("[SYNC_MANIFEST_INVALID] path=%s, start fresh", self.path)
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "SyncManifest":
+        return cls(
+            resolve_manifest_path(config),
+            skip_unchanged=bool(
+                config.get("sync_state", {}).get("skip_unchanged", True)
+            ),
+        )
+
+    def _known_signature(self, path: str) -> Optional[dict]:
+        for record in self._stages.values():
+            for group in ("inputs", "outputs"):
+                signature = record.get(group, {}).get(path)
+                if signature and signature.get("sha256"):
+                    return signature
+        return None
+
+    def signature(self, path: str | Path) -> Optional[dict]:
+        """
+        文件签名 {size, mtime_ns, sha256}，文件不存在返回 None
+        """
+
+        path = Path(path)
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+
+        with self._lock:
+            known = self._known_signature(str(path))
+
+        if (
+            known is not None
+            and known.get("size") == stat.st_size
+            and known.get("mtime_ns") == stat.st_mtime_ns
+        ):
+            sha256 = known["sha256"]
+        else:
+            sha256 = _hash_file(path)
+
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": sha256}
+
+    def is_fresh(
+        self,
+        stage: str,
+        inputs: Iterable[str | Path],
+        config_fingerprint: Any,
+        outputs: Iterable[str | Path],
+    ) -> bool:
+        """
+        输入内容与配置指纹均未变化、且输出仍是上次写出的文件时返回 True
+        """
+
+        if not self.skip_unchanged:
+            return False
+
+        with self._lock:
+            record = self._stages.get(stage)
+
+        if record is None or record.get("config") != _fingerprint(config_fingerprint):
+            return False
+
+        recorded_inputs = record.get("inputs", {})
+        inputs = [str(path) for path in inputs]
+        if set(inputs) != set(recorded_inputs):
+            return False
+
+        for path in inputs:
+            signature = self.signature(path)
+            if signature is None or signature["sha256"] != recorded_inputs[path].get("sha256"):
+                return False
+
+        recorded_outputs = record.get("outputs", {})
+        for path in (str(path) for path in outputs):
+            recorded = recorded_outputs.get(path)
+            try:
+                stat = Path(path).stat()
+            except FileNotFoundError:
+                return False
+            if recorded is None or (recorded.get("size"), recorded.get("mtime_ns")) != (
+                stat.st_size,
+                stat.st_mtime_ns,
+            ):
+                return False
+
+        return True
+
+    def record(
+        self,
+        stage: str,
+        inputs: Iterable[str | Path],
+        config_fingerprint: Any,
+        outputs: Iterable[str | Path],
+    ) -> None:
+        """
+        阶段成功后记录输入 / 输出签名并写回清单
+        """
+
+        record = {
+            "inputs": {str(path): self.signature(path) for path in inputs},
+            "config": _fingerprint(config_fingerprint),
+            "outputs": {str(path): self.signature(path) for path in outputs},
+            "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        }
+
+        with self._lock:
+            self._stages[stage] = record
+            self._save()
+
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"stages": self._stages}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def _load_known_signatures(config: Dict[str, Any]) -> Dict[str, dict]:
+    """
+    清单中已记录的全部文件签名（path -> signature），按清单文件版本缓存
+    """
+
+    global _known_signatures_cache
+
+    path = resolve_manifest_path(config)
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return {}
+
+    version = (str(path), stat.st_mtime_ns, stat.st_size)
+    cached_version, signatures = _known_signatures_cache
+    if cached_version == version:
+        return signatures
+
+    with _known_signatures_lock:
+        try:
+            with open(path, encoding="utf-8") as f:
+                stages = json.load(f).get("stages", {})
+        except (OSError, ValueError):
+            stages = {}
+
+        signatures = {}
+        for record in stages.values():
+            for group in ("inputs", "outputs"):
+                for file_path, signature in record.get(group, {}).items():
+                    if signature and signature.get("sha256"):
+                        signatures[file_path] = signature
+
+        _known_signatures_cache = (version, signatures)
+        return signatures
+
+
+def _plan_input_paths(config: Dict[str, Any]) -> List[Path]:
+    """
+    v2 方案依赖的全部文件：用户脑能力 parquet、任务仓库、分数预测模型及特征列
+    """
+
+    task_cfg = config.get("task", {})
+    paths = [
+        Path(task_cfg["user_brain_score"]),
+        Path(task_cfg["repository"]),
+    ]
+
+    score_cfg = config.get("score_prediction", {})
+    model_cfg = score_cfg.get(score_cfg.get("type", ""), {}) or {}
+
+    if model_cfg.get("feature_columns"):
+        paths.append(Path(model_cfg["feature_columns"]))
+
+    paths.extend(Path(path) for path in (model_cfg.get("checkpoints") or {}).values())
+
+    return paths
+
+
+def _config_fingerprint(config: Dict[str, Any]) -> Dict[str, Any]:
+    # 影响方案内容的配置项
+    return {
+        "score_prediction": config.get("score_prediction", {}),
+        "l2_treemap": config.get("l2_treemap", {}),
+    }
+
+
+def compute_data_version(config: Dict[str, Any]) -> str:
+    """
+    基于输入文件与相关配置计算数据版本
+
+    文件在同步清单中有记录且 size + mtime 未变时使用内容哈希，
+    同步重跑但内容不变时版本不变；否则退化为（路径 + mtime + size）。
+    只做 stat，不读取文件内容，可在请求路径上调用
+    """
+
+    known_signatures = _load_known_signatures(config)
+
+    entries = []
+    for path in _plan_input_paths(config):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            entries.append([str(path), None, None])
+            continue
+
+        known = known_signatures.get(str(path))
+        if (
+            known is not None
+            and known.get("size") == stat.st_size
+            and known.get("mtime_ns") == stat.st_mtime_ns
+        ):
+            entries.append([str(path), known["sha256"]])
+        else:
+            entries.append([str(path), stat.st_mtime_ns, stat.st_size])
+
+    payload = json.dumps(
+        {"files": entries, "config": _config_fingerprint(config)},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+DEFAULT_SYNC_VERSION_FILE = "data/internal/sync_version.json"
+
+
+def resolve_sync_version_path(config: Dict[str, Any]) -> Path:
+    return Path(
+        config.get("sync_tasks", {})
+        .get("worker", {})
+        .get("version_file", DEFAULT_SYNC_VERSION_FILE)
+    )
+
+
+def publish_sync_version(config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    同步流水线完成后写入版本文件（原子替换），API 进程据此重新加载数据快照
+    """
+
+    payload = {
+        "data_version": compute_data_version(config),
+        "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "pid": os.getpid(),
+    }
+
+    path = resolve_sync_version_path(config)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+    logger.info("[SYNC_VERSION_PUBLISHED] path=%s %s", path, payload)
+    return payload
+
+
+def read_sync_version(config: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    path = resolve_sync_version_path(config)
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except ValueError:
+        logger.warning("[SYNC_VERSION_INVALID] path=%s", path)
+        return None
@@ -0,0 +1,151 @@
+# app/core/timing.py
+"""
+请求内分阶段耗时统计
+
+    with stage("fetch_user_profile"):
+        ...
+
+计时器通过 contextvar 绑定到当前请求（由 StageTimingMiddleware 创建），
+CPU 线程池会复制 contextvars，因此工作线程中的阶段也计入同一请求。
+未绑定计时器（关闭或脱离请求调用）时 stage() 返回空操作对象，开销只有一次 contextvar 读取
+"""
+
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+# 直方图桶上界（秒）
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class StageTimer:
+    """
+    单个请求的阶段耗时（同名阶段累加，按首次出现顺序输出）
+    """
+
+    __slots__ = ("stages", "started_at")
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self.started_at = time.perf_counter()
+
+    def record(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def total(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    def server_timing(self, total: Optional[float] = None) -> str:
+        items = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.stages.items()]
+        if total is not None:
+            items.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(items)
+
+    def log_fields(self) -> str:
+        return " ".join(f"{name}={seconds:.4f}" for name, seconds in self.stages.items())
+
+
+_current_timer: ContextVar[Optional[StageTimer]] = ContextVar("stage_timer", default=None)
+
+
+class _Span:
+    __slots__ = ("_timer", "_name", "_start")
+
+    def __init__(self, timer: StageTimer, name: str):
+        self._timer = timer
+        self._name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._timer.record(self._name, time.perf_counter() - self._start)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def stage(name: str):
+    """
+    记录一个阶段的耗时；当前没有计时器时为空操作
+    """
+
+    timer = _current_timer.get()
+    if timer is None:
+        return _NULL_SPAN
+    return _Span(timer, name)
+
+
+def record_stage(name: str, seconds: float) -> None:
+    """
+    直接记录已测得的阶段耗时（如线程池排队时间）
+    """
+
+    timer = _current_timer.get()
+    if timer is not None:
+        timer.record(name, seconds)
+
+
+def start_stage_timer():
+    """
+    为当前上下文绑定新的计时器，返回 (timer, token)，结束时用 token 还原
+    """
+
+    timer = StageTimer()
+    return timer, _current_timer.set(timer)
+
+
+def reset_stage_timer(token) -> None:
+    _current_timer.reset(token)
+
+
+class StageHistograms:
+    """
+    进程内按阶段聚合的耗时直方图（累计计数）
+    """
+
+    def __init__(self, buckets=STAGE_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counts: Dict[str, List[int]] = {}
+        self._sums: Dict[str, float] = {}
+
+    def observe(self, stages: Dict[str, float]) -> None:
+        with self._lock:
+            for name, seconds in stages.items():
+                counts = self._counts.get(name)
+                if counts is None:
+                    # 最后一个桶为 +Inf
+                    counts = self._counts[name] = [0] * (len(self.buckets) + 1)
+                    self._sums[name] = 0.0
+                counts[bisect.bisect_left(self.buckets, seconds)] += 1
+                self._sums[name] += seconds
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {
+                name: {
+                    "buckets": list(self.buckets),
+                    "counts": list(counts),
+                    "count": sum(counts),
+                    "sum": self._sums[name],
+                }
+                for name, counts in self._counts.items()
+            }
+
+
+stage_histograms = StageHistograms()
@@ -1,8 +1,9 @@
 # app/data/datasets/cognitive_l1_dataset.py
 
 import json
+import os
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List
 
 from app.core.cognitive_l1.constants import (
     CognitiveL1DatasetName,
@@ -19,6 +20,100 @@ from utils.logger import get_logger
 logger = get_logger(__name__)
 
 
+def get_numeric_fields(
+    parquet_name: str, column_mapping: Dict[str, str]
+) -> List[str]:
+    """
+    数据集的数值字段（映射后的列名），预处理和 CSV 转换的列类型共用
+    """
+
+    if parquet_name == CognitiveL1DatasetName.USER_BRAIN_SCORE:
+
+        cols = ColumnAccessor(column_mapping, UserTrainingColumnName)
+
+        weekly_numeric_fields = []
+        for week in range(1, MAX_HISTORY_WEEKS + 1):
+            weekly_numeric_fields.extend(
+                [
+                    getattr(cols, f"week{week}_perception"),
+                    getattr(cols, f"week{week}_attention"),
+                    getattr(cols, f"week{week}_memory"),
+                    getattr(cols, f"week{week}_executive"),
+                ]
+            )
+
+        return [
+            cols.latest_perception,
+            cols.latest_attention,
+            cols.latest_memory,
+            cols.latest_executive,
+            *weekly_numeric_fields,
+            cols.last_84d_latest_perception,
+            cols.last_84d_latest_attention,
+            cols.last_84d_latest_memory,
+            cols.last_84d_latest_executive,
+            cols.episodic_memory,
+            cols.interference_control,
+            cols.response_inhibition,
+            cols.spatial_working_memory,
+            cols.focused_attention,
+            cols.processing_speed,
+            cols.time_perception,
+            cols.selective_attention,
+            cols.spatial_perception,
+            cols.cognitive_flexibility,
+            cols.motor_perception,
+            cols.alert_attention,
+            cols.spatial_memory,
+            cols.sustained_attention,
+            cols.memory_span,
+            cols.conflict_inhibition,
+            cols.working_memory,
+            cols.number_sense,
+            cols.attention_control,
+        ]
+
+    if parquet_name == CognitiveL1DatasetName.TRAINING_TASK:
+
+        cols = ColumnAccessor(column_mapping, TaskColumnName)
+
+        return [
+            cols.age_min,
+            cols.age_max,
+            cols.difficulty,
+            cols.start_level,
+            cols.level_max,
+            cols.initial_difficulty,
+            cols.min_duration,
+            cols.max_duration,
+        ]
+
+    raise ValueError(f"Unsupported dataset: {parquet_name}")
+
+
+def get_raw_numeric_columns(config: Dict[str, Any], dataset_name: str) -> List[str]:
+    """
+    原始 CSV 中的数值列（CSV 列名），由 config columns 与列映射反查得到
+
+    未知数据集返回空列表（全部按字符串读取）
+    """
+
+    if dataset_name not in {dataset.value for dataset in CognitiveL1DatasetName}:
+        return []
+
+    with open(config["column_mapping"][dataset_name], encoding="utf-8") as f:
+        column_mapping = json.load(f)
+
+    numeric_fields = set(get_numeric_fields(dataset_name, column_mapping))
+    raw_columns = config.get("columns", {}).get(dataset_name) or list(column_mapping)
+
+    return [
+        column
+        for column in raw_columns
+        if column_mapping.get(column, column) in numeric_fields
+    ]
+
+
 def load_and_preprocess_dataset(config: Dict[str, Any], parquet_name: str):
     """
     Load raw parquet dataset and perform preprocessing.
@@ -70,47 +165,7 @@ def load_and_preprocess_dataset(config: Dict[str, Any], parquet_name: str):
 
         cols = ColumnAccessor(COLUMN_MAPPING, UserTrainingColumnName)
 
-        weekly_numeric_fields = []
-        for week in range(1, MAX_HISTORY_WEEKS + 1):
-            weekly_numeric_fields.extend(
-                [
-                    getattr(cols, f"week{week}_perception"),
-                    getattr(cols, f"week{week}_attention"),
-                    getattr(cols, f"week{week}_memory"),
-                    getattr(cols, f"week{week}_executive"),
-                ]
-            )
-
-        numeric_fields = [
-            cols.latest_perception,
-            cols.latest_attention,
-            cols.latest_memory,
-            cols.latest_executive,
-            *weekly_numeric_fields,
-            cols.last_84d_latest_perception,
-            cols.last_84d_latest_attention,
-            cols.last_84d_latest_memory,
-            cols.last_84d_latest_executive,
-            cols.episodic_memory,
-            cols.interference_control,
-            cols.response_inhibition,
-            cols.spatial_working_memory,
-            cols.focused_attention,
-            cols.processing_speed,
-            cols.time_perception,
-            cols.selective_attention,
-            cols.spatial_perception,
-            cols.cognitive_flexibility,
-            cols.motor_perception,
-            cols.alert_attention,
-            cols.spatial_memory,
-            cols.sustained_attention,
-            cols.memory_span,
-            cols.conflict_inhibition,
-            cols.working_memory,
-            cols.number_sense,
-            cols.attention_control,
-        ]
+        numeric_fields = get_numeric_fields(parquet_name, COLUMN_MAPPING)
 
         multi_value_fields = [
             cols.last_day_task,
@@ -125,16 +180,7 @@ def load_and_preprocess_dataset(config: Dict[str, Any], parquet_name: str):
 
         cols = ColumnAccessor(COLUMN_MAPPING, TaskColumnName)
 
-        numeric_fields = [
-            cols.age_min,
-            cols.age_max,
-            cols.difficulty,
-            cols.start_level,
-            cols.level_max,
-            cols.initial_difficulty,
-            cols.min_duration,
-            cols.max_duration,
-        ]
+        numeric_fields = get_numeric_fields(parquet_name, COLUMN_MAPPING)
 
         value_replacements = {cols.paradigm:{"":ParadigmType.NO_PARADIGM.value},}
 
@@ -174,7 +220,10 @@ def load_and_preprocess_dataset(config: Dict[str, Any], parquet_name: str):
 
     logger.debug(f"Saving processed dataset -> {output_path}")
 
-    df.to_parquet(output_path)
+    # 先写临时文件再 rename：已发布快照通过硬链接引用旧文件，不能原地覆盖
+    tmp_path = output_path.with_name(f".{output_path.name}.{os.getpid()}.tmp")
+    df.to_parquet(tmp_path)
+    os.replace(tmp_path, output_path)
 
     logger.debug("Dataset successfully saved")
     logger.debug("========== Dataset Build Finished ==========")
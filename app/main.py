@@ -1,11 +1,37 @@
 # app/main.py
 
+import sys
+import time
+
+# 启动耗时剖析：记录应用模块导入耗时（需在其它导入之前）
+_IMPORT_STARTED_AT = time.perf_counter()
+
+import asyncio
+
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
 
 from app.core.errors.error_handler import biz_error_handler, generic_error_handler
 from app.core.errors.exceptions import BizError
-from app.tasks.sync_manager import start_sync_tasks
+from app.core.executor import get_cpu_executor, shutdown_cpu_executor
+from app.core.metrics import (
+    CPU_EXECUTOR_IN_FLIGHT,
+    DATA_VERSION_INFO,
+    configure_metrics,
+    record_model_checkpoints,
+    registry as metrics_registry,
+    run_metrics_flusher,
+)
+from app.core.registry import ResourceRegistry
+from app.core.snapshots import pin_snapshot
+from app.core.sync_state import compute_data_version
+from app.services.task_processor import get_task_repository
+from app.tasks.sync_manager import (
+    SYNC_MODE_WORKER,
+    resolve_sync_mode,
+    start_sync_tasks,
+    start_sync_version_watcher,
+)
 from configs.loader import load_config
 from llm.factory import create_llm
 
@@ -13,6 +39,10 @@ from app.controllers.chat_controller import router as chat_router
 from app.controllers.chat_controller_v2 import router as chat_router_v2
 from app.controllers.health_controller import router as health_router
 from app.controllers.evaluation_controller import router as eval_router
+from app.controllers.metrics_controller import router as metrics_router
+from app.controllers.profiling_controller import router as profiling_router
+from app.middlewares.metrics import MetricsMiddleware
+from app.middlewares.timing import StageTimingMiddleware
 
 from utils.logger import setup_logging, get_logger
 from models.model_factory import ModelManager
@@ -23,6 +53,39 @@ setup_logging()
 logger = get_logger(__name__)
 bootstrap_config = load_config()
 
+# 重量级依赖是否已被导入（torch / xgboost 应只在配置使用时出现）
+HEAVY_MODULES = ("torch", "xgboost", "lightgbm", "pandas", "pyarrow", "duckdb")
+logger.info(
+    "[STARTUP_IMPORTS] seconds=%.3f loaded=%s",
+    time.perf_counter() - _IMPORT_STARTED_AT,
+    [name for name in HEAVY_MODULES if name in sys.modules],
+)
+
+
+metrics_enabled = bootstrap_config.get("metrics", {}).get("enabled", False)
+
+
+def _register_metrics_collectors(config):
+    """
+    进程级指标：当前数据版本、CPU 线程池在途数
+    """
+
+    def collect_data_version():
+        pinned = pin_snapshot(config)
+        DATA_VERSION_INFO.clear()
+        DATA_VERSION_INFO.set(
+            1,
+            data_version=compute_data_version(pinned),
+            snapshot=pinned.get("snapshot", {}).get("version", ""),
+        )
+
+    def collect_executor():
+        CPU_EXECUTOR_IN_FLIGHT.set(get_cpu_executor(config).in_flight)
+
+    metrics_registry.clear_collectors()
+    metrics_registry.add_collector(collect_data_version)
+    metrics_registry.add_collector(collect_executor)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -36,12 +99,42 @@ async def lifespan(app: FastAPI):
 
         app.state.llm = create_llm(config)
 
+        models_started_at = time.perf_counter()
         model_manager = ModelManager()
         model_manager.load_models(config)
+        logger.info(
+            "[STARTUP_MODELS_LOADED] seconds=%.3f models=%s",
+            time.perf_counter() - models_started_at,
+            sorted(model_manager.models),
+        )
 
         app.state.model_manager = model_manager
 
-        app.state.sync_scheduler = start_sync_tasks(config)
+        if metrics_enabled:
+            configure_metrics(config)
+            record_model_checkpoints(config, model_manager.models)
+            _register_metrics_collectors(config)
+            if metrics_registry.multiprocess_dir is not None:
+                app.state.metrics_flusher = asyncio.create_task(run_metrics_flusher(config))
+
+        # 评估等服务共享的只读资源（复用已加载的模型与配置）
+        app.state.registry = ResourceRegistry(
+            config=config,
+            model_manager=model_manager,
+            llm=app.state.llm,
+        )
+
+        # 预热任务仓库缓存，避免首个请求承担 JSON 解析与校验开销
+        try:
+            get_task_repository(pin_snapshot(config))
+        except Exception:
+            logger.warning("Task repository warm-up failed", exc_info=True)
+
+        # worker 模式下同步流水线由独立进程运行，这里只监听其完成通知
+        if resolve_sync_mode(config) == SYNC_MODE_WORKER:
+            app.state.sync_watcher = start_sync_version_watcher(config)
+        else:
+            app.state.sync_scheduler = start_sync_tasks(config, model_manager=model_manager)
 
     except Exception as e:
         logger.exception("Failed to initialize services")
@@ -53,11 +146,34 @@ async def lifespan(app: FastAPI):
     if sync_scheduler:
         sync_scheduler.shutdown(wait=False)
 
+    sync_watcher = getattr(app.state, "sync_watcher", None)
+    if sync_watcher:
+        sync_watcher.cancel()
+
+    metrics_flusher = getattr(app.state, "metrics_flusher", None)
+    if metrics_flusher:
+        metrics_flusher.cancel()
+        metrics_registry.flush()
+
+    shutdown_cpu_executor()
+
+    model_manager = getattr(app.state, "model_manager", None)
+    if model_manager:
+        model_manager.close()
+
     logger.info("Shutting down AI Recommendation Service...")
 
 
 app = FastAPI(title="AI Recommendation Service", lifespan=lifespan)
 
+# 分阶段耗时（Server-Timing 头 + [STAGE_TIMING] 日志）；关闭时 stage() 为空操作
+if bootstrap_config.get("stage_timing", {}).get("enabled", False):
+    app.add_middleware(StageTimingMiddleware)
+
+# 请求数 / 耗时指标（最外层，包含其它中间件的耗时）
+if metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
 app.add_exception_handler(BizError, biz_error_handler)
 
 app.add_exception_handler(Exception, generic_error_handler)
@@ -71,3 +187,10 @@ app.include_router(health_router, prefix="/api")
 
 if bootstrap_config.get("routers", {}).get("eval_router_enabled", True):
     app.include_router(eval_router, prefix="/api")
+
+if metrics_enabled:
+    app.include_router(metrics_router, prefix="/api")
+
+# 采样剖析管理接口默认不注册
+if bootstrap_config.get("profiling", {}).get("enabled", False):
+    app.include_router(profiling_router, prefix="/api")
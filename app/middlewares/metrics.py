@@ -0,0 +1,44 @@
+# app/middlewares/metrics.py
+"""
+HTTP 请求指标中间件：按路由模板统计请求数与耗时
+"""
+
+import time
+
+from app.core.metrics import HTTP_REQUEST_DURATION, HTTP_REQUESTS
+
+
+class MetricsMiddleware:
+    """
+    纯 ASGI 中间件；路由取 FastAPI 匹配到的路径模板，未匹配的请求统一记为 unmatched，
+    避免任意路径导致标签基数膨胀
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started_at = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "")
+
+            HTTP_REQUESTS.inc(method=method, route=route_path, status=status)
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - started_at, method=method, route=route_path
+            )
@@ -0,0 +1,56 @@
+# app/middlewares/timing.py
+"""
+分阶段耗时中间件：为每个请求绑定 StageTimer，
+响应时输出 Server-Timing 头与 [STAGE_TIMING] 日志，并计入进程内直方图
+（/api/metrics 以 plan_stage_duration_seconds 导出）
+"""
+
+from app.core.timing import (
+    reset_stage_timer,
+    stage_histograms,
+    start_stage_timer,
+)
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class StageTimingMiddleware:
+    """
+    纯 ASGI 中间件（不经过 BaseHTTPMiddleware，流式响应不受影响）
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timer, token = start_stage_timer()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start" and timer.stages:
+                # 响应头发送时已完成的阶段
+                headers = list(message.get("headers", []))
+                headers.append(
+                    (b"server-timing", timer.server_timing(timer.total()).encode("latin-1"))
+                )
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            reset_stage_timer(token)
+
+            if timer.stages:
+                stage_histograms.observe(timer.stages)
+                logger.info(
+                    "[STAGE_TIMING] method=%s path=%s total=%.4f %s",
+                    scope.get("method"),
+                    scope.get("path"),
+                    timer.total(),
+                    timer.log_fields(),
+                )
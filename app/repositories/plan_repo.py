@@ -0,0 +1,185 @@
+# app/repositories/plan_repo.py
+
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_PLAN_STORE_PATH = "data/internal/processed/cognitive_l1/plan_store.sqlite"
+
+_SCHEMA = """
+CREATE TABLE plans (
+    user_id TEXT,
+    patient_code TEXT,
+    payload TEXT NOT NULL
+);
+CREATE TABLE meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+_INDEXES = """
+CREATE INDEX idx_plans_user_id ON plans (user_id);
+CREATE INDEX idx_plans_patient_code ON plans (patient_code);
+"""
+
+
+def resolve_plan_store_path(config: Dict[str, Any]) -> Path:
+    return Path(config.get("plan_store", {}).get("path", DEFAULT_PLAN_STORE_PATH))
+
+
+class PlanStoreWriter:
+    """
+    预计算方案写入器
+
+    写入临时库文件，commit 后整体 rename 到目标路径；
+    读取方始终看到完整的旧库或完整的新库
+    """
+
+    def __init__(self, path: Path, data_version: str):
+        self.path = Path(path)
+        self.data_version = data_version
+        self.tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        self.count = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.tmp_path.unlink(missing_ok=True)
+
+        self._conn = sqlite3.connect(self.tmp_path)
+        self._conn.execute("PRAGMA journal_mode=OFF")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.executescript(_SCHEMA)
+
+    def write_many(self, rows: Iterable[Tuple[Optional[str], Optional[str], str]]) -> None:
+        rows = list(rows)
+        self._conn.executemany(
+            "INSERT INTO plans (user_id, patient_code, payload) VALUES (?, ?, ?)",
+            rows,
+        )
+        self.count += len(rows)
+
+    def commit(self) -> None:
+        self._conn.executescript(_INDEXES)
+        self._conn.executemany(
+            "INSERT INTO meta (key, value) VALUES (?, ?)",
+            [
+                ("data_version", self.data_version),
+                ("built_at", str(time.time())),
+                ("count", str(self.count)),
+            ],
+        )
+        self._conn.commit()
+        self._conn.close()
+
+        os.replace(self.tmp_path, self.path)
+
+        logger.info(
+            "[PLAN_STORE_SAVED] path=%s data_version=%s count=%s",
+            self.path,
+            self.data_version,
+            self.count,
+        )
+
+    def abort(self) -> None:
+        self._conn.close()
+        self.tmp_path.unlink(missing_ok=True)
+
+
+class PlanStore:
+    """
+    预计算方案只读存储（sqlite，按 user_id / patient_code 索引）
+
+    每个线程持有独立的只读连接
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.version = _file_version(self.path)
+        self._local = threading.local()
+
+        meta = dict(self._connection().execute("SELECT key, value FROM meta"))
+        self.data_version = meta.get("data_version")
+        self.count = int(meta.get("count", 0))
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                f"file:{self.path}?mode=ro",
+                uri=True,
+                check_same_thread=False,
+            )
+            self._local.conn = conn
+        return conn
+
+    def get(self, user_id: str | None, patient_code: str | None) -> Optional[str]:
+        """
+        查找方案 payload（JSON 字符串）
+
+        与 find_user_row 语义一致：两个参数都提供时必须指向同一条记录
+        """
+
+        if user_id and patient_code:
+            sql = "SELECT payload FROM plans WHERE user_id = ? AND patient_code = ? LIMIT 1"
+            params: Tuple[str, ...] = (user_id, patient_code)
+        elif user_id:
+            sql = "SELECT payload FROM plans WHERE user_id = ? LIMIT 1"
+            params = (user_id,)
+        elif patient_code:
+            sql = "SELECT payload FROM plans WHERE patient_code = ? LIMIT 1"
+            params = (patient_code,)
+        else:
+            return None
+
+        row = self._connection().execute(sql, params).fetchone()
+        return row[0] if row else None
+
+
+def _file_version(path: Path) -> Tuple[int, int]:
+    stat = path.stat()
+    return stat.st_ino, stat.st_mtime_ns
+
+
+_store_lock = threading.Lock()
+_stores: Dict[str, PlanStore] = {}
+
+
+def get_plan_store(config: Dict[str, Any]) -> Optional[PlanStore]:
+    """
+    获取当前方案存储；文件被替换后自动重新打开，不存在时返回 None
+    """
+
+    path = resolve_plan_store_path(config)
+
+    try:
+        version = _file_version(path)
+    except FileNotFoundError:
+        return None
+
+    store = _stores.get(str(path))
+    if store is not None and store.version == version:
+        return store
+
+    with _store_lock:
+        store = _stores.get(str(path))
+        if store is None or store.version != version:
+            store = PlanStore(path)
+            _stores[str(path)] = store
+            # 快照版本被清理后对应的存储不再可达
+            for stale_path in [p for p in _stores if not Path(p).exists()]:
+                del _stores[stale_path]
+            logger.info(
+                "[PLAN_STORE_OPENED] path=%s data_version=%s count=%s",
+                path,
+                store.data_version,
+                store.count,
+            )
+
+    return store
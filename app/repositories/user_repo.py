@@ -0,0 +1,306 @@
+# app/repositories/user_repo.py
+
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from app.core.cognitive_l1.constants import (
+    CognitiveL1DatasetName,
+    UserTrainingColumnName,
+)
+from app.core.errors.error_codes import ErrorCode
+from app.core.errors.exceptions import BizError
+from app.core.metrics import CACHE_LOOKUPS
+from utils.dataframe_utils import ColumnAccessor, safe_get
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class UserProfileStore:
+    """
+    进程内常驻的用户脑能力数据
+
+    - 从 processed parquet 构建一次，按 user_id / patient_code 建立哈希索引
+    - 构建完成后只读，刷新时整体替换（见 refresh_user_profile_store）
+    """
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        cols: ColumnAccessor,
+        source_path: str | None = None,
+        build_seconds: float = 0.0,
+        source_version: Tuple[int, int] | None = None,
+    ):
+        self._df = df
+        self.cols = cols
+        self.source_path = source_path
+        # 构建时源文件的 (mtime_ns, size)
+        self.source_version = source_version
+        self.build_seconds = build_seconds
+        self.built_at = time.time()
+
+        self._user_id_index = self._build_index(df[cols.user_id])
+        self._patient_code_index = self._build_index(df[cols.patient_code])
+
+        self._stats_lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "UserProfileStore":
+        start = time.perf_counter()
+
+        source_path = str(config["task"]["user_brain_score"])
+        # 先取版本再读取：读取期间文件被替换时，下次访问会再次重建
+        source_version = _file_version(source_path)
+        df = pd.read_parquet(source_path)
+
+        with open(
+            config["column_mapping"][CognitiveL1DatasetName.USER_BRAIN_SCORE.value]
+        ) as f:
+            column_mapping = json.load(f)
+
+        cols = ColumnAccessor(column_mapping, UserTrainingColumnName)
+
+        store = cls(df=df, cols=cols, source_path=source_path, source_version=source_version)
+        # 包含索引构建耗时
+        store.build_seconds = time.perf_counter() - start
+
+        logger.info(
+            "[USER_PROFILE_STORE_BUILT] path=%s size=%s build_time=%.3fs",
+            source_path,
+            store.size,
+            store.build_seconds,
+        )
+
+        return store
+
+    @staticmethod
+    def _build_index(series: pd.Series) -> Dict[Any, int]:
+        # 与 df[df[col] == key].iloc[0] 保持一致：重复 key 取第一行
+        index: Dict[Any, int] = {}
+        for position, key in enumerate(series.tolist()):
+            if key is None or (isinstance(key, float) and pd.isna(key)):
+                continue
+            index.setdefault(key, position)
+        return index
+
+    @property
+    def size(self) -> int:
+        return len(self._df)
+
+    def _lookup_position(self, index: Dict[Any, int], key: Any) -> Optional[int]:
+        position = index.get(key)
+
+        with self._stats_lock:
+            if position is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+
+        CACHE_LOOKUPS.inc(cache="user_profile", result="miss" if position is None else "hit")
+        return position
+
+    def _lookup(self, index: Dict[Any, int], key: Any) -> Optional[pd.Series]:
+        position = self._lookup_position(index, key)
+
+        if position is None:
+            return None
+
+        return self._df.iloc[position]
+
+    def get_by_user_id(self, user_id: str) -> Optional[pd.Series]:
+        return self._lookup(self._user_id_index, user_id)
+
+    def get_by_patient_code(self, patient_code: str) -> Optional[pd.Series]:
+        return self._lookup(self._patient_code_index, patient_code)
+
+    def find_user_row(self, user_id: str | None, patient_code: str | None) -> pd.Series:
+        """
+        按 user_id / patient_code 查找用户行
+
+        - 两个参数都提供时必须指向同一人，否则 USER_ID_PATIENT_CODE_MISMATCH
+        - 只提供一个参数时按该参数查找，找不到则 USER_NOT_FOUND
+        """
+
+        return self._df.iloc[self.find_user_position(user_id, patient_code)]
+
+    def find_user_position(self, user_id: str | None, patient_code: str | None) -> int:
+        """
+        与 find_user_row 相同的查找与校验，返回行号（批量请求用 take 一次取出）
+        """
+
+        position_by_uid = (
+            self._lookup_position(self._user_id_index, user_id) if user_id else None
+        )
+        position_by_pid = (
+            self._lookup_position(self._patient_code_index, patient_code)
+            if patient_code
+            else None
+        )
+
+        if user_id and patient_code:
+            if position_by_uid is None or position_by_pid is None:
+                raise BizError(
+                    ErrorCode.USER_ID_PATIENT_CODE_MISMATCH,
+                    user_id=user_id,
+                    patient_code=patient_code,
+                )
+
+            # 是否同一人
+            if safe_get(self._df.iloc[position_by_uid], self.cols.patient_code) != safe_get(
+                self._df.iloc[position_by_pid], self.cols.patient_code
+            ):
+                raise BizError(
+                    ErrorCode.USER_ID_PATIENT_CODE_MISMATCH,
+                    user_id=user_id,
+                    patient_code=patient_code,
+                )
+
+            return position_by_uid
+
+        position = position_by_uid if position_by_uid is not None else position_by_pid
+
+        if position is None:
+            raise BizError(
+                ErrorCode.USER_NOT_FOUND,
+                user_id=user_id,
+                patient_code=patient_code,
+            )
+
+        return position
+
+    def take(self, positions: List[int]) -> pd.DataFrame:
+        """
+        按行号批量取出用户行
+        """
+
+        return self._df.iloc[positions]
+
+    def iter_identities(self) -> Iterator[Tuple[str | None, str | None]]:
+        """
+        遍历全部用户（user_id 去重；无 user_id 的行按 patient_code）
+
+        返回的标识可直接作为 find_user_row 的参数
+        """
+
+        user_ids = self._df[self.cols.user_id].tolist()
+        patient_codes = self._df[self.cols.patient_code].tolist()
+
+        for position, (user_id, patient_code) in enumerate(zip(user_ids, patient_codes)):
+            if self._user_id_index.get(user_id) == position:
+                yield user_id, None
+            elif user_id not in self._user_id_index and (
+                self._patient_code_index.get(patient_code) == position
+            ):
+                yield None, patient_code
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            hits = self._hits
+            misses = self._misses
+
+        return {
+            "source_path": self.source_path,
+            "size": self.size,
+            "build_seconds": round(self.build_seconds, 3),
+            "built_at": self.built_at,
+            "hits": hits,
+            "misses": misses,
+        }
+
+
+def _file_version(path: str) -> Tuple[int, int] | None:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _is_current(store: UserProfileStore | None, version: Tuple[int, int] | None) -> bool:
+    # 文件暂时不可读时继续使用已有 store
+    return store is not None and (version is None or store.source_version == version)
+
+
+# 按 source_path 保留最近构建的 store：数据版本切换期间，仍固定在旧版本的请求继续命中旧 store
+MAX_RESIDENT_STORES = 2
+
+_store_lock = threading.Lock()
+_stores: Dict[str, UserProfileStore] = {}
+_building: Dict[str, threading.Event] = {}
+
+
+def _install_store(store: UserProfileStore) -> None:
+    with _store_lock:
+        old_store = _stores.pop(store.source_path, None)
+        _stores[store.source_path] = store
+        # dict 保持插入顺序，淘汰最早构建的
+        while len(_stores) > MAX_RESIDENT_STORES:
+            _stores.pop(next(iter(_stores)))
+
+    if old_store is not None:
+        logger.info(
+            "[USER_PROFILE_STORE_SWAPPED] old_stats=%s new_size=%s",
+            old_store.stats(),
+            store.size,
+        )
+
+
+def get_user_profile_store(config: Dict[str, Any]) -> UserProfileStore:
+    """
+    获取当前进程的用户画像存储，首次调用、数据路径变化或源文件版本（mtime + size）变化时构建
+
+    构建在锁外进行；构建期间其它请求继续使用旧 store（同路径的旧版本优先）
+    """
+
+    source_path = str(config["task"]["user_brain_score"])
+    version = _file_version(source_path)
+    store = _stores.get(source_path)
+    if _is_current(store, version):
+        return store
+
+    with _store_lock:
+        store = _stores.get(source_path)
+        if _is_current(store, version):
+            return store
+
+        event = _building.get(source_path)
+        is_builder = event is None
+        if is_builder:
+            event = _building[source_path] = threading.Event()
+        fallback = store or next(reversed(_stores.values()), None)
+
+    if not is_builder:
+        if fallback is not None:
+            return fallback
+        # 进程内还没有任何 store，只能等待构建完成
+        event.wait()
+        return get_user_profile_store(config)
+
+    try:
+        store = UserProfileStore.from_config(config)
+        _install_store(store)
+        return store
+    finally:
+        with _store_lock:
+            _building.pop(source_path, None)
+        event.set()
+
+
+def refresh_user_profile_store(config: Dict[str, Any]) -> UserProfileStore:
+    """
+    重新构建用户画像存储并原子替换
+
+    新 store 在锁外构建，构建期间请求继续读取旧 store
+    """
+
+    new_store = UserProfileStore.from_config(config)
+    _install_store(new_store)
+    return new_store
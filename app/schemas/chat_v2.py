@@ -93,3 +93,76 @@ class AIRecPlanResponseV2(BaseModel):
         title="结构化训练方案数据",
         description="AI生成的结构化训练方案内容",
     )
+
+
+class AIRecPlanBatchItemV2(BaseModel):
+    """
+    批量请求中的单个用户标识（不在此处校验，缺失标识按单项错误返回）
+    """
+
+    user_id: Optional[str] = Field(
+        None,
+        title="用户ID",
+        description="平台内唯一用户标识",
+    )
+    patient_code: Optional[str] = Field(
+        None,
+        title="患者编码",
+        description="患者唯一业务编码",
+    )
+
+
+class AIRecPlanBatchRequestV2(BaseModel):
+    items: List[AIRecPlanBatchItemV2] = Field(
+        ...,
+        min_length=1,
+        title="用户列表",
+        description="需要生成方案的用户标识列表",
+    )
+    stream: bool = Field(
+        False,
+        title="流式返回",
+        description="为 true 时按 NDJSON 逐行返回每个用户的结果",
+    )
+
+
+class BatchItemErrorV2(BaseModel):
+    code: str = Field(..., title="错误码")
+    message: str = Field(..., title="错误信息")
+
+
+class AIRecPlanBatchItemResultV2(BaseModel):
+    index: int = Field(..., title="请求序号", description="对应 items 中的位置")
+    user_id: Optional[str] = Field(None, title="用户ID")
+    patient_code: Optional[str] = Field(None, title="患者编码")
+    success: bool = Field(..., title="是否成功")
+    data: Optional[AIRecPlanResponseV2] = Field(
+        None,
+        title="方案",
+        description="成功时的 v2 方案响应",
+    )
+    error: Optional[BatchItemErrorV2] = Field(
+        None,
+        title="错误",
+        description="失败时的业务错误码与信息",
+    )
+
+
+class BatchResponseMetaV2(BaseModel):
+    version: str = Field(..., title="接口版本")
+    total: int = Field(..., title="请求数量")
+    succeeded: int = Field(..., title="成功数量")
+    failed: int = Field(..., title="失败数量")
+
+
+class AIRecPlanBatchResponseV2(BaseModel):
+    meta: BatchResponseMetaV2 = Field(
+        ...,
+        title="元信息",
+        description="批量请求统计",
+    )
+    results: List[AIRecPlanBatchItemResultV2] = Field(
+        ...,
+        title="结果列表",
+        description="与 items 顺序一致的单项结果",
+    )
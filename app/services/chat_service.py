@@ -1,7 +1,23 @@
 # app/services/chat_service.py
-from typing import Any, Dict, Tuple
+import time
+from collections import defaultdict
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Tuple
 
 from app.core.constants import UserType
+from app.core.errors.error_codes import ErrorCode
+from app.core.errors.error_messages import ERROR_MESSAGES
+from app.core.errors.exceptions import BizError
+from app.core.metrics import BIZ_ERRORS, CACHE_LOOKUPS
+from app.core.sync_state import compute_data_version
+from app.core.timing import stage
+from app.repositories.plan_repo import (
+    PlanStore,
+    PlanStoreWriter,
+    get_plan_store,
+    resolve_plan_store_path,
+)
+from app.repositories.user_repo import get_user_profile_store
 from app.schemas.chat import (
     AIRecPlanData,
     AIRecPlanRequest,
@@ -9,20 +25,25 @@ from app.schemas.chat import (
     L2AbilityDistributionBlock,
 )
 from app.schemas.chat_v2 import (
+    AIRecPlanBatchItemResultV2,
+    AIRecPlanBatchItemV2,
     AIRecPlanResponseV2,
     AIRecPlanV2,
     HomeAdviceSection,
+    BatchItemErrorV2,
     ResponseMetaV2,
     TrainingPlanSection,
     TrainingTipsSection,
 )
 from app.services.plan_rule_engine import (
+    attach_domain_histories,
     build_L2_brain_ability_treemap,
     build_advantage_user_modules,
     build_growth_user_modules,
     build_l1_task_map,
     build_potential_user_modules,
     build_score_prediction,
+    build_score_predictions_batch,
     build_special_user_modules,
     enrich_profile_with_user_type,
     enrich_user_profile_with_brain_distribution,
@@ -35,7 +56,11 @@ from app.services.task_processor import (
     build_level2_to_level1_map,
     get_task_repository,
 )
-from app.services.user_processor import fetch_user_profile
+from app.services.user_processor import (
+    extract_domain_histories_batch,
+    fetch_user_profile,
+    fetch_user_profiles_batch,
+)
 from llm.base import BaseLLM
 
 from utils.logger import get_logger
@@ -53,6 +78,8 @@ TRAINING_TIPS_ITEMS_V2 = [
 ]
 
 
+PLAN_STORE_WRITE_BATCH = 500
+
 USER_TYPE_MODULE_BUILDER = {
     UserType.ADVANTAGE: build_advantage_user_modules,
     UserType.POTENTIAL: build_potential_user_modules,
@@ -85,20 +112,253 @@ def generate_ai_plan_v2(
     model_manager: ModelManager,
     config: Dict[str, Any],
 ) -> AIRecPlanResponseV2:
+    if config.get("plan_store", {}).get("enabled", False):
+        with stage("plan_store_lookup"):
+            precomputed = load_precomputed_ai_plan_v2(req, config)
+        if precomputed is not None:
+            return precomputed
+
     profile, plan_data = build_ai_plan_content_v2(
         req=req,
         model_manager=model_manager,
         config=config,
     )
 
-    return AIRecPlanResponseV2(
-        meta=ResponseMetaV2(
-            version="v2",
-            user_id=profile.get("user_id"),
-            patient_code=profile.get("patient_code"),
-        ),
-        plan=plan_data,
+    return _build_response_v2(profile, plan_data)
+
+
+def load_precomputed_ai_plan_v2(
+    req: AIRecPlanRequest,
+    config: Dict[str, Any],
+) -> AIRecPlanResponseV2 | None:
+    """
+    从预计算方案存储读取 v2 方案
+
+    存储不存在、未命中或数据版本与当前不一致时返回 None，由调用方实时计算
+    """
+
+    store = _get_current_plan_store(config)
+    if store is None:
+        return None
+
+    return _load_from_plan_store(store, req)
+
+
+def _get_current_plan_store(config: Dict[str, Any]) -> PlanStore | None:
+    """
+    返回数据版本与当前一致的方案存储，否则 None
+    """
+
+    store = get_plan_store(config)
+    if store is None:
+        CACHE_LOOKUPS.inc(cache="plan_store", result="unavailable")
+        return None
+
+    data_version = compute_data_version(config)
+    if store.data_version != data_version:
+        CACHE_LOOKUPS.inc(cache="plan_store", result="stale")
+        logger.debug(
+            "[PLAN_STORE_STALE] store_version=%s current_version=%s",
+            store.data_version,
+            data_version,
+        )
+        return None
+
+    return store
+
+
+def _load_from_plan_store(
+    store: PlanStore,
+    req: AIRecPlanRequest,
+) -> AIRecPlanResponseV2 | None:
+    payload = store.get(req.user_id, req.patient_code)
+    CACHE_LOOKUPS.inc(cache="plan_store", result="miss" if payload is None else "hit")
+    if payload is None:
+        logger.debug(
+            "[PLAN_STORE_MISS] user_id=%s patient_code=%s",
+            req.user_id,
+            req.patient_code,
+        )
+        return None
+
+    logger.debug(
+        "[PLAN_STORE_HIT] user_id=%s patient_code=%s",
+        req.user_id,
+        req.patient_code,
     )
+    return AIRecPlanResponseV2.model_validate_json(payload)
+
+
+def resolve_batch_chunk_size(config: Dict[str, Any]) -> int:
+    return max(1, int(config.get("chat_batch", {}).get("chunk_size", 200)))
+
+
+def generate_ai_plans_v2_batch(
+    items: List[AIRecPlanBatchItemV2],
+    model_manager: ModelManager,
+    config: Dict[str, Any],
+) -> Iterator[AIRecPlanBatchItemResultV2]:
+    """
+    批量生成 v2 方案，按输入顺序逐个产出结果
+
+    - 每 chat_batch.chunk_size 个用户为一批（见 generate_ai_plans_v2_chunk）
+    - 单个用户的业务错误只影响该用户，以错误码返回
+    """
+
+    chunk_size = resolve_batch_chunk_size(config)
+
+    for chunk_start in range(0, len(items), chunk_size):
+        yield from generate_ai_plans_v2_chunk(
+            items[chunk_start:chunk_start + chunk_size],
+            chunk_start,
+            model_manager,
+            config,
+        )
+
+
+def generate_ai_plans_v2_chunk(
+    chunk: List[AIRecPlanBatchItemV2],
+    chunk_start: int,
+    model_manager: ModelManager,
+    config: Dict[str, Any],
+) -> List[AIRecPlanBatchItemResultV2]:
+    """
+    处理一批用户：用户行一次取出，历史序列按列提取，分数预测每个模型只 predict 一次
+
+    chunk_start 为该批在整个请求中的起始下标
+    """
+
+    use_plan_store = config.get("plan_store", {}).get("enabled", False)
+    store = _get_current_plan_store(config) if use_plan_store else None
+
+    outcomes: List[AIRecPlanResponseV2 | Exception | None] = [None] * len(chunk)
+    pending: List[int] = []
+    pending_reqs: List[AIRecPlanRequest] = []
+
+    for i, item in enumerate(chunk):
+        try:
+            req = AIRecPlanRequest(user_id=item.user_id, patient_code=item.patient_code)
+        except BizError as e:
+            outcomes[i] = e
+            continue
+
+        precomputed = _load_from_plan_store(store, req) if store is not None else None
+        if precomputed is not None:
+            outcomes[i] = precomputed
+            continue
+
+        pending.append(i)
+        pending_reqs.append(req)
+
+    for i, outcome in zip(
+        pending,
+        build_ai_plan_contents_v2_batch(pending_reqs, model_manager, config),
+    ):
+        if isinstance(outcome, Exception):
+            outcomes[i] = outcome
+            continue
+
+        profile, plan_data = outcome
+        outcomes[i] = _build_response_v2(profile, plan_data)
+
+    return [
+        _build_batch_item_result(chunk_start + i, item, outcome)
+        for i, (item, outcome) in enumerate(zip(chunk, outcomes))
+    ]
+
+
+def _build_batch_item_result(
+    index: int,
+    item: AIRecPlanBatchItemV2,
+    outcome: AIRecPlanResponseV2 | Exception,
+) -> AIRecPlanBatchItemResultV2:
+    result = AIRecPlanBatchItemResultV2(
+        index=index,
+        user_id=item.user_id,
+        patient_code=item.patient_code,
+        success=isinstance(outcome, AIRecPlanResponseV2),
+    )
+
+    if isinstance(outcome, AIRecPlanResponseV2):
+        result.data = outcome
+    elif isinstance(outcome, BizError):
+        BIZ_ERRORS.inc(code=outcome.code.value)
+        result.error = BatchItemErrorV2(code=outcome.code.value, message=outcome.message)
+    else:
+        result.error = BatchItemErrorV2(
+            code=ErrorCode.INTERNAL_ERROR.value,
+            message=ERROR_MESSAGES[ErrorCode.INTERNAL_ERROR],
+        )
+
+    return result
+
+
+def precompute_ai_plans_v2(
+    config: Dict[str, Any],
+    model_manager: ModelManager,
+) -> Dict[str, Any]:
+    """
+    为全部用户预计算 v2 方案并写入方案存储
+
+    无法生成方案的用户（如新用户历史不足）跳过，请求时按实时计算返回对应错误
+    """
+
+    start = time.perf_counter()
+    plan_store_cfg = config.get("plan_store", {})
+    max_users = plan_store_cfg.get("max_users")
+
+    data_version = compute_data_version(config)
+    user_store = get_user_profile_store(config)
+    writer = PlanStoreWriter(resolve_plan_store_path(config), data_version)
+
+    skipped: Dict[str, int] = defaultdict(int)
+    identities = [
+        AIRecPlanBatchItemV2(user_id=user_id, patient_code=patient_code)
+        for user_id, patient_code in islice(
+            user_store.iter_identities(),
+            int(max_users) if max_users is not None else None,
+        )
+    ]
+
+    try:
+        rows = []
+        for result in generate_ai_plans_v2_batch(
+            identities,
+            model_manager=model_manager,
+            config={**config, "plan_store": {"enabled": False}},
+        ):
+            if not result.success:
+                skipped[result.error.code] += 1
+                continue
+
+            rows.append(
+                (
+                    result.data.meta.user_id,
+                    result.data.meta.patient_code,
+                    result.data.model_dump_json(),
+                )
+            )
+
+            if len(rows) >= PLAN_STORE_WRITE_BATCH:
+                writer.write_many(rows)
+                rows = []
+
+        writer.write_many(rows)
+        writer.commit()
+
+    except Exception:
+        writer.abort()
+        raise
+
+    summary = {
+        "data_version": data_version,
+        "count": writer.count,
+        "skipped": dict(skipped),
+        "duration": round(time.perf_counter() - start, 3),
+    }
+    logger.info("[PLAN_PRECOMPUTE_DONE] %s", summary)
+
+    return summary
 
 
 def build_ai_plan_content_v1(
@@ -107,37 +367,46 @@ def build_ai_plan_content_v1(
     model_manager: ModelManager,
     config: Dict[str, Any],
 ) -> Tuple[AIRecPlanData, str]:
-    task_repo = get_task_repository(config=config)
-    profile = fetch_user_profile(req.user_id, req.patient_code, config=config)
-
-    profile = enrich_user_profile_with_tasks(profile, task_repo)
-    profile = enrich_user_profile_with_brain_distribution(
-        profile, profile.get("last_84_days_task"), task_repo
-    )
-    profile = enrich_user_profile_with_domain_histories(profile, config=config)
+    with stage("get_task_repository"):
+        task_repo = get_task_repository(config=config)
+    with stage("fetch_user_profile"):
+        profile = fetch_user_profile(req.user_id, req.patient_code, config=config)
+
+    with stage("enrich_tasks"):
+        profile = enrich_user_profile_with_tasks(profile, task_repo)
+    with stage("enrich_brain_distribution"):
+        profile = enrich_user_profile_with_brain_distribution(
+            profile, profile.get("last_84_days_task"), task_repo
+        )
+    with stage("enrich_domain_histories"):
+        profile = enrich_user_profile_with_domain_histories(profile, config=config)
     profile = enrich_profile_with_user_type(profile)
 
     fixed_templates = get_fixed_templates(profile)
     level2_to_level1 = build_level2_to_level1_map(task_repo)
 
-    recommended_tasks, l2_stats = build_L2_brain_ability_treemap(
-        profile,
-        profile["latest_level1_scores"],
-        task_repo,
-    )
+    with stage("build_l2_treemap"):
+        recommended_tasks, l2_stats = build_L2_brain_ability_treemap(
+            profile,
+            profile["latest_level1_scores"],
+            task_repo,
+            config=config,
+        )
 
     l1_task_map = build_l1_task_map(recommended_tasks)
 
     user_type: UserType = profile["user_type"]
 
     module_builder = USER_TYPE_MODULE_BUILDER.get(user_type, build_growth_user_modules)
-    modules = module_builder(profile, level2_to_level1, llm, l1_task_map)
+    with stage("build_modules"):
+        modules = module_builder(profile, level2_to_level1, llm, l1_task_map)
 
-    score_prediction = build_score_prediction(
-        profile,
-        model_manager,
-        config=config,
-    )
+    with stage("build_score_prediction"):
+        score_prediction = build_score_prediction(
+            profile,
+            model_manager,
+            config=config,
+        )
 
     # 构建核心数据对象
     plan_data = AIRecPlanData(
@@ -163,30 +432,136 @@ def build_ai_plan_content_v2(
     model_manager: ModelManager,
     config: Dict[str, Any],
 ) -> Tuple[Dict[str, Any], AIRecPlanV2]:
-    task_repo = get_task_repository(config=config)
-    profile = fetch_user_profile(req.user_id, req.patient_code, config=config)
-
-    profile = enrich_user_profile_with_tasks(profile, task_repo)
-    profile = enrich_user_profile_with_brain_distribution(
-        profile, profile.get("last_84_days_task"), task_repo
-    )
-    profile = enrich_user_profile_with_domain_histories(profile, config=config)
+    with stage("get_task_repository"):
+        task_repo = get_task_repository(config=config)
+    with stage("fetch_user_profile"):
+        profile = fetch_user_profile(req.user_id, req.patient_code, config=config)
+
+    with stage("enrich_tasks"):
+        profile = enrich_user_profile_with_tasks(profile, task_repo)
+    with stage("enrich_brain_distribution"):
+        profile = enrich_user_profile_with_brain_distribution(
+            profile, profile.get("last_84_days_task"), task_repo
+        )
+    with stage("enrich_domain_histories"):
+        profile = enrich_user_profile_with_domain_histories(profile, config=config)
     profile = enrich_profile_with_user_type(profile)
 
-    _, l2_stats = build_L2_brain_ability_treemap(
-        profile,
-        profile["latest_level1_scores"],
-        task_repo,
-    )
+    with stage("build_l2_treemap"):
+        _, l2_stats = build_L2_brain_ability_treemap(
+            profile,
+            profile["latest_level1_scores"],
+            task_repo,
+            config=config,
+            with_tasks=False,
+        )
+
+    with stage("build_score_prediction"):
+        score_prediction = build_score_prediction(
+            profile,
+            model_manager,
+            config=config,
+        )
 
+    return profile, _build_plan_v2(l2_stats, score_prediction)
 
-    score_prediction = build_score_prediction(
-        profile,
-        model_manager,
+
+def build_ai_plan_contents_v2_batch(
+    reqs: List[AIRecPlanRequest],
+    model_manager: ModelManager,
+    config: Dict[str, Any],
+) -> List[Tuple[Dict[str, Any], AIRecPlanV2] | Exception]:
+    """
+    build_ai_plan_content_v2 的批量版本，结果与 reqs 一一对应，失败项为异常对象
+    """
+
+    if not reqs:
+        return []
+
+    task_repo = get_task_repository(config=config)
+    user_store = get_user_profile_store(config)
+    max_history_len = int(
+        config.get("score_prediction", {}).get("max_history_len", 12)
+    )
+
+    outcomes, frame, found = fetch_user_profiles_batch(
+        [(req.user_id, req.patient_code) for req in reqs],
         config=config,
     )
+    domain_histories = extract_domain_histories_batch(
+        frame, user_store.cols, max_history_len
+    )
 
-    plan_data_v2 = AIRecPlanV2(
+    ready: List[int] = []
+    l2_stats_list = []
+
+    for i, histories in zip(found, domain_histories):
+        try:
+            profile = enrich_user_profile_with_tasks(outcomes[i], task_repo)
+            profile = enrich_user_profile_with_brain_distribution(
+                profile, profile.get("last_84_days_task"), task_repo
+            )
+            profile = attach_domain_histories(profile, histories, config)
+            profile = enrich_profile_with_user_type(profile)
+
+            _, l2_stats = build_L2_brain_ability_treemap(
+                profile,
+                profile["latest_level1_scores"],
+                task_repo,
+                config=config,
+                with_tasks=False,
+            )
+        except Exception as e:
+            if not isinstance(e, BizError):
+                logger.exception(
+                    "[CHAT_BATCH_ITEM_FAILED] user_id=%s patient_code=%s",
+                    reqs[i].user_id,
+                    reqs[i].patient_code,
+                )
+            outcomes[i] = e
+            continue
+
+        outcomes[i] = profile
+        ready.append(i)
+        l2_stats_list.append(l2_stats)
+
+    try:
+        score_predictions = build_score_predictions_batch(
+            [outcomes[i] for i in ready],
+            model_manager,
+            config=config,
+        )
+    except Exception as e:
+        # 批量失败时逐个用户回退，只有预测失败的用户记为失败项
+        logger.warning(
+            "[CHAT_BATCH_SCORE_PREDICTION_FALLBACK] size=%s error=%s", len(ready), e
+        )
+        score_predictions = []
+        for i in ready:
+            try:
+                score_predictions.append(
+                    build_score_prediction(outcomes[i], model_manager, config=config)
+                )
+            except Exception as item_error:
+                if not isinstance(item_error, BizError):
+                    logger.exception(
+                        "[CHAT_BATCH_ITEM_FAILED] user_id=%s patient_code=%s",
+                        reqs[i].user_id,
+                        reqs[i].patient_code,
+                    )
+                score_predictions.append(item_error)
+
+    for i, l2_stats, score_prediction in zip(ready, l2_stats_list, score_predictions):
+        if isinstance(score_prediction, Exception):
+            outcomes[i] = score_prediction
+            continue
+        outcomes[i] = (outcomes[i], _build_plan_v2(l2_stats, score_prediction))
+
+    return outcomes
+
+
+def _build_plan_v2(l2_stats, score_prediction) -> AIRecPlanV2:
+    return AIRecPlanV2(
         training_plan_section=TrainingPlanSection(
             score_prediction=score_prediction,
             l2_block=L2AbilityDistributionBlock(
@@ -197,4 +572,13 @@ def build_ai_plan_content_v2(
         training_tips_section=TrainingTipsSection(items=TRAINING_TIPS_ITEMS_V2),
     )
 
-    return profile, plan_data_v2
+
+def _build_response_v2(profile: Dict[str, Any], plan_data: AIRecPlanV2) -> AIRecPlanResponseV2:
+    return AIRecPlanResponseV2(
+        meta=ResponseMetaV2(
+            version="v2",
+            user_id=profile.get("user_id"),
+            patient_code=profile.get("patient_code"),
+        ),
+        plan=plan_data,
+    )
@@ -1,11 +1,14 @@
 import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
 import pandas as pd
 import numpy as np
 
-from typing import Any, Dict
+from typing import Dict, Tuple
 
 from sympy import Number
 
@@ -17,13 +20,15 @@ from app.core.cognitive_l1.constants import (
     MAX_HISTORY_WEEKS,
     UserTrainingColumnName,
 )
-from app.services.plan_rule_engine import build_L2_brain_ability_treemap, build_l2_distribution_from_tasks, enrich_user_profile_with_brain_distribution
+from app.services.plan_rule_engine import build_L2_brain_ability_treemap, build_expected_l2_distribution_for_profile, build_l2_distribution_from_tasks, enrich_user_profile_with_brain_distribution
 from app.services.task_processor import build_task_infos, get_task_repository
 from app.services.user_processor import _build_level1_scores
+from app.core.registry import ResourceRegistry
 from configs.loader import load_config
 
 from utils.dataframe_utils import ColumnAccessor, safe_get
 from utils.logger import get_logger
+from utils.text_utils import parse_age_value
 from utils.metrics_utils import (
     compute_kl_from_distributions,
     compute_l1_from_distributions,
@@ -37,8 +42,28 @@ class EvaluationService:
     ROUND_DIGITS = 3
     L2_SIZE = len(Level2BrainDomain)
 
-    def __init__(self, config: dict | None = None):
-        self.config = config or load_config()
+    def __init__(
+        self,
+        config: dict | None = None,
+        registry: ResourceRegistry | None = None,
+    ):
+        self.registry = registry
+        self.config = registry.config if registry is not None else (config or load_config())
+
+    def _column_mapping(self) -> dict:
+        if self.registry is not None:
+            return self.registry.column_mapping(CognitiveL1DatasetName.USER_BRAIN_SCORE)
+
+        with open(
+            self.config["column_mapping"][CognitiveL1DatasetName.USER_BRAIN_SCORE.value]
+        ) as f:
+            return json.load(f)
+
+    def _column_accessor(self) -> ColumnAccessor:
+        if self.registry is not None:
+            return self.registry.column_accessor(CognitiveL1DatasetName.USER_BRAIN_SCORE)
+
+        return ColumnAccessor(self._column_mapping(), UserTrainingColumnName)
 
     def evaluate_all_users(self) -> dict:
         """统计 train_eval_dataset 中两段任务列表的数量差异比。"""
@@ -59,24 +84,101 @@ class EvaluationService:
             max_ratio=max_ratio,
         )
 
-        task_repo = get_task_repository(config=self.config)
-        with open(
-            self.config["column_mapping"][CognitiveL1DatasetName.USER_BRAIN_SCORE.value]
-        ) as f:
-            column_mapping = json.load(f)
+        task_repo = (
+            self.registry.task_repository()
+            if self.registry is not None
+            else get_task_repository(config=self.config)
+        )
+        parallel_cfg = evaluation_cfg.get("parallel", {})
+        base_seed = resolve_evaluation_seed(self.config)
+
+        if parallel_cfg.get("enabled", False) and len(filtered_df) > 0:
+            metric_results, l2_distribution_diff_records = self._evaluate_parallel(
+                filtered_df,
+                task_repo=task_repo,
+                column_mapping=self._column_mapping(),
+                metric_names=metric_names,
+                base_seed=base_seed,
+                workers=int(parallel_cfg.get("workers", os.cpu_count() or 1)),
+                chunk_size=int(parallel_cfg.get("chunk_size", 500)),
+            )
+        else:
+            metric_results, l2_distribution_diff_records = self._evaluate_rows(
+                filtered_df,
+                start_position=0,
+                task_repo=task_repo,
+                cols=self._column_accessor(),
+                metric_names=metric_names,
+                base_seed=base_seed,
+            )
+
+        metrics_df = pd.DataFrame(metric_results)
+        metrics_summary = self._build_metric_summaries(
+            metrics_df,
+            metric_names,
+        )
+        task_hit_summary = self._build_task_hit_summary(metrics_df)
+        l2_distribution_diff_summary = self._build_l2_distribution_diff_summary(
+            l2_distribution_diff_records
+        )
+
+        result = {
+            "total_users": len(filtered_df),
+            "computed_users": len(metrics_df),
+            "skipped_users": len(filtered_df) - len(metrics_df),
+            "min_ratio": min_ratio,
+            "max_ratio": max_ratio,
+            "metric_names": metric_names,
+            "metrics_summary": metrics_summary,
+            "task_hit_summary": task_hit_summary,
+            "l2_distribution_diff_summary": l2_distribution_diff_summary,
+        }
+        response_result = (
+            result
+            if developer_view
+            else self._build_external_result(result)
+        )
+
+        self._save_evaluation_result(
+            result=result,
+            metrics_df=metrics_df,
+            output_cfg=evaluation_cfg.get("output", {}),
+        )
+
+        logger.info(
+            "[EVALUATE_ALL_USERS] metrics_summary=%s computed_users=%s skipped_users=%s",
+            metrics_summary,
+            len(metrics_df),
+            len(filtered_df) - len(metrics_df),
+        )
+
+        return response_result
+
+    def _evaluate_rows(
+        self,
+        rows_df: pd.DataFrame,
+        *,
+        start_position: int,
+        task_repo: dict,
+        cols: ColumnAccessor,
+        metric_names: list[str],
+        base_seed: int | None,
+    ) -> Tuple[list[dict], list[dict]]:
+        """
+        逐用户计算推荐指标与 L2 分布差异记录
+
+        start_position 为 rows_df 首行在完整数据集中的位置，用于派生每个用户的采样 seed，
+        保证串行与分片并行结果一致
+        """
 
-        cols = ColumnAccessor(column_mapping, UserTrainingColumnName)
         metric_results = []
         l2_distribution_diff_records = []
 
-        for _, user_row in filtered_df.iterrows():
+        for offset, (_, user_row) in enumerate(rows_df.iterrows()):
             user_id = str(safe_get(user_row, cols.user_id))
 
             try:
-                profile = self._fetch_user_profile(
-                    user_row,
-                    config=self.config,
-                )
+                profile = self._fetch_user_profile(user_row, cols)
                 profile["last_84_days_task_infos"] = build_task_infos(
                     profile["last_84_days_task"],
                     task_repo,
@@ -90,7 +192,9 @@ class EvaluationService:
                     profile,
                     profile["last_84d_latest_level1_scores"],
                     task_repo,
-                    k=len(profile["last_84_days_task_infos"])
+                    k=len(profile["last_84_days_task_infos"]),
+                    config=self.config,
+                    seed=derive_user_seed(base_seed, start_position + offset),
                 )
 
                 ground_truth_l2_distribution = build_l2_distribution_from_tasks(
@@ -99,10 +203,21 @@ class EvaluationService:
                 pred_l2_distribution = build_l2_distribution_from_tasks(
                     recommended_tasks
                 )
+                expected_l2_distribution = (
+                    build_expected_l2_distribution_for_profile(
+                        profile,
+                        profile["last_84d_latest_level1_scores"],
+                        task_repo,
+                        k=len(profile["last_84_days_task_infos"]),
+                    )
+                    if "expected_kl_value" in metric_names
+                    else None
+                )
                 user_metric_result = self._compute_recommendation_metrics(
                     metric_names,
                     ground_truth_l2_distribution,
                     pred_l2_distribution,
+                    expected_l2_distribution,
                 )
                 l2_distribution_diff_records.extend(
                     self._build_l2_distribution_diff_records(
@@ -130,47 +245,62 @@ class EvaluationService:
                 }
             )
 
-        metrics_df = pd.DataFrame(metric_results)
-        metrics_summary = self._build_metric_summaries(
-            metrics_df,
-            metric_names,
-        )
-        task_hit_summary = self._build_task_hit_summary(metrics_df)
-        l2_distribution_diff_summary = self._build_l2_distribution_diff_summary(
-            l2_distribution_diff_records
-        )
+        return metric_results, l2_distribution_diff_records
 
-        result = {
-            "total_users": len(filtered_df),
-            "computed_users": len(metrics_df),
-            "skipped_users": len(filtered_df) - len(metrics_df),
-            "min_ratio": min_ratio,
-            "max_ratio": max_ratio,
-            "metric_names": metric_names,
-            "metrics_summary": metrics_summary,
-            "task_hit_summary": task_hit_summary,
-            "l2_distribution_diff_summary": l2_distribution_diff_summary,
-        }
-        response_result = (
-            result
-            if developer_view
-            else self._build_external_result(result)
-        )
+    def _evaluate_parallel(
+        self,
+        filtered_df: pd.DataFrame,
+        *,
+        task_repo: dict,
+        column_mapping: dict,
+        metric_names: list[str],
+        base_seed: int | None,
+        workers: int,
+        chunk_size: int,
+    ) -> Tuple[list[dict], list[dict]]:
+        """
+        按行区间分片到进程池计算，任务仓库通过 initializer 在每个 worker 中只传一次，
+        分片结果按原始顺序合并
+        """
 
-        self._save_evaluation_result(
-            result=result,
-            metrics_df=metrics_df,
-            output_cfg=evaluation_cfg.get("output", {}),
-        )
+        chunk_size = max(1, chunk_size)
+        shards = [
+            (start, filtered_df.iloc[start:start + chunk_size])
+            for start in range(0, len(filtered_df), chunk_size)
+        ]
+        workers = max(1, min(workers, len(shards)))
 
         logger.info(
-            "[EVALUATE_ALL_USERS] metrics_summary=%s computed_users=%s skipped_users=%s",
-            metrics_summary,
-            len(metrics_df),
-            len(filtered_df) - len(metrics_df),
+            "[EVALUATE_ALL_USERS] parallel users=%s shards=%s workers=%s",
+            len(filtered_df),
+            len(shards),
+            workers,
         )
 
-        return response_result
+        # spawn：API 进程中有线程池 / 调度器线程，fork 可能复制持有中的锁
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_evaluation_worker,
+            initargs=(self.config, task_repo, column_mapping),
+        ) as executor:
+            partials = list(
+                executor.map(
+                    _evaluate_shard,
+                    [start for start, _ in shards],
+                    [shard for _, shard in shards],
+                    [metric_names] * len(shards),
+                    [base_seed] * len(shards),
+                )
+            )
+
+        metric_results = []
+        l2_distribution_diff_records = []
+        for shard_metric_results, shard_diff_records in partials:
+            metric_results.extend(shard_metric_results)
+            l2_distribution_diff_records.extend(shard_diff_records)
+
+        return metric_results, l2_distribution_diff_records
 
     def evaluate_single_user(self, user_id: str) -> dict:
         """单用户评估"""
@@ -246,15 +376,10 @@ class EvaluationService:
         if not dataset_path.exists():
             raise FileNotFoundError(f"Dataset file not found: {dataset_path}")
 
-        with open(
-            self.config["column_mapping"][CognitiveL1DatasetName.USER_BRAIN_SCORE.value]
-        ) as f:
-            column_mapping = json.load(f)
-
         df = pd.read_parquet(dataset_path)
         analysis_result = self._analyze_task_count_comparison(
             df=df,
-            column_mapping=column_mapping,
+            column_mapping=self._column_mapping(),
             metrics_cfg=metrics_cfg,
         )
         analyzed_df = analysis_result["df"]
@@ -387,6 +512,7 @@ class EvaluationService:
         metric_names: list[str],
         ground_truth_l2_distribution: list[dict],
         pred_l2_distribution: list[dict],
+        expected_l2_distribution: list[dict] | None = None,
     ) -> dict:
         metrics = {}
 
@@ -409,6 +535,16 @@ class EvaluationService:
                     EvaluationService.ROUND_DIGITS,
                 )
                 continue
+            if metric_name == "expected_kl_value":
+                # 期望分布（无采样噪声）与真实分布的 KL，与 kl_value（采样输出）对比
+                metrics[metric_name] = round(
+                    compute_kl_from_distributions(
+                        ground_truth_l2_distribution,
+                        expected_l2_distribution or [],
+                    ),
+                    EvaluationService.ROUND_DIGITS,
+                )
+                continue
 
             raise ValueError(f"Unsupported recommendation metric: {metric_name}")
 
@@ -636,18 +772,11 @@ class EvaluationService:
             metrics_df.to_parquet(details_path, index=False)
 
     @staticmethod
-    def _fetch_user_profile(user_row: pd.Series, config: Dict[str, Any]) -> Dict:
+    def _fetch_user_profile(user_row: pd.Series, cols: ColumnAccessor) -> Dict:
         """
         从 patient 数据中读取用户画像（优化版）
         """
 
-        with open(
-            config["column_mapping"][CognitiveL1DatasetName.USER_BRAIN_SCORE.value]
-        ) as f:
-            COLUMN_MAPPING = json.load(f)
-
-        cols = ColumnAccessor(COLUMN_MAPPING, UserTrainingColumnName)
-
         latest_level1_scores = {
             Level1BrainDomain.MEMORY.value: safe_get(user_row, cols.latest_memory),
             Level1BrainDomain.EXECUTIVE.value: safe_get(user_row, cols.latest_executive),
@@ -668,6 +797,7 @@ class EvaluationService:
             "user_id": safe_get(user_row, cols.user_id),
             "patient_code": safe_get(user_row, cols.patient_code),
             "age": safe_get(user_row, cols.age),
+            "age_value": parse_age_value(safe_get(user_row, cols.age)),
             "disease_tag": safe_get(user_row, cols.disease),
             "latest_level1_scores": latest_level1_scores,
             "last_84d_latest_level1_scores": last_84d_latest_level1_scores,
@@ -683,3 +813,54 @@ class EvaluationService:
             )
 
         return profile
+
+
+def resolve_evaluation_seed(config: dict) -> int | None:
+    """
+    评估的基础 seed：recommendation_evaluation.random_state，未设置时取 l2_treemap.random_state
+
+    两者都未设置时返回 None（不固定采样）
+    """
+
+    seed = config.get("recommendation_evaluation", {}).get("random_state")
+    if seed is None:
+        seed = config.get("l2_treemap", {}).get("random_state")
+    return seed
+
+
+def derive_user_seed(base_seed: int | None, position: int) -> int | None:
+    """
+    由评估 seed 与用户在数据集中的位置派生独立的采样 seed（与分片方式无关）
+    """
+
+    if base_seed is None:
+        return None
+
+    return int(np.random.SeedSequence([int(base_seed), position]).generate_state(1)[0])
+
+
+# 进程池 worker 内的共享状态（initializer 写入一次）
+_worker_state: Dict[str, object] = {}
+
+
+def _init_evaluation_worker(config: dict, task_repo: dict, column_mapping: dict) -> None:
+    _worker_state["service"] = EvaluationService(config=config)
+    _worker_state["task_repo"] = task_repo
+    _worker_state["cols"] = ColumnAccessor(column_mapping, UserTrainingColumnName)
+
+
+def _evaluate_shard(
+    start_position: int,
+    rows_df: pd.DataFrame,
+    metric_names: list[str],
+    base_seed: int | None,
+) -> Tuple[list[dict], list[dict]]:
+    service: EvaluationService = _worker_state["service"]
+    return service._evaluate_rows(
+        rows_df,
+        start_position=start_position,
+        task_repo=_worker_state["task_repo"],
+        cols=_worker_state["cols"],
+        metric_names=metric_names,
+        base_seed=base_seed,
+    )
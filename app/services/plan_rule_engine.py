@@ -1,8 +1,7 @@
 # app/services/plan_rule_engine.py
 import json
-import math
 import random
-import re
+import time
 from collections import defaultdict
 from numbers import Number
 from pathlib import Path
@@ -25,10 +24,13 @@ from app.core.constants import (
     ScorePredictionBlockDefaults,
     Level1Score,
     ScoreThreshold,
+    TreemapMode,
+    TreemapSampler,
     UserType,
 )
 from app.core.errors.error_codes import ErrorCode
 from app.core.errors.exceptions import BizError
+from app.core.metrics import MODEL_PREDICT_DURATION
 from app.schemas.chat import (
     AIRecPlanData,
     DimensionScorePrediction,
@@ -39,6 +41,11 @@ from app.schemas.chat import (
     TrainingModule,
 )
 from app.schemas.common import Task
+from app.services.score_feature_engine import (
+    build_feature_table,
+    select_feature_matrix,
+)
+from app.services.task_processor import AgeCompatibilityIndex, TaskCoordIndex
 from app.services.modules_processor import (
     fetch_tasks_by_ability,
     calc_difficulty,
@@ -50,6 +57,7 @@ from llm.base import BaseLLM
 
 from models.model_factory import ModelManager
 from utils.logger import get_logger
+from utils.text_utils import parse_age_value
 
 logger = get_logger(__name__)
 
@@ -67,6 +75,18 @@ SCORE_PREDICTION_CALIBRATION = {
     "predicted_delta_squared_coef": -1.4399836208653778,
     "current_delta_interaction_coef": -15.695383627727347,
 }
+# 校准维度编码：数组版本按编码查偏移，最后一位为未知维度（偏移 0）
+CALIBRATION_DOMAINS = [domain.value for domain in Level1BrainDomain]
+CALIBRATION_DOMAIN_CODES = {
+    domain: code for code, domain in enumerate(CALIBRATION_DOMAINS)
+}
+CALIBRATION_DOMAIN_OFFSETS = np.array(
+    [
+        SCORE_PREDICTION_CALIBRATION["domain_offsets"].get(domain, 0.0)
+        for domain in CALIBRATION_DOMAINS
+    ]
+    + [0.0]
+)
 MAX_PREDICTED_LEVEL1_SCORE = 159
 DEFAULT_N_MODEL_WEIGHT = 0.8
 DEFAULT_GROWTH_SCALE = 0.5
@@ -98,7 +118,6 @@ def enrich_user_profile_with_domain_histories(
     为用户画像补充各脑能力的连续历史序列
     """
     score_prediction_config = config.get("score_prediction", {})
-    min_history_len = int(score_prediction_config.get("min_history_len", 3))
     max_history_len = int(
         score_prediction_config.get("max_history_len", 12)
     )
@@ -136,6 +155,19 @@ def enrich_user_profile_with_domain_histories(
         seq = seq[::-1]  # 倒序，保证时间顺序从远到近
         histories[domain_value] = seq
 
+    return attach_domain_histories(profile, histories, config)
+
+
+def attach_domain_histories(
+    profile: dict, histories: Dict[str, list], config: Dict[str, Any]
+) -> dict:
+    """
+    校验历史长度并挂到 profile 上（单个 / 批量提取共用）
+    """
+    min_history_len = int(
+        config.get("score_prediction", {}).get("min_history_len", 3)
+    )
+
     insufficient_histories = {
         domain: len(seq)
         for domain, seq in histories.items()
@@ -807,7 +839,7 @@ def compute_M(
     growth_scale=DEFAULT_GROWTH_SCALE,
 ):
     """
-    计算最终修正值 M
+    计算最终修正值 M（标量接口，计算见 compute_M_array）
 
     约束：
     - M > current
@@ -815,35 +847,63 @@ def compute_M(
     - current 越大 → 增长越保守
     """
 
+    return float(
+        compute_M_array(
+            N,
+            current,
+            range_val,
+            alpha_c=alpha_c,
+            n_model_weight=n_model_weight,
+            growth_scale=growth_scale,
+        )
+    )
+
+
+def compute_M_array(
+    N,
+    current,
+    range_val,
+    alpha_c=150,
+    n_model_weight=DEFAULT_N_MODEL_WEIGHT,
+    growth_scale=DEFAULT_GROWTH_SCALE,
+) -> np.ndarray:
+    """
+    compute_M 的数组版本：N / current / range_val 逐元素广播
+    """
+
+    N = np.asarray(N, dtype=float)
+    current = np.asarray(current, dtype=float)
+
+    if not np.isfinite(N).all():
+        raise ValueError("Model prediction must be finite")
+
     # --- Step 0: 修正 range_val（关键） ---
-    range_val = max(range_val, 0.0)
+    range_val = np.maximum(np.asarray(range_val, dtype=float), 0.0)
 
     # --- Step 1: 计算 k ---
     k = compute_alpha(current, c=alpha_c)
 
     # --- Step 2: 防止预测下降 ---
     # 至少增长一个极小值 or range_val
-    min_increase = max(1e-6, range_val)
+    min_increase = np.maximum(1e-6, range_val)
     n_min_increase_weight = 1 - n_model_weight
-    N = math.ceil(n_model_weight * N + n_min_increase_weight * (current + min_increase))
+    N = np.ceil(n_model_weight * N + n_min_increase_weight * (current + min_increase))
 
     # --- Step 3: 上界控制 ---
     max_cap = 160 - 1  # 你这里留了 buffer（很好）
 
     # 可增长空间
-    delta = min(N - current, max_cap - current)
+    delta = np.minimum(N - current, max_cap - current)
 
     # --- Step 4: 插值 ---
     M = current + growth_scale * k * delta
 
     # --- Step 5: 下界保护 ---
-    M = max(M, current + 1e-6)
-
-    return M
+    return np.maximum(M, current + 1e-6)
 
 def compute_alpha(current, c=150, s=10):
     """
-    计算权重 k ∈ (0,1)
+    计算权重 k ∈ (0,1)，current 可为标量或数组
 
     参数：
     - current: 当前值
@@ -882,22 +942,101 @@ def direct_horizon_forecast(
 
     X = pd.DataFrame([feats]).reindex(columns=feature_cols, fill_value=np.nan)
     pred = float(model.predict(X)[0])
-    pred = compute_M(
+    return finalize_horizon_prediction(
         pred,
-        current,
-        range_val,
+        current=current,
+        range_val=range_val,
+        domain=domain,
+        alpha_c=alpha_c,
+        n_model_weight=n_model_weight,
+        growth_scale=growth_scale,
+        calibration_enabled=calibration_enabled,
+    )
+
+
+def finalize_horizon_prediction(
+    pred: float,
+    current: float,
+    range_val: float,
+    domain: str,
+    alpha_c: float,
+    n_model_weight: float,
+    growth_scale: float,
+    calibration_enabled: bool = True,
+) -> float:
+    """
+    模型原始输出 -> 修正值 M -> （可选）校准（标量接口，计算见 finalize_horizon_predictions）
+    """
+
+    return float(
+        finalize_horizon_predictions(
+            pred,
+            current,
+            range_val,
+            encode_domains([domain])[0],
+            alpha_c=alpha_c,
+            n_model_weight=n_model_weight,
+            growth_scale=growth_scale,
+            calibration_enabled=calibration_enabled,
+        )
+    )
+
+
+def finalize_horizon_predictions(
+    preds,
+    currents,
+    range_values,
+    domain_codes,
+    alpha_c: float,
+    n_model_weight: float,
+    growth_scale: float,
+    calibration_enabled: bool = True,
+) -> np.ndarray:
+    """
+    模型原始输出 -> 修正值 M -> （可选）校准，逐元素广播；domain_codes 见 encode_domains
+    """
+
+    preds = compute_M_array(
+        preds,
+        currents,
+        range_values,
         alpha_c=alpha_c,
         n_model_weight=n_model_weight,
         growth_scale=growth_scale,
     )
     if calibration_enabled:
-        pred = calibrate_predicted_score(pred, current, domain)
-    return pred
+        preds = calibrate_predicted_score_array(preds, currents, domain_codes)
+    return preds
+
+
+def encode_domains(domains) -> np.ndarray:
+    """
+    一级脑能力名称 -> 校准用的维度编码，未知维度编码为 len(CALIBRATION_DOMAINS)（偏移为 0）
+    """
+
+    unknown = len(CALIBRATION_DOMAINS)
+    return np.array(
+        [CALIBRATION_DOMAIN_CODES.get(domain, unknown) for domain in domains],
+        dtype=np.intp,
+    )
 
 
 def calibrate_predicted_score(predicted: float, current: float, domain: str) -> float:
+    return float(
+        calibrate_predicted_score_array(predicted, current, encode_domains([domain])[0])
+    )
+
+
+def calibrate_predicted_score_array(predicted, current, domain_codes) -> np.ndarray:
+    """
+    calibrate_predicted_score 的数组版本：predicted / current / domain_codes 逐元素广播
+    """
+
+    predicted = np.asarray(predicted, dtype=float)
+    current = np.asarray(current, dtype=float)
+    domain_offset = CALIBRATION_DOMAIN_OFFSETS[np.asarray(domain_codes, dtype=np.intp)]
+
     predicted_delta = predicted - current
-    domain_offset = SCORE_PREDICTION_CALIBRATION["domain_offsets"].get(domain, 0.0)
     scaled_current = current / 100
     scaled_delta = predicted_delta / 20
     calibrated = (
@@ -915,7 +1054,7 @@ def calibrate_predicted_score(predicted: float, current: float, domain: str) ->
         * scaled_current
         * scaled_delta
     )
-    return max(calibrated, current + 1e-6)
+    return np.maximum(calibrated, current + 1e-6)
 
 
 def resolve_n_model_weight(score_prediction_config: Dict[str, Any]) -> float:
@@ -947,12 +1086,7 @@ def compute_baseline_prediction(
     max_decay_ratio: float = 0.12,  # 最大下降占当前分值比例
 ) -> int:
     """
-    无任务预测（基于历史波动幅度的下降）
-
-    逻辑：
-    - 用历史 max-min 表示波动能力
-    - 按 horizon / 历史长度 进行缩放
-    - 强制下降
+    无任务预测（基于历史波动幅度的下降），计算见 compute_baseline_predictions
     """
 
     if not history:
@@ -960,48 +1094,91 @@ def compute_baseline_prediction(
 
     history_arr = np.array(history, dtype=float)
 
+    return int(
+        compute_baseline_predictions(
+            history_arr.max() - history_arr.min(),
+            len(history_arr),
+            current,
+            horizon_weeks=horizon_weeks,
+            min_decay=min_decay,
+            max_decay=max_decay,
+            max_decay_ratio=max_decay_ratio,
+        )
+    )
+
+
+def compute_baseline_predictions(
+    range_values,
+    hist_lens,
+    currents,
+    *,
+    horizon_weeks: int = 12,
+    min_decay: float = 3,
+    max_decay: float = 10,
+    max_decay_ratio: float = 0.12,
+) -> np.ndarray:
+    """
+    无任务预测的数组版本
+
+    逻辑：
+    - 用历史 max-min（range_values）表示波动能力
+    - 按 horizon / 历史长度 进行缩放
+    - 强制下降；历史为空（hist_len=0）时直接取 current
+    """
+
+    range_values = np.asarray(range_values, dtype=float)
+    raw_hist_lens = np.asarray(hist_lens)
+    currents = np.asarray(currents, dtype=float)
+
     # ----------------------
     # Step 1: 波动幅度
     # ----------------------
-    range_val = history_arr.max() - history_arr.min()
-
     # 防止全平（range=0）
-    range_val = max(range_val, min_decay)
+    range_values = np.maximum(range_values, min_decay)
 
     # ----------------------
     # Step 2: 历史长度
     # ----------------------
-    hist_len = len(history_arr)
-
     # 防止除0
-    hist_len = max(hist_len, 1)
+    hist_lens = np.maximum(raw_hist_lens, 1)
 
     # ----------------------
     # Step 3: 下降幅度
     # ----------------------
-    raw_decay = (horizon_weeks / hist_len) * range_val
+    raw_decay = (horizon_weeks / hist_lens) * range_values
 
     # 至少有轻微下降，避免完全不变
-    decay = max(raw_decay, min_decay)
+    decay = np.maximum(raw_decay, min_decay)
 
     # 同时限制绝对下降量和相对下降比例，避免回落过大
-    max_allowed_decay = min(max_decay, current * max_decay_ratio)
-    max_allowed_decay = max(max_allowed_decay, min_decay)
-    decay = min(decay, max_allowed_decay)
+    max_allowed_decay = np.minimum(max_decay, currents * max_decay_ratio)
+    max_allowed_decay = np.maximum(max_allowed_decay, min_decay)
+    decay = np.minimum(decay, max_allowed_decay)
 
     # ----------------------
     # Step 4: 计算 baseline
     # ----------------------
-    baseline = current - decay
+    baseline = currents - decay
 
     # ----------------------
     # Step 5: 约束
     # ----------------------
-    baseline = min(baseline, current)  # 必须下降
-    baseline = max(baseline, 0)        # 下界
+    baseline = np.minimum(baseline, currents)  # 必须下降
+    baseline = np.maximum(baseline, 0)         # 下界
 
+    baseline = np.where(raw_hist_lens == 0, currents, baseline)
+    # np.rint 与 round 一致，均为银行家舍入
+    return np.rint(baseline).astype(int)
 
-    return int(round(baseline))
+
+def clamp_predicted_scores(predicted) -> np.ndarray:
+    """
+    min(Level1Score.clamp(p), MAX_PREDICTED_LEVEL1_SCORE) 的数组版本
+    """
+
+    predicted = np.minimum(Level1Score.MAX_SCORE, np.asarray(predicted, dtype=float))
+    predicted = np.maximum(Level1Score.MIN_SCORE, predicted)
+    return np.minimum(predicted, MAX_PREDICTED_LEVEL1_SCORE)
 
 
 def build_score_prediction(
@@ -1009,7 +1186,23 @@ def build_score_prediction(
     model_manager: ModelManager,
     config: Dict[str, Any],
 ) -> ScorePredictionBlock:
-    level1_scores = profile.get("latest_level1_scores", {})
+    return build_score_predictions_batch([profile], model_manager, config)[0]
+
+
+def build_score_predictions_batch(
+    profiles: List[dict],
+    model_manager: ModelManager,
+    config: Dict[str, Any],
+) -> List[ScorePredictionBlock]:
+    """
+    批量分数预测：所有用户 × 四个维度的特征一次构建，每个维度模型只 predict 一次
+
+    与逐个调用 build_score_prediction 的结果一致
+    """
+
+    if not profiles:
+        return []
+
     score_prediction_config = config.get("score_prediction", {})
     max_history_len = int(score_prediction_config.get("max_history_len", 20))
     alpha_c = float(score_prediction_config.get("alpha_c", 150))
@@ -1034,54 +1227,99 @@ def build_score_prediction(
     with open(feature_columns_path, "r", encoding="utf-8") as f:
         feature_columns_map = json.load(f)
 
-    def build_dim(level1_key: str) -> DimensionScorePrediction:
-        history_seq = profile.get("domain_histories", {}).get(level1_key, [])
+    # 所有用户 × 四个维度的特征一次性批量构建（行号 = user * 4 + domain）
+    domain_keys = [domain.value for domain in Level1BrainDomain]
+    histories: List[List[float]] = []
+    currents: List[float] = []
+
+    for profile in profiles:
+        domain_histories = profile.get("domain_histories", {})
+
+        for level1_key in domain_keys:
+            history_seq = domain_histories.get(level1_key, [])
+
+            if len(history_seq) < 2:
+                raise ValueError(f"Insufficient history for domain: {level1_key}")
+
+            histories.append(history_seq[:-1])
+            currents.append(float(history_seq[-1]))
+
+    feature_table = build_feature_table(histories, currents, max_history_len)
+    range_values = np.nan_to_num(feature_table["max"] - feature_table["min"])
+
+    # 每个维度模型对全部用户 predict 一次
+    n_domains = len(domain_keys)
+    raw_predictions = np.empty(len(currents), dtype=float)
+
+    for offset, level1_key in enumerate(domain_keys):
         model_key = LEVEL1_DOMAIN_KEY_MAP[level1_key]
         feature_cols = feature_columns_map.get(model_key)
 
-        if len(history_seq) < 2:
-            raise ValueError(f"Insufficient history for domain: {level1_key}")
-
         if not feature_cols:
             raise ValueError(f"Missing feature columns for domain: {model_key}")
 
-        current = float(history_seq[-1])
-        history = history_seq[:-1]
-
-        historical = int(level1_scores.get(level1_key, current))
-        baseline_predicted = compute_baseline_prediction(history, current)
-        predicted = direct_horizon_forecast(
-            model=model_manager.get(model_key),
-            history=history,
-            current=current,
-            domain=level1_key,
-            max_history_len=max_history_len,
-            feature_cols=feature_cols,
-            alpha_c=alpha_c,
-            n_model_weight=n_model_weight,
-            growth_scale=growth_scale,
-            calibration_enabled=calibration_enabled,
-        )
+        rows = slice(offset, None, n_domains)
+        X = select_feature_matrix(feature_table, feature_cols, rows=rows)
+        predict_started = time.perf_counter()
+        # 不同后端输出形状不一（如 MLP 为 (N, 1)），统一展平为一维
+        domain_predictions = np.asarray(
+            model_manager.get(model_key).predict(X), dtype=float
+        ).reshape(-1)
+        if len(domain_predictions) != len(X):
+            raise ValueError(
+                f"Model {model_key} returned {len(domain_predictions)} predictions "
+                f"for {len(X)} rows"
+            )
+        raw_predictions[rows] = domain_predictions
+        MODEL_PREDICT_DURATION.observe(time.perf_counter() - predict_started, domain=model_key)
+
+    # 修正值 M / 校准 / 截断 / 无任务预测均按数组一次完成
+    currents_arr = np.asarray(currents, dtype=float)
+    predictions = finalize_horizon_predictions(
+        raw_predictions,
+        currents_arr,
+        range_values,
+        np.tile(encode_domains(domain_keys), len(profiles)),
+        alpha_c=alpha_c,
+        n_model_weight=n_model_weight,
+        growth_scale=growth_scale,
+        calibration_enabled=calibration_enabled,
+    )
+    predicted_scores = np.rint(clamp_predicted_scores(predictions)).astype(int)
 
-        predicted = min(Level1Score.clamp(predicted), MAX_PREDICTED_LEVEL1_SCORE)
-        predicted = int(round(predicted))
+    history_ranges = np.array(
+        [max(history) - min(history) if history else 0.0 for history in histories],
+        dtype=float,
+    )
+    baseline_scores = compute_baseline_predictions(
+        history_ranges,
+        np.array([len(history) for history in histories]),
+        currents_arr,
+    )
+
+    def build_dim(user: int, level1_key: str) -> DimensionScorePrediction:
+        row = user * n_domains + domain_keys.index(level1_key)
+        level1_scores = profiles[user].get("latest_level1_scores", {})
 
         return DimensionScorePrediction(
-            historical_score=historical,
-            predicted_score=predicted,
-            baseline_predicted_score=baseline_predicted,
+            historical_score=int(level1_scores.get(level1_key, currents[row])),
+            predicted_score=int(predicted_scores[row]),
+            baseline_predicted_score=int(baseline_scores[row]),
         )
 
-    return ScorePredictionBlock(
-        legends=[
-            ScoreLegendItem(**legend)
-            for legend in ScorePredictionBlockDefaults.LEGENDS
-        ],
-        attention=build_dim(Level1BrainDomain.ATTENTION.value),
-        memory=build_dim(Level1BrainDomain.MEMORY.value),
-        executive_control=build_dim(Level1BrainDomain.EXECUTIVE.value),
-        perception=build_dim(Level1BrainDomain.PERCEPTION.value),
-    )
+    return [
+        ScorePredictionBlock(
+            legends=[
+                ScoreLegendItem(**legend)
+                for legend in ScorePredictionBlockDefaults.LEGENDS
+            ],
+            attention=build_dim(user, Level1BrainDomain.ATTENTION.value),
+            memory=build_dim(user, Level1BrainDomain.MEMORY.value),
+            executive_control=build_dim(user, Level1BrainDomain.EXECUTIVE.value),
+            perception=build_dim(user, Level1BrainDomain.PERCEPTION.value),
+        )
+        for user in range(len(profiles))
+    ]
 
 def build_l1_task_map(recommended_tasks: List[Task]) -> Dict[int, List[Task]]:
     """
@@ -1174,54 +1412,87 @@ def score_task(task, target_matrix: np.ndarray) -> float:
     )
 
 
+def score_tasks(
+    task_list: List[Task],
+    target_matrix: np.ndarray,
+    coord_index: TaskCoordIndex | None = None,
+) -> np.ndarray:
+    """
+    向量化打分：task × (L1, L2) 关联矩阵与展平目标矩阵的一次乘积
+
+    与逐个调用 score_task 的结果逐位一致
+    """
+
+    if coord_index is None or coord_index.n_tasks != len(task_list):
+        coord_index = TaskCoordIndex.from_tasks(task_list)
+
+    return coord_index.score(target_matrix)
+
+
 # ===============================
 # 3️⃣ 推荐任务
 # ===============================
-def recommend_tasks(
+def sample_tasks(
     task_list: List[Task],
-    target_matrix: np.ndarray,
-    k: int = 420,
+    weights: np.ndarray,
+    k: int,
+    sampler: str = TreemapSampler.NUMPY.value,
+    seed: int | None = None,
 ) -> List[Task]:
     """
-    按权重随机推荐任务
-    """
+    按权重有放回采样 k 个任务
 
-    scores = []
-
-    for task in task_list:
-        s = score_task(task, target_matrix)
+    - numpy：NumPy Generator + 累积权重二分，与 random.choices 同分布
+    - legacy：直接调用 random.choices，相同随机状态下与旧实现逐次一致（回归测试用）
+    """
 
-        # 防止全0
-        scores.append(max(s, 1e-6))
+    if sampler == TreemapSampler.LEGACY.value:
+        rand = random if seed is None else random.Random(seed)
+        return rand.choices(task_list, weights=np.asarray(weights).tolist(), k=k)
 
-    return random.choices(task_list, weights=scores, k=k)
+    if sampler != TreemapSampler.NUMPY.value:
+        raise ValueError(f"Unsupported l2_treemap sampler: {sampler}")
 
+    cum_weights = np.cumsum(weights, dtype=float)
+    rng = np.random.default_rng(seed)
+    picked = np.searchsorted(
+        cum_weights,
+        rng.random(k) * cum_weights[-1],
+        side="right",
+    )
+    picked = np.minimum(picked, len(task_list) - 1)
 
-def _parse_age_value(age: Any) -> float | None:
-    if age is None:
-        return None
+    return [task_list[i] for i in picked]
 
-    if isinstance(age, (int, float)):
-        return float(age)
 
-    age_str = str(age).strip()
-    if not age_str:
-        return None
+def recommend_tasks(
+    task_list: List[Task],
+    target_matrix: np.ndarray,
+    k: int = 420,
+    sampler: str = TreemapSampler.NUMPY.value,
+    seed: int | None = None,
+    coord_index: TaskCoordIndex | None = None,
+) -> List[Task]:
+    """
+    按权重随机推荐任务
+    """
 
-    match = re.search(r"\d+(?:\.\d+)?", age_str)
-    if not match:
-        return None
+    # 防止全0
+    scores = np.maximum(score_tasks(task_list, target_matrix, coord_index), 1e-6)
 
-    return float(match.group())
+    return sample_tasks(task_list, scores, k, sampler=sampler, seed=seed)
 
 
 def _is_task_age_compatible(task: Task, user_age: Any) -> bool:
-    age_value = _parse_age_value(user_age)
+    """
+    单个任务的年龄适配判断（AgeCompatibilityIndex 的逐条参考实现）
+    """
+    age_value = parse_age_value(user_age)
     if age_value is None:
         return True
 
-    age_min = _parse_age_value(getattr(task, "age_min", None))
-    age_max = _parse_age_value(getattr(task, "age_max", None))
+    age_min = parse_age_value(getattr(task, "age_min", None))
+    age_max = parse_age_value(getattr(task, "age_max", None))
 
     if age_min is None and age_max is None:
         return True
@@ -1242,6 +1513,7 @@ def build_l2_distribution_from_tasks(
     """
 
     counter = defaultdict(int)
+    level1_index: Dict[int, int | None] = {}
     total = 0
 
     for task in tasks:
@@ -1250,6 +1522,9 @@ def build_l2_distribution_from_tasks(
 
         counter[task.l2_index] += 1
         total += 1
+        # 与旧实现一致：取第一个带 l1_index 的同 L2 任务的一级脑能力
+        if level1_index.get(task.l2_index) is None:
+            level1_index[task.l2_index] = task.l1_index
 
     if total == 0:
         return []
@@ -1257,17 +1532,10 @@ def build_l2_distribution_from_tasks(
     result = []
 
     for l2_idx, count in counter.items():
-        matched_task = next(
-            (
-                task
-                for task in tasks
-                if task.l2_index == l2_idx and task.l1_index is not None
-            ),
-            None,
-        )
+        l1_idx = level1_index.get(l2_idx)
         level1_name = (
-            L1_INDEX_REVERSE.get(matched_task.l1_index, f"unknown_{matched_task.l1_index}")
-            if matched_task is not None
+            L1_INDEX_REVERSE.get(l1_idx, f"unknown_{l1_idx}")
+            if l1_idx is not None
             else "unknown"
         )
         result.append({
@@ -1284,28 +1552,82 @@ def build_l2_distribution_from_tasks(
     return result
 
 
-def build_L2_brain_ability_treemap(
+def build_expected_l2_distribution(
+    weights: np.ndarray,
+    coord_index: TaskCoordIndex,
+    k: int,
+) -> List[Dict[str, Any]]:
+    """
+    由任务采样权重直接计算二级脑能力的期望分布（采样计数的期望值）
+
+    - weights: 与 coord_index 对齐的任务权重（不参与采样的任务为 0）
+    - 每个 (L1, L2) 坐标的权重质量通过一次加权 bincount 得到
+    - ratio = 该 L2 的权重质量 / 所有带坐标任务的权重质量，count = ratio * k
+    - level1_name 取该 L2 下权重质量最大的一级脑能力
+
+    返回格式与 build_l2_distribution_from_tasks 一致：[{level1_name, l2_index, name, count, ratio}]
+    """
+
+    n_l2 = len(Level2BrainDomain)
+    mass = np.bincount(
+        coord_index.flat_coords,
+        weights=np.asarray(weights, dtype=float)[coord_index.task_rows],
+        minlength=len(Level1BrainDomain) * n_l2,
+    ).reshape(-1, n_l2)
+
+    l2_mass = mass.sum(axis=0)
+    total = l2_mass.sum()
+    if total <= 0:
+        return []
+
+    ratios = l2_mass / total
+    level1_indices = mass.argmax(axis=0)
+
+    result = []
+    for l2_idx in np.flatnonzero(np.round(ratios, 3) > 0):
+        l1_idx = int(level1_indices[l2_idx])
+        result.append({
+            "level1_name": L1_INDEX_REVERSE.get(l1_idx, f"unknown_{l1_idx}"),
+            "l2_index": int(l2_idx),
+            "name": L2_INDEX_REVERSE.get(int(l2_idx), f"unknown_{l2_idx}"),
+            "count": int(round(ratios[l2_idx] * k)),
+            "ratio": round(float(ratios[l2_idx]), 3),
+        })
+
+    result.sort(key=lambda x: x["ratio"], reverse=True)
+
+    return result
+
+
+def _resolve_task_coord_index(task_repo: Dict[str, Any]) -> TaskCoordIndex:
+    coord_index = task_repo.get("task_coord_index")
+    if coord_index is None or coord_index.n_tasks != len(task_repo["task_list"]):
+        coord_index = TaskCoordIndex.from_tasks(task_repo["task_list"])
+    return coord_index
+
+
+def _build_treemap_weights(
     profile: Dict[str, Any],
     l1_scores: Dict[str, Any],
     task_repo: Dict[str, Any],
-    k: int = 420,
-) -> Tuple[List[Task], List[L2AbilityStat]]:
+) -> Tuple[np.ndarray, np.ndarray | None, List[Task]]:
     """
-    返回：
-    {
-        "recommended_tasks": List[Task],
-        "l2_stats": List[L2AbilityStat]
-    }
+    计算全量任务的采样权重
+
+    返回 (weights, compatible_positions, candidate_tasks)：
+    - weights: 与 task_list 对齐，年龄不适配的任务为 0
+    - compatible_positions: 年龄适配任务的位置；全部任务参与时为 None
+    - candidate_tasks: 参与采样的任务
     """
 
     task_list = task_repo["task_list"]
-    user_age = profile.get("age")
-    filtered_task_list = [
-        task for task in task_list
-        if _is_task_age_compatible(task, user_age)
-    ]
-    if filtered_task_list:
-        task_list = filtered_task_list
+    age_value = (
+        profile["age_value"]
+        if "age_value" in profile
+        else parse_age_value(profile.get("age"))
+    )
+    age_index = task_repo.get("age_index") or AgeCompatibilityIndex.from_tasks(task_list)
+    compatible_positions, compatible_tasks = age_index.lookup(age_value)
 
     brain_distribution = profile.get("brain_distribution")
     if not brain_distribution:
@@ -1319,18 +1641,96 @@ def build_L2_brain_ability_treemap(
         brain_distribution,
     )
 
-    # 2️⃣ 推荐任务
-    recommended_tasks = recommend_tasks(
-        task_list,
-        target_matrix,
-        k=k,
+    # 2️⃣ 全量打分（一次矩阵运算），再取年龄适配子集
+    weights = np.maximum(
+        score_tasks(task_list, target_matrix, _resolve_task_coord_index(task_repo)),
+        1e-6,
     )
+    if len(compatible_tasks) and len(compatible_tasks) < len(task_list):
+        masked = np.zeros_like(weights)
+        masked[compatible_positions] = weights[compatible_positions]
+        return masked, compatible_positions, compatible_tasks
 
-    # 3️⃣ 统计 L2 分布（dict）
-    l2_distribution = build_l2_distribution_from_tasks(
-        recommended_tasks
+    return weights, None, task_list
+
+
+def build_expected_l2_distribution_for_profile(
+    profile: Dict[str, Any],
+    l1_scores: Dict[str, Any],
+    task_repo: Dict[str, Any],
+    k: int,
+) -> List[Dict[str, Any]]:
+    """
+    用户的期望 L2 分布（与 build_L2_brain_ability_treemap 使用相同的权重）
+    """
+
+    weights, _, _ = _build_treemap_weights(profile, l1_scores, task_repo)
+
+    return build_expected_l2_distribution(
+        weights, _resolve_task_coord_index(task_repo), k
     )
 
+
+def build_L2_brain_ability_treemap(
+    profile: Dict[str, Any],
+    l1_scores: Dict[str, Any],
+    task_repo: Dict[str, Any],
+    k: int | None = None,
+    config: Dict[str, Any] | None = None,
+    seed: int | None = None,
+    with_tasks: bool = True,
+) -> Tuple[List[Task], List[L2AbilityStat]]:
+    """
+    采样参数读取 config["l2_treemap"]：mode / sample_size / sampler / random_state
+
+    - mode=sampled：采样 k 个任务后统计 L2 分布
+    - mode=expected：L2 分布直接由任务权重计算；with_tasks=False 时不采样任务
+
+    返回：
+    {
+        "recommended_tasks": List[Task],
+        "l2_stats": List[L2AbilityStat]
+    }
+    """
+
+    treemap_cfg = (config or {}).get("l2_treemap", {})
+    if k is None:
+        k = int(treemap_cfg.get("sample_size", 420))
+    if seed is None:
+        seed = treemap_cfg.get("random_state")
+    sampler = treemap_cfg.get("sampler", TreemapSampler.NUMPY.value)
+    mode = treemap_cfg.get("mode", TreemapMode.SAMPLED.value)
+    if mode not in {m.value for m in TreemapMode}:
+        raise ValueError(f"Unsupported l2_treemap mode: {mode}")
+
+    weights, compatible_positions, candidate_tasks = _build_treemap_weights(
+        profile, l1_scores, task_repo
+    )
+
+    recommended_tasks: List[Task] = []
+    if with_tasks or mode == TreemapMode.SAMPLED.value:
+        candidate_weights = (
+            weights if compatible_positions is None else weights[compatible_positions]
+        )
+
+        recommended_tasks = sample_tasks(
+            candidate_tasks,
+            candidate_weights,
+            k,
+            sampler=sampler,
+            seed=seed,
+        )
+
+    # 3️⃣ 统计 L2 分布（dict）
+    if mode == TreemapMode.EXPECTED.value:
+        l2_distribution = build_expected_l2_distribution(
+            weights, _resolve_task_coord_index(task_repo), k
+        )
+    else:
+        l2_distribution = build_l2_distribution_from_tasks(
+            recommended_tasks
+        )
+
     # ✅ 4️⃣ 直接转成 Pydantic 对象
     l2_stats: List[L2AbilityStat] = [
         L2AbilityStat(**item)
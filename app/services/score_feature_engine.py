@@ -0,0 +1,197 @@
+# app/services/score_feature_engine.py
+"""
+分数预测特征的批量向量化构建
+
+与 plan_rule_engine.build_features 逐项等价（数值误差范围内）：
+- 输入 N 条历史序列，右对齐、左侧 NaN 填充为 (N, max_history_len) 矩阵
+- 窗口统计通过掩码求和完成，斜率使用最小二乘闭式解，不调用 np.polyfit
+- 输出按 feature_columns.json 的列顺序排列，缺失列填 NaN
+"""
+
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+STD_EPS = 1e-6
+
+
+def stack_histories(
+    histories: Sequence[Sequence[float]],
+    max_history_len: int,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    将历史序列截取最近 max_history_len 个点，右对齐堆叠
+
+    返回：
+    - values: (N, max_history_len)，无数据位置为 NaN
+    - lengths: (N,) 每条序列的有效长度
+    """
+
+    values = np.full((len(histories), max_history_len), np.nan)
+    lengths = np.zeros(len(histories), dtype=np.int64)
+
+    if max_history_len <= 0:
+        return values, lengths
+
+    for row, history in enumerate(histories):
+        effective = np.asarray(history, dtype=float)[-max_history_len:]
+        if len(effective):
+            values[row, max_history_len - len(effective):] = effective
+        lengths[row] = len(effective)
+
+    return values, lengths
+
+
+def _divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    out = np.full(np.shape(numerator), np.nan)
+    np.divide(numerator, denominator, out=out, where=denominator > 0)
+    return out
+
+
+class _WindowStats:
+    """
+    最近 min(window, n) 个点上的掩码统计量
+    """
+
+    def __init__(self, values: np.ndarray, lengths: np.ndarray, window: int):
+        history_len = values.shape[1]
+        positions = np.arange(history_len)
+
+        self.count = np.minimum(lengths, window)
+        self.mask = positions[None, :] >= (history_len - self.count)[:, None]
+
+        masked = np.where(self.mask, values, 0.0)
+        self.mean = _divide(masked.sum(axis=1), self.count)
+
+        centered = np.where(self.mask, values - self.mean[:, None], 0.0)
+        self.std = np.sqrt(_divide((centered * centered).sum(axis=1), self.count))
+
+        empty = self.count == 0
+        self.min = np.where(self.mask, values, np.inf).min(axis=1, initial=np.inf)
+        self.max = np.where(self.mask, values, -np.inf).max(axis=1, initial=-np.inf)
+        self.min[empty] = np.nan
+        self.max[empty] = np.nan
+
+        # 一元最小二乘斜率：sum((x - x̄)(y - ȳ)) / sum((x - x̄)^2)，斜率与 x 起点无关
+        x_mean = _divide(np.where(self.mask, positions, 0).sum(axis=1), self.count)
+        x_centered = np.where(self.mask, positions[None, :] - x_mean[:, None], 0.0)
+        self.slope = _divide(
+            (x_centered * centered).sum(axis=1),
+            (x_centered * x_centered).sum(axis=1),
+        )
+
+
+def _value_at(values: np.ndarray, lengths: np.ndarray, offset: int) -> np.ndarray:
+    """
+    取倒数第 offset 个点，序列长度不足时为 NaN
+    """
+
+    history_len = values.shape[1]
+    if offset > history_len:
+        return np.full(len(values), np.nan)
+
+    return np.where(lengths >= offset, values[:, history_len - offset], np.nan)
+
+
+def build_feature_table(
+    histories: Sequence[Sequence[float]],
+    currents: Sequence[float],
+    max_history_len: int,
+) -> Dict[str, np.ndarray]:
+    """
+    一次性计算 N 条序列的全部特征
+
+    返回：特征名 -> (N,) 数组，包含 hist_len / current
+    """
+
+    values, lengths = stack_histories(histories, max_history_len)
+    history_len = values.shape[1]
+
+    whole = _WindowStats(values, lengths, history_len)
+    win_4 = _WindowStats(values, lengths, 4)
+    win_8 = _WindowStats(values, lengths, 8)
+    win_12 = _WindowStats(values, lengths, 12)
+
+    has_2 = lengths >= 2
+    has_3 = lengths >= 3
+    has_4 = lengths >= 4
+    has_8 = lengths >= 8
+    has_12 = lengths >= 12
+
+    last = _value_at(values, lengths, 1)
+    trend = np.where(has_2, whole.slope, 0.0)
+
+    table: Dict[str, np.ndarray] = {}
+
+    for i in range(1, max_history_len + 1):
+        table[f"lag_{i}"] = _value_at(values, lengths, i)
+
+    table["mean_4"] = win_4.mean
+    table["mean_12"] = win_12.mean
+    table["std_12"] = win_12.std
+    table["min"] = whole.min
+    table["max"] = whole.max
+    table["trend"] = trend
+    table["growth_4"] = np.where(has_4, last - _value_at(values, lengths, 4), 0.0)
+    table["growth_12"] = np.where(has_12, last - _value_at(values, lengths, 12), 0.0)
+    table["last"] = last
+    table["diff_1"] = np.where(has_2, last - _value_at(values, lengths, 2), 0.0)
+    table["diff_2"] = np.where(
+        has_3,
+        _value_at(values, lengths, 2) - _value_at(values, lengths, 3),
+        0.0,
+    )
+    table["diff_last_vs_mean_4"] = last - win_4.mean
+    table["diff_mean_4_12"] = np.where(has_12, win_4.mean - win_12.mean, 0.0)
+    table["range_4"] = win_4.max - win_4.min
+    table["range_12"] = win_12.max - win_12.min
+    table["std_ratio_4_12"] = np.where(
+        has_12,
+        (win_4.std + STD_EPS) / (win_12.std + STD_EPS),
+        1.0,
+    )
+    table["trend_4"] = np.where(has_4, win_4.slope, trend)
+    table["trend_8"] = np.where(has_8, win_8.slope, trend)
+    table["last_vs_min"] = last - whole.min
+    table["last_vs_max"] = last - whole.max
+
+    table["hist_len"] = lengths.astype(float)
+    table["current"] = np.asarray(currents, dtype=float)
+
+    return table
+
+
+def select_feature_matrix(
+    table: Dict[str, np.ndarray],
+    feature_cols: List[str],
+    rows: slice | np.ndarray | None = None,
+) -> np.ndarray:
+    """
+    按 feature_cols 顺序取出 (N, n_features) 矩阵，未知列填 NaN
+    """
+
+    n_rows = len(table["current"])
+    row_selector = slice(None) if rows is None else rows
+    n_selected = len(np.arange(n_rows)[row_selector])
+
+    matrix = np.full((n_selected, len(feature_cols)), np.nan)
+    for position, name in enumerate(feature_cols):
+        column = table.get(name)
+        if column is not None:
+            matrix[:, position] = column[row_selector]
+
+    return matrix
+
+
+def build_feature_matrix(
+    histories: Sequence[Sequence[float]],
+    currents: Sequence[float],
+    max_history_len: int,
+    feature_cols: List[str],
+) -> np.ndarray:
+    """
+    (N, history) -> (N, n_features)，列顺序与 feature_cols 一致
+    """
+
+    table = build_feature_table(histories, currents, max_history_len)
+    return select_feature_matrix(table, feature_cols)
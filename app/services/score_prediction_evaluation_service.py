@@ -15,8 +15,10 @@ from app.core.constants import Level1BrainDomain
 from app.core.errors.exceptions import BizError
 from app.services.plan_rule_engine import (
     build_score_prediction,
+    build_score_predictions_batch,
     enrich_user_profile_with_domain_histories,
 )
+from app.core.registry import ResourceRegistry
 from configs.loader import load_config
 from models.model_factory import ModelManager
 from utils.dataframe_utils import ColumnAccessor, safe_get
@@ -54,7 +56,14 @@ class ScorePredictionEvaluationService:
         self,
         config: Dict[str, Any] | None = None,
         model_manager: ModelManager | None = None,
+        registry: ResourceRegistry | None = None,
     ):
+        # registry 提供已加载的模型与配置（只读共享），无需重新加载 checkpoint
+        self.registry = registry
+        if registry is not None:
+            config = registry.config
+            model_manager = model_manager or registry.model_manager
+
         self.config = config or load_config()
         self.model_manager = model_manager
         self.user_filter_stats: Dict[str, int] = {}
@@ -152,8 +161,9 @@ class ScorePredictionEvaluationService:
 
         tolerance = float(eval_cfg.get("tolerance", 5))
 
-        details: List[dict] = []
-        for _, row in user_df.iterrows():
+        profiles: List[dict] = []
+        actual_scores_list: List[Dict[str, Any]] = []
+        for row in user_df.to_dict("records"):
             profile = self._build_validation_profile(row=row, cols=cols)
             actual_scores = self._build_actual_scores(row=row, cols=cols)
 
@@ -165,13 +175,19 @@ class ScorePredictionEvaluationService:
                     profile,
                     config=self.config,
                 )
+            except BizError:
+                continue
 
-                score_prediction = build_score_prediction(
-                    profile,
-                    model_manager=self._get_model_manager(),
-                    config=self.config,
-                )
-            except (BizError, ValueError):
+            profiles.append(profile)
+            actual_scores_list.append(actual_scores)
+
+        score_predictions = self._predict_scores(profiles)
+
+        details: List[dict] = []
+        for profile, score_prediction, actual_scores in zip(
+            profiles, score_predictions, actual_scores_list
+        ):
+            if score_prediction is None:
                 continue
 
             details.extend(
@@ -185,6 +201,37 @@ class ScorePredictionEvaluationService:
 
         return details
 
+    def _predict_scores(self, profiles: List[dict]) -> List[Any]:
+        """
+        所有用户一次批量预测（每个维度模型只 predict 一次）；
+        批量失败时逐个用户回退，跳过预测失败的用户，与逐个预测的结果一致
+        """
+
+        model_manager = self._get_model_manager()
+        try:
+            return build_score_predictions_batch(
+                profiles,
+                model_manager=model_manager,
+                config=self.config,
+            )
+        except ValueError as e:
+            logger.warning(f"[SCORE_PREDICTION_BATCH_FALLBACK] error={e}")
+
+        score_predictions = []
+        for profile in profiles:
+            try:
+                score_predictions.append(
+                    build_score_prediction(
+                        profile,
+                        model_manager=model_manager,
+                        config=self.config,
+                    )
+                )
+            except (BizError, ValueError):
+                score_predictions.append(None)
+
+        return score_predictions
+
     def _build_validation_profile(
         self,
         *,
@@ -281,6 +328,9 @@ class ScorePredictionEvaluationService:
         return details
 
     def _load_column_accessor(self) -> ColumnAccessor:
+        if self.registry is not None:
+            return self.registry.column_accessor(CognitiveL1DatasetName.USER_BRAIN_SCORE)
+
         mapping_path = self.config["column_mapping"][
             CognitiveL1DatasetName.USER_BRAIN_SCORE.value
         ]
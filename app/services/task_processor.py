@@ -1,24 +1,201 @@
 # app/services/task_processor.py
 
-from typing import Dict, List, Any
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Any, Tuple
 from collections import defaultdict
 from pathlib import Path
 
 from app.core.cognitive_l1.constants import (
     CognitiveL1DatasetName,
+    Level2BrainDomain,
     TaskColumnName,
     UserTrainingColumnName,
 )
 from app.core.constants import Level1BrainDomain
 from app.schemas.common import Task
-from utils.dataframe_utils import ColumnAccessor, safe_get
+from utils.dataframe_utils import ColumnAccessor
 from utils.logger import get_logger
+from utils.text_utils import parse_age_value
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pydantic import TypeAdapter, ValidationError
 import json
 import numpy as np
 
 logger = get_logger(__name__)
 
+# 训练任务 parquet 中读取的字段（TaskColumnName 成员名小写，即 Task 字段名）
+TASK_RECORD_FIELDS = (
+    "task_id",
+    "task_name",
+    "age_min",
+    "age_max",
+    "paradigm",
+    "cognitive_domain",
+    "sub_cognitive_domain",
+    "difficulty",
+    "start_level",
+    "level_max",
+    "initial_difficulty",
+    "life_interpretation",
+    "min_duration",
+    "max_duration",
+    "training_time",
+)
+_TASK_LIST_ADAPTER = TypeAdapter(List[Task])
+
+TASK_REPOSITORY_FORMAT_VERSION = "1"
+TASK_REPOSITORY_SCHEMA = pa.schema(
+    [
+        ("task_id", pa.string()),
+        ("task_name", pa.string()),
+        ("age_min", pa.float64()),
+        ("age_max", pa.float64()),
+        ("paradigm", pa.string()),
+        ("cognitive_domain", pa.string()),
+        ("sub_cognitive_domain", pa.string()),
+        ("difficulty", pa.float64()),
+        ("start_level", pa.int64()),
+        ("level_max", pa.int64()),
+        ("initial_difficulty", pa.float64()),
+        ("life_interpretation", pa.string()),
+        ("min_duration", pa.int64()),
+        ("max_duration", pa.int64()),
+        ("training_time", pa.int64()),
+        ("l1_index", pa.int64()),
+        ("l2_index", pa.int64()),
+    ]
+)
+
+# repository 文件路径 -> (文件版本, repo)
+_repository_cache_lock = threading.Lock()
+_repository_cache: Dict[str, Tuple[Tuple[int, int], Dict[str, Any]]] = {}
+
+
+@dataclass(frozen=True)
+class TaskCoordIndex:
+    """
+    task × (L1, L2) 稀疏关联矩阵（COO 格式）
+
+    - task_rows: 每个坐标所属 task 在 task_list 中的位置
+    - flat_coords: 坐标在展平的 4x19 矩阵中的位置（l1 * 19 + l2）
+    """
+
+    task_rows: np.ndarray
+    flat_coords: np.ndarray
+    n_tasks: int
+
+    @classmethod
+    def from_tasks(cls, task_list: List[Task]) -> "TaskCoordIndex":
+        task_rows: List[int] = []
+        flat_coords: List[int] = []
+
+        for position, task in enumerate(task_list):
+            for l1, l2 in task.brain_coord or []:
+                task_rows.append(position)
+                flat_coords.append(l1 * len(Level2BrainDomain) + l2)
+
+        return cls(
+            task_rows=np.asarray(task_rows, dtype=np.intp),
+            flat_coords=np.asarray(flat_coords, dtype=np.intp),
+            n_tasks=len(task_list),
+        )
+
+    @classmethod
+    def from_level_indices(
+        cls,
+        l1_index: np.ndarray,
+        l2_index: np.ndarray,
+    ) -> "TaskCoordIndex":
+        """
+        由列式仓库的 l1_index / l2_index 列构建（每个 task 至多一个坐标，缺失为 NaN）
+        """
+
+        l1_index = np.asarray(l1_index, dtype=float)
+        l2_index = np.asarray(l2_index, dtype=float)
+        task_rows = np.flatnonzero(~np.isnan(l1_index))
+
+        return cls(
+            task_rows=task_rows.astype(np.intp),
+            flat_coords=(
+                l1_index[task_rows] * len(Level2BrainDomain) + l2_index[task_rows]
+            ).astype(np.intp),
+            n_tasks=len(l1_index),
+        )
+
+    def score(self, target_matrix: np.ndarray) -> np.ndarray:
+        """
+        一次稀疏矩阵-向量乘：每个 task 的得分 = 其坐标在目标矩阵上的权重之和
+        """
+
+        weights = np.asarray(target_matrix, dtype=float).ravel()[self.flat_coords]
+        return np.bincount(self.task_rows, weights=weights, minlength=self.n_tasks)
+
+
+class AgeCompatibilityIndex:
+    """
+    任务年龄适配索引
+
+    任务适配条件 age_min <= age <= age_max（缺失端不限制），
+    适配集合只在区间端点处变化：m 个有序端点把数轴切成 2m+1 个区域
+    （m+1 个开区间 + m 个端点本身），每个区域的适配任务在构建时算好，
+    查询只需一次二分
+    """
+
+    def __init__(self, task_list: List[Task], age_min: np.ndarray, age_max: np.ndarray):
+        lower = np.where(np.isnan(age_min), -np.inf, age_min)
+        upper = np.where(np.isnan(age_max), np.inf, age_max)
+
+        endpoints = np.concatenate([lower, upper])
+        self.points = np.unique(endpoints[np.isfinite(endpoints)])
+        self.all_positions = np.arange(len(task_list))
+        self.all_tasks = task_list
+
+        self._regions: List[Tuple[np.ndarray, List[Task]]] = []
+        for age in self._representative_ages():
+            positions = np.flatnonzero((lower <= age) & (age <= upper))
+            self._regions.append((positions, [task_list[i] for i in positions]))
+
+    def _representative_ages(self) -> List[float]:
+        points = self.points
+        if len(points) == 0:
+            return [0.0]
+
+        ages = [points[0] - 1]
+        for i, point in enumerate(points):
+            ages.append(point)
+            ages.append(point + 1 if i == len(points) - 1 else (point + points[i + 1]) / 2)
+        return ages
+
+    @classmethod
+    def from_tasks(cls, task_list: List[Task]) -> "AgeCompatibilityIndex":
+        def bound(value: Any) -> float:
+            parsed = parse_age_value(value)
+            return np.nan if parsed is None else parsed
+
+        return cls(
+            task_list,
+            np.array([bound(t.age_min) for t in task_list], dtype=float),
+            np.array([bound(t.age_max) for t in task_list], dtype=float),
+        )
+
+    def lookup(self, age_value: float | None) -> Tuple[np.ndarray, List[Task]]:
+        """
+        返回 (适配任务在 task_list 中的位置, 适配任务列表)；年龄未知时返回全部任务
+        """
+
+        if age_value is None or np.isnan(age_value):
+            return self.all_positions, self.all_tasks
+
+        i = int(np.searchsorted(self.points, age_value, side="left"))
+        if i < len(self.points) and self.points[i] == age_value:
+            return self._regions[2 * i + 1]
+        return self._regions[2 * i]
+
 
 def build_level2_to_level1_map(task_repo: Dict) -> Dict[str, str]:
     level2_to_level1_map = task_repo.get("level2_to_level1_map")
@@ -37,49 +214,60 @@ def build_level2_to_level1_map(task_repo: Dict) -> Dict[str, str]:
     return derived_map
 
 
-def fetch_task_info(config: Dict[str, Any]) -> Dict[str, Any]:
-    """
-    从 parquet 构建 task 数据结构
+def fetch_task_frame(config: Dict[str, Any]) -> pd.DataFrame:
     """
+    读取训练任务 parquet，按 column mapping 批量重命名为 Task 字段名
 
-    # 1 读取 parquet
-    task_path = config["task"]["training_task"]
-    df = pd.read_parquet(task_path)
+    - 只读取需要的列，缺失列补 None
+    - NaN / numpy 标量按列统一转换为 None / Python 标量（与 safe_get 一致）
+    """
 
-    # 2 读取 column mapping
+    # 1 读取 column mapping
     with open(
         config["column_mapping"][CognitiveL1DatasetName.TRAINING_TASK.value]
     ) as f:
         COLUMN_MAPPING = json.load(f)
 
     cols = ColumnAccessor(COLUMN_MAPPING, TaskColumnName)
+    rename = {getattr(cols, field): field for field in TASK_RECORD_FIELDS}
 
-    tasks = []
-
-    # 3 遍历 dataframe
-    for _, row in df.iterrows():
-
-        task = {
-            "task_id": safe_get(row, cols.task_id),
-            "task_name": safe_get(row, cols.task_name),
-            "age_min": safe_get(row, cols.age_min),
-            "age_max": safe_get(row, cols.age_max),
-            "paradigm": safe_get(row, cols.paradigm),
-            "cognitive_domain": safe_get(row, cols.cognitive_domain),
-            "sub_cognitive_domain": safe_get(row, cols.sub_cognitive_domain),
-            "difficulty": safe_get(row, cols.difficulty),
-            "start_level": safe_get(row, cols.start_level),
-            "level_max": safe_get(row, cols.level_max),
-            "initial_difficulty": safe_get(row, cols.initial_difficulty),
-            "life_interpretation": safe_get(row, cols.life_interpretation),
-            "min_duration": safe_get(row, cols.min_duration),
-            "max_duration": safe_get(row, cols.max_duration),
-            "training_time": safe_get(row, cols.training_time),
-        }
+    # 2 读取 parquet（只读需要的列）
+    task_path = config["task"]["training_task"]
+    available = set(pq.read_schema(task_path).names)
+    df = pd.read_parquet(
+        task_path,
+        columns=[source for source in rename if source in available],
+    )
+
+    # 3 批量重命名 + 缺失列补齐 + 统一空值
+    frame = df.rename(columns=rename).reindex(columns=list(TASK_RECORD_FIELDS))
+    frame = frame.astype(object).where(frame.notna(), None)
+
+    return frame
+
+
+def fetch_task_info(config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    从 parquet 构建 task 数据结构
+    """
 
-        tasks.append(task)
+    return {"tasks": fetch_task_frame(config).to_dict("records")}
 
-    return {"tasks": tasks}
+
+def _parse_tasks(records: List[Dict[str, Any]]) -> Tuple[List[Task], List[bool]]:
+    """
+    批量解析 Task，返回 (解析成功的 Task 列表, 每条记录是否解析成功)
+
+    先整批交给 pydantic 校验；有非法记录时退回逐条解析并记录 warning
+    """
+
+    try:
+        return _TASK_LIST_ADAPTER.validate_python(records), [True] * len(records)
+    except ValidationError:
+        pass
+
+    parsed = [_parse_task(t) for t in records]
+    return [t for t in parsed if t is not None], [t is not None for t in parsed]
 
 
 def _parse_task(t: dict) -> Task | None:
@@ -91,39 +279,48 @@ def _parse_task(t: dict) -> Task | None:
         return None
 
 
-def _build_level2_to_level1_mapping(task_list: List[Task]) -> Dict[str, str]:
-    level2_to_level1_map: Dict[str, str] = {}
-
-    for task in task_list:
-        raw_sub_domain = task.sub_cognitive_domain
-        if not raw_sub_domain:
-            continue
-
-        sub_domains = [item.strip() for item in raw_sub_domain.split(";") if item.strip()]
-
-        for sub_domain in sub_domains:
-            if "_" not in sub_domain:
-                continue
+def _build_level2_to_level1_mapping(task_frame: pd.DataFrame) -> Dict[str, str]:
+    """
+    由 sub_cognitive_domain 列（"L1_L2;L1_L2"）构建 L2 -> L1 映射
 
-            level1_name, level2_name = sub_domain.split("_", 1)
-            level1_name = level1_name.strip()
-            level2_name = level2_name.strip()
+    同一 L2 对应多个 L1 时以先出现的为准，冲突记录 warning
+    """
 
-            if not level1_name or not level2_name:
-                continue
+    items = (
+        task_frame[["task_id", "sub_cognitive_domain"]]
+        .dropna(subset=["sub_cognitive_domain"])
+        .assign(item=lambda d: d["sub_cognitive_domain"].str.split(";"))
+        .explode("item")
+    )
+    items = items[items["item"].str.contains("_", regex=False, na=False)]
 
-            existed_level1 = level2_to_level1_map.get(level2_name)
-            if existed_level1 and existed_level1 != level1_name:
-                logger.warning(
-                    "[L2_L1_MAP_CONFLICT] level2=%s existed_level1=%s new_level1=%s task_id=%s",
-                    level2_name,
-                    existed_level1,
-                    level1_name,
-                    task.task_id,
-                )
-                continue
+    parts = items["item"].str.strip().str.split("_", n=1, expand=True)
+    if parts.empty:
+        return {}
 
-            level2_to_level1_map[level2_name] = level1_name
+    pairs = pd.DataFrame(
+        {
+            "task_id": items["task_id"].to_numpy(),
+            "level1": parts[0].str.strip().to_numpy(),
+            "level2": parts[1].str.strip().to_numpy(),
+        }
+    )
+    pairs = pairs[(pairs["level1"] != "") & (pairs["level2"] != "")]
+
+    first = pairs.drop_duplicates("level2", keep="first")
+    level2_to_level1_map = dict(zip(first["level2"], first["level1"]))
+
+    conflicts = pairs[
+        pairs["level1"].to_numpy() != pairs["level2"].map(level2_to_level1_map).to_numpy()
+    ].drop_duplicates(["level2", "level1"])
+    for conflict in conflicts.itertuples(index=False):
+        logger.warning(
+            "[L2_L1_MAP_CONFLICT] level2=%s existed_level1=%s new_level1=%s task_id=%s",
+            conflict.level2,
+            level2_to_level1_map[conflict.level2],
+            conflict.level1,
+            conflict.task_id,
+        )
 
     return level2_to_level1_map
 
@@ -164,32 +361,35 @@ def build_task_repository_assets(config: Dict[str, Any]) -> Dict[str, Any]:
 
     logger.info("[TASK_REPO_BUILD_START] start building task repository assets")
 
-    raw_task_info = fetch_task_info(config=config)
-    raw_tasks = raw_task_info.get("tasks", [])
+    timings: Dict[str, float] = {}
+    stage_start = time.perf_counter()
 
-    # 1 解析 Task
-    task_list: List[Task] = [
-        task for t in raw_tasks if (task := _parse_task(t)) is not None
-    ]
+    task_frame = fetch_task_frame(config)
+    total_raw = len(task_frame)
+    timings["read"] = time.perf_counter() - stage_start
 
-    # 2 cognitive_domain 校验
+    # 1 cognitive_domain 校验（向量化过滤）
+    stage_start = time.perf_counter()
     VALID_DOMAINS = {d.value for d in Level1BrainDomain}
 
-    filtered_tasks: List[Task] = []
-
-    for task in task_list:
-
-        if task.cognitive_domain not in VALID_DOMAINS:
-            logger.warning(
-                "[TASK_INVALID_DOMAIN] task_id=%s domain=%s",
-                task.task_id,
-                task.cognitive_domain,
-            )
-            continue
-
-        filtered_tasks.append(task)
-
-    task_list = filtered_tasks
+    valid_domain = task_frame["cognitive_domain"].isin(VALID_DOMAINS)
+    for task_id, domain in task_frame.loc[
+        ~valid_domain, ["task_id", "cognitive_domain"]
+    ].itertuples(index=False):
+        logger.warning(
+            "[TASK_INVALID_DOMAIN] task_id=%s domain=%s",
+            task_id,
+            domain,
+        )
+
+    task_frame = task_frame[valid_domain]
+    timings["domain_filter"] = time.perf_counter() - stage_start
+
+    # 2 解析 Task（整批校验，失败时逐条定位）
+    stage_start = time.perf_counter()
+    task_list, parsed_mask = _parse_tasks(task_frame.to_dict("records"))
+    task_frame = task_frame[parsed_mask]
+    timings["parse"] = time.perf_counter() - stage_start
 
     # 3 task_id 索引
     task_index: Dict[str, Task] = {t.task_id: t for t in task_list if t.task_id}
@@ -200,7 +400,9 @@ def build_task_repository_assets(config: Dict[str, Any]) -> Dict[str, Any]:
     for task in task_list:
         level1_grouped[task.cognitive_domain].append(task)
 
-    level2_to_level1_map = _build_level2_to_level1_mapping(task_list)
+    stage_start = time.perf_counter()
+    level2_to_level1_map = _build_level2_to_level1_mapping(task_frame)
+    timings["level2_map"] = time.perf_counter() - stage_start
 
     repo = {
         "task_list": task_list,
@@ -211,95 +413,260 @@ def build_task_repository_assets(config: Dict[str, Any]) -> Dict[str, Any]:
 
     logger.debug(
         "[TASK_REPO_BUILT] total_raw=%s valid_tasks=%s level1_keys=%s",
-        len(raw_tasks),
+        total_raw,
         len(task_list),
         len(level1_grouped),
     )
 
     # =========================
-    # 保存 JSON 文件
+    # 保存仓库文件
     # =========================
 
     repo_path = Path(config["task"]["repository"])
+    json_export_path = config["task"].get("repository_json_export")
     level2_to_level1_map_path = Path(config["task"]["level2_to_level1_map"])
 
     # 如果目录不存在则创建
     repo_path.parent.mkdir(parents=True, exist_ok=True)
     level2_to_level1_map_path.parent.mkdir(parents=True, exist_ok=True)
 
-    # Task 对象需要转换为 dict
+    # 每个 task 只序列化一次（二级脑能力按一级脑能力排序）
+    serialized_tasks = [_serialize_task_for_repository(t) for t in repo["task_list"]]
+
+    stage_start = time.perf_counter()
+    if repo_path.suffix == ".json":
+        _write_task_repository_json(repo_path, repo, serialized_tasks)
+    else:
+        _write_task_repository_arrow(repo_path, serialized_tasks, level2_to_level1_map)
+
+    if json_export_path and Path(json_export_path) != repo_path:
+        json_export_path = Path(json_export_path)
+        json_export_path.parent.mkdir(parents=True, exist_ok=True)
+        _write_task_repository_json(json_export_path, repo, serialized_tasks)
+        logger.info("[TASK_REPO_JSON_EXPORTED] path=%s", json_export_path)
+
+    _write_json_atomic(level2_to_level1_map_path, level2_to_level1_map)
+    timings["write"] = time.perf_counter() - stage_start
+
+    logger.info("[TASK_REPO_SAVED] path=%s", repo_path)
+    logger.info("[L2_TO_L1_MAP_SAVED] path=%s size=%s", level2_to_level1_map_path, len(level2_to_level1_map))
+
+    # 发布到进程内缓存：直接读回刚写入的文件，与其它进程加载结果完全一致
+    stage_start = time.perf_counter()
+    published_repo = _load_task_repository_file(repo_path)
+    _publish_task_repository(repo_path, published_repo)
+    timings["publish"] = time.perf_counter() - stage_start
+
+    logger.info(
+        "[TASK_REPO_BUILD_TIMING] %s",
+        " ".join(f"{stage}={seconds:.3f}s" for stage, seconds in timings.items()),
+    )
+    logger.info(
+        "[TASK_REPO_BUILD_END] finished building task repository assets valid_tasks=%s",
+        len(task_list),
+    )
+
+    return published_repo
+
+
+def _write_task_repository_json(
+    path: Path,
+    repo: Dict[str, Any],
+    serialized_tasks: List[Dict[str, Any]],
+) -> None:
+    """
+    旧版 JSON 格式（task_list / task_index / level1_grouped_tasks 三份展开），仅供人工查看
+    """
+
+    serialized_by_task = {
+        id(t): serialized for t, serialized in zip(repo["task_list"], serialized_tasks)
+    }
+
     json_repo = {
-        "task_list": [_serialize_task_for_repository(t) for t in repo["task_list"]],
+        "task_list": serialized_tasks,
         "task_index": {
-            k: _serialize_task_for_repository(v)
-            for k, v in repo["task_index"].items()
+            k: serialized_by_task[id(v)] for k, v in repo["task_index"].items()
         },
         "level1_grouped_tasks": {
-            k: [_serialize_task_for_repository(t) for t in v]
+            k: [serialized_by_task[id(t)] for t in v]
             for k, v in repo["level1_grouped_tasks"].items()
         },
         "level2_to_level1_map": repo["level2_to_level1_map"],
     }
 
-    with open(repo_path, "w", encoding="utf-8") as f:
-        json.dump(json_repo, f, ensure_ascii=False, indent=2)
+    _write_json_atomic(path, json_repo)
 
-    with open(level2_to_level1_map_path, "w", encoding="utf-8") as f:
-        json.dump(level2_to_level1_map, f, ensure_ascii=False, indent=2)
 
-    logger.info("[TASK_REPO_SAVED] path=%s", repo_path)
-    logger.info("[L2_TO_L1_MAP_SAVED] path=%s size=%s", level2_to_level1_map_path, len(level2_to_level1_map))
-    logger.info(
-        "[TASK_REPO_BUILD_END] finished building task repository assets valid_tasks=%s",
-        len(task_list),
+def _write_task_repository_arrow(
+    path: Path,
+    serialized_tasks: List[Dict[str, Any]],
+    level2_to_level1_map: Dict[str, str],
+) -> None:
+    """
+    列式仓库文件（Arrow IPC），每个 task 一行，附带解析后的 l1_index / l2_index
+
+    task_index / 一级分组在加载时派生，level2_to_level1_map 存在 schema metadata 中
+    """
+
+    # 与 Task 校验器一致的坐标解析结果，加载时无需再次校验
+    parsed_tasks = [Task(**t) for t in serialized_tasks]
+    columns: Dict[str, List[Any]] = {
+        name: [t.get(name) for t in serialized_tasks]
+        for name in TASK_REPOSITORY_SCHEMA.names
+        if name not in {"l1_index", "l2_index"}
+    }
+    columns["l1_index"] = [t.l1_index for t in parsed_tasks]
+    columns["l2_index"] = [t.l2_index for t in parsed_tasks]
+
+    schema = TASK_REPOSITORY_SCHEMA.with_metadata(
+        {
+            "format_version": TASK_REPOSITORY_FORMAT_VERSION,
+            "level2_to_level1_map": json.dumps(level2_to_level1_map, ensure_ascii=False),
+        }
     )
+    table = pa.Table.from_pydict(columns, schema=schema)
 
-    return repo
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with pa.OSFile(str(tmp_path), "wb") as sink:
+        with pa.ipc.new_file(sink, schema) as writer:
+            writer.write_table(table)
 
+    os.replace(tmp_path, path)
 
-def build_task_repository(config: Dict[str, Any]) -> Dict[str, Any]:
-    return build_task_repository_assets(config)
 
+def _write_json_atomic(path: Path, data: Any) -> None:
+    """
+    先写临时文件再 rename，读取方不会读到写了一半的文件
+    """
 
-def get_task_repository(config: Dict[str, Any]) -> Dict[str, Any]:
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+    os.replace(tmp_path, path)
+
+
+def _file_version(path: Path) -> Tuple[int, int]:
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _assemble_task_repository(
+    task_list: List[Task],
+    level2_to_level1_map: Dict[str, str],
+    coord_index: TaskCoordIndex | None = None,
+) -> Dict[str, Any]:
     """
-    读取 Task Repository
-    如果不存在则重新构建
+    由 task_list 派生 task_index / level1_grouped_tasks / task_coord_index / age_index，
+    各视图共享同一个 Task 实例
     """
 
-    repo_path = Path(config["task"]["repository"])
+    task_index: Dict[str, Task] = {t.task_id: t for t in task_list if t.task_id}
 
-    # 如果不存在则重新构建
-    if not repo_path.exists():
-        logger.warning("Task repository not found. Rebuilding...")
-        return build_task_repository(config)
+    level1_grouped: Dict[str, List[Task]] = defaultdict(list)
+    for task in task_list:
+        level1_grouped[task.cognitive_domain].append(task)
+
+    return {
+        "task_list": task_list,
+        "task_index": task_index,
+        "level1_grouped_tasks": dict(level1_grouped),
+        "level2_to_level1_map": level2_to_level1_map,
+        "task_coord_index": coord_index or TaskCoordIndex.from_tasks(task_list),
+        "age_index": AgeCompatibilityIndex.from_tasks(task_list),
+    }
+
+
+def _publish_task_repository(repo_path: Path, repo: Dict[str, Any]) -> None:
+    with _repository_cache_lock:
+        _repository_cache[str(repo_path)] = (_file_version(repo_path), repo)
 
+
+def _load_task_repository_file(repo_path: Path) -> Dict[str, Any]:
+    if repo_path.suffix == ".json":
+        return _load_task_repository_json(repo_path)
+
+    return _load_task_repository_arrow(repo_path)
+
+
+def _load_task_repository_arrow(repo_path: Path) -> Dict[str, Any]:
+    logger.info("Loading task repository from %s", repo_path)
+
+    # 内存映射只省去读取时的一次拷贝；下面会物化为 Task 对象，每个进程仍各持一份，
+    # 相比 JSON 改进的是加载耗时（无需 json 解析与 pydantic 校验），而非进程间内存共享
+    table = pa.ipc.open_file(pa.memory_map(str(repo_path), "r")).read_all()
+
+    metadata = table.schema.metadata or {}
+    level2_to_level1_map = json.loads(
+        metadata.get(b"level2_to_level1_map", b"{}").decode("utf-8")
+    )
+
+    # 写入时已校验并解析坐标，这里跳过 pydantic 校验直接构造
+    task_list: List[Task] = []
+    for row in table.to_pylist():
+        l1_index, l2_index = row["l1_index"], row["l2_index"]
+        brain_coord = [] if l1_index is None else [(l1_index, l2_index)]
+        task_list.append(Task.model_construct(**row, brain_coord=brain_coord))
+
+    coord_index = TaskCoordIndex.from_level_indices(
+        table.column("l1_index").to_numpy(zero_copy_only=False),
+        table.column("l2_index").to_numpy(zero_copy_only=False),
+    )
+
+    return _assemble_task_repository(task_list, level2_to_level1_map, coord_index)
+
+
+def _load_task_repository_json(repo_path: Path) -> Dict[str, Any]:
     logger.info("Loading task repository from %s", repo_path)
 
     with open(repo_path, "r", encoding="utf-8") as f:
         repo_json = json.load(f)
 
     # =========================
-    # JSON -> Task 对象
+    # JSON -> Task 对象（每个 task 只解析一次）
     # =========================
 
     task_list: List[Task] = [Task(**t) for t in repo_json["task_list"]]
 
-    task_index: Dict[str, Task] = {
-        k: Task(**v) for k, v in repo_json["task_index"].items()
-    }
+    return _assemble_task_repository(
+        task_list,
+        repo_json.get("level2_to_level1_map", {}),
+    )
 
-    level1_grouped = defaultdict(list)
 
-    for domain, tasks in repo_json["level1_grouped_tasks"].items():
-        level1_grouped[domain] = [Task(**t) for t in tasks]
+def build_task_repository(config: Dict[str, Any]) -> Dict[str, Any]:
+    return build_task_repository_assets(config)
 
-    repo = {
-        "task_list": task_list,
-        "task_index": task_index,
-        "level1_grouped_tasks": dict(level1_grouped),
-        "level2_to_level1_map": repo_json.get("level2_to_level1_map", {}),
-    }
+
+def get_task_repository(config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    读取 Task Repository
+    如果不存在则重新构建
+
+    按文件版本（mtime + size）缓存，只有 build_task_repository_assets
+    发布新文件后才会重新加载；返回的 repo 为进程内共享只读对象
+    """
+
+    repo_path = Path(config["task"]["repository"])
+
+    # 如果不存在则重新构建
+    if not repo_path.exists():
+        logger.warning("Task repository not found. Rebuilding...")
+        return build_task_repository(config)
+
+    version = _file_version(repo_path)
+    cached = _repository_cache.get(str(repo_path))
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    with _repository_cache_lock:
+        cached = _repository_cache.get(str(repo_path))
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        repo = _load_task_repository_file(repo_path)
+        _repository_cache[str(repo_path)] = (version, repo)
 
     return repo
 
@@ -374,7 +741,10 @@ def build_train_eval_dataset(config: Dict[str, Any]):
     # =========================
     dataset_path.parent.mkdir(parents=True, exist_ok=True)
 
-    df.to_parquet(dataset_path, index=False)
+    # 先写临时文件再 rename：已发布快照通过硬链接引用旧文件，不能原地覆盖
+    tmp_path = dataset_path.with_name(f".{dataset_path.name}.{os.getpid()}.tmp")
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, dataset_path)
 
     logger.info("[DATASET_SAVED] path=%s rows=%s", dataset_path, len(df))
 
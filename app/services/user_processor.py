@@ -1,21 +1,27 @@
 # app/services/user_processor.py
-import json
 from numbers import Number
-from typing import Any, Dict
+from typing import Any, Dict, List, Mapping, Tuple
 
 import numpy as np
 import pandas as pd
 
-from app.core.cognitive_l1.constants import (
-    CognitiveL1DatasetName,
-    MAX_HISTORY_WEEKS,
-    UserTrainingColumnName,
-)
+from app.core.cognitive_l1.constants import MAX_HISTORY_WEEKS
 from app.core.constants import Level1BrainDomain
 from app.core.errors.error_codes import ErrorCode
 from app.core.errors.exceptions import BizError
+from app.repositories.user_repo import get_user_profile_store
 from app.schemas.common import Task
 from utils.dataframe_utils import ColumnAccessor, safe_get
+from utils.text_utils import parse_age_value
+
+
+# 一级脑能力 -> 用户数据列名后缀（latest_* / week{n}_*）
+DOMAIN_COLUMN_SUFFIXES = {
+    Level1BrainDomain.MEMORY.value: "memory",
+    Level1BrainDomain.EXECUTIVE.value: "executive",
+    Level1BrainDomain.ATTENTION.value: "attention",
+    Level1BrainDomain.PERCEPTION.value: "perception",
+}
 
 
 def _build_level1_scores(user_row, cols: ColumnAccessor, week: int) -> Dict[str, Any]:
@@ -62,69 +68,67 @@ def fetch_user_profile(user_id: str, patient_code: str, config: Dict[str, Any])
     从 patient 数据中读取用户画像（优化版）
     """
 
-    patient_path = config["task"]["user_brain_score"]
-    df = pd.read_parquet(patient_path)
+    store = get_user_profile_store(config)
 
-    with open(
-        config["column_mapping"][CognitiveL1DatasetName.USER_BRAIN_SCORE.value]
-    ) as f:
-        COLUMN_MAPPING = json.load(f)
-
-    cols = ColumnAccessor(COLUMN_MAPPING, UserTrainingColumnName)
+    # ======================
+    # Step 1-3: 索引查找 + 双参数一致性校验 + 单参数 fallback
+    # ======================
+    user_row = store.find_user_row(user_id, patient_code)
 
     # ======================
-    # Step 1: 分别查找
+    # Step 4: 构建画像
     # ======================
-    user_row_by_uid = None
-    user_row_by_pid = None
+    return build_user_profile(user_row, store.cols, user_id, patient_code)
 
-    if user_id:
-        tmp = df[df[cols.user_id] == user_id]
-        if not tmp.empty:
-            user_row_by_uid = tmp.iloc[0]
 
-    if patient_code:
-        tmp = df[df[cols.patient_code] == patient_code]
-        if not tmp.empty:
-            user_row_by_pid = tmp.iloc[0]
+def fetch_user_profiles_batch(
+    identities: List[Tuple[str | None, str | None]],
+    config: Dict[str, Any],
+) -> Tuple[List[Dict | BizError], pd.DataFrame, List[int]]:
+    """
+    批量读取用户画像
 
-    # ======================
-    # Step 2: 双参数一致性校验（核心简化）
-    # ======================
-    if user_id and patient_code:
-        if user_row_by_uid is None or user_row_by_pid is None:
-            raise BizError(
-                ErrorCode.USER_ID_PATIENT_CODE_MISMATCH,
-                user_id=user_id,
-                patient_code=patient_code,
-            )
-
-        # 是否同一人
-        if safe_get(user_row_by_uid, cols.patient_code) != safe_get(user_row_by_pid, cols.patient_code):
-            raise BizError(
-                ErrorCode.USER_ID_PATIENT_CODE_MISMATCH,
-                user_id=user_id,
-                patient_code=patient_code,
-            )
-
-        user_row = user_row_by_uid
+    返回 (画像或 BizError（与输入一一对应）, 成功用户的行 frame, 成功用户在输入中的位置)；
+    用户行一次 take 取出，逐行按 dict 构建画像，避免逐个构造 pd.Series
+    """
 
-    # ======================
-    # Step 3: 单参数 fallback
-    # ======================
-    else:
-        user_row = user_row_by_uid if user_row_by_uid is not None else user_row_by_pid
+    store = get_user_profile_store(config)
 
-        if user_row is None:
-            raise BizError(
-                ErrorCode.USER_NOT_FOUND,
-                user_id=user_id,
-                patient_code=patient_code,
-            )
+    results: List[Dict | BizError] = [None] * len(identities)
+    found: List[int] = []
+    positions: List[int] = []
+
+    for i, (user_id, patient_code) in enumerate(identities):
+        try:
+            positions.append(store.find_user_position(user_id, patient_code))
+            found.append(i)
+        except BizError as e:
+            results[i] = e
+
+    frame = store.take(positions)
+    kept: List[int] = []
+
+    for row_number, (i, record) in enumerate(zip(found, frame.to_dict("records"))):
+        user_id, patient_code = identities[i]
+        try:
+            results[i] = build_user_profile(record, store.cols, user_id, patient_code)
+            kept.append(row_number)
+        except BizError as e:
+            results[i] = e
+
+    return results, frame.iloc[kept], [found[row] for row in kept]
+
+
+def build_user_profile(
+    user_row: Mapping[str, Any],
+    cols: ColumnAccessor,
+    user_id: str | None,
+    patient_code: str | None,
+) -> Dict:
+    """
+    由用户行（pd.Series 或 dict）构建画像
+    """
 
-    # ======================
-    # Step 4: 构建画像（不变）
-    # ======================
     latest_level1_scores = {
         Level1BrainDomain.MEMORY.value: safe_get(user_row, cols.latest_memory),
         Level1BrainDomain.EXECUTIVE.value: safe_get(user_row, cols.latest_executive),
@@ -162,6 +166,7 @@ def fetch_user_profile(user_id: str, patient_code: str, config: Dict[str, Any])
         "user_id": safe_get(user_row, cols.user_id),
         "patient_code": safe_get(user_row, cols.patient_code),
         "age": safe_get(user_row, cols.age),
+        "age_value": parse_age_value(safe_get(user_row, cols.age)),
         "disease_tag": safe_get(user_row, cols.disease),
         "latest_level1_scores": latest_level1_scores,
         "last_84d_latest_level1_scores": last_84d_latest_level1_scores,
@@ -177,3 +182,36 @@ def fetch_user_profile(user_id: str, patient_code: str, config: Dict[str, Any])
         )
 
     return profile
+
+
+def extract_domain_histories_batch(
+    frame: pd.DataFrame,
+    cols: ColumnAccessor,
+    max_history_len: int,
+) -> List[Dict[str, List[Any]]]:
+    """
+    按列批量提取各脑能力的连续历史序列（与 enrich_user_profile_with_domain_histories 一致）
+
+    每个维度取 [latest, week1, ..., week(max_history_len-1)] 列，
+    从 latest 开始遇到第一个非数值即截断，再倒序为从远到近
+    """
+
+    weeks = range(1, min(max_history_len, MAX_HISTORY_WEEKS + 1))
+    is_number = np.frompyfunc(lambda v: isinstance(v, Number), 1, 1)
+    histories: List[Dict[str, List[Any]]] = [{} for _ in range(len(frame))]
+
+    for domain, suffix in DOMAIN_COLUMN_SUFFIXES.items():
+        columns = [getattr(cols, f"latest_{suffix}")] + [
+            getattr(cols, f"week{week}_{suffix}") for week in weeks
+        ]
+        values = frame[columns].astype(object)
+        values = values.where(values.notna(), None).to_numpy()
+
+        valid = is_number(values).astype(bool)
+        lengths = np.cumprod(valid, axis=1).sum(axis=1)
+
+        for row, length in enumerate(lengths):
+            histories[row][domain] = values[row, :length][::-1].tolist()
+
+    return histories
+
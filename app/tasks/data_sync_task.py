@@ -2,13 +2,42 @@
 app/tasks/data_sync_task.py
 
 定时将 CSV 转换为 Parquet
+
+每个阶段的输入签名 / 配置指纹 / 输出签名记录在同步清单（SyncManifest）中，
+输入未变化的阶段直接跳过；产物构建完成后发布为版本化快照（app.core.snapshots），
+用户画像存储与方案存储在新版本目录中构建完成后才切换 current
 """
 
 import asyncio
+import time
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Callable, Dict, List, Optional
 
-from app.data.datasets.cognitive_l1_dataset import load_and_preprocess_dataset
+from app.core.cognitive_l1.constants import CognitiveL1DatasetName
+from app.core.metrics import (
+    SYNC_PIPELINE_LAST_SUCCESS,
+    SYNC_STAGE_DURATION,
+    SYNC_STAGE_LAST_SUCCESS,
+)
+from app.core.snapshots import (
+    commit_snapshot,
+    discard_snapshot,
+    pin_snapshot,
+    snapshots_enabled,
+    stage_snapshot,
+)
+from app.core.sync_state import (
+    SyncManifest,
+    compute_data_version,
+    publish_sync_version,
+)
+from app.data.datasets.cognitive_l1_dataset import (
+    get_raw_numeric_columns,
+    load_and_preprocess_dataset,
+)
+from app.repositories.plan_repo import get_plan_store
+from app.repositories.user_repo import refresh_user_profile_store
+from app.services.chat_service import precompute_ai_plans_v2
 from app.services.task_processor import (
     build_task_repository_assets,
     build_train_eval_dataset,
@@ -19,7 +48,45 @@ from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
-async def raw_data_copy_job(config):
+# 进程内资源（用户画像存储）最近一次构建时的输入哈希
+_in_process_input_hashes: Dict[str, str] = {}
+
+
+async def run_stage(
+    manifest: Optional[SyncManifest],
+    stage: str,
+    inputs: List[Any],
+    config_fingerprint: Any,
+    outputs: List[Any],
+    func: Callable,
+    *args,
+) -> bool:
+    """
+    执行一个同步阶段；输入与配置未变化且输出完好时跳过
+
+    返回是否实际执行
+    """
+
+    if manifest is not None and await asyncio.to_thread(
+        manifest.is_fresh, stage, inputs, config_fingerprint, outputs
+    ):
+        logger.info(f"[SYNC_STAGE_SKIPPED] stage={stage}")
+        SYNC_STAGE_LAST_SUCCESS.set(time.time(), stage=stage)
+        return False
+
+    started_at = time.perf_counter()
+    await asyncio.to_thread(func, *args)
+    SYNC_STAGE_DURATION.observe(time.perf_counter() - started_at, stage=stage)
+
+    if manifest is not None:
+        await asyncio.to_thread(
+            manifest.record, stage, inputs, config_fingerprint, outputs
+        )
+    SYNC_STAGE_LAST_SUCCESS.set(time.time(), stage=stage)
+    return True
+
+
+async def raw_data_copy_job(config, manifest: Optional[SyncManifest] = None):
 
     raw_config = config.get("raw_data_sync", {})
     files = raw_config.get("files", [])
@@ -35,9 +102,12 @@ async def raw_data_copy_job(config):
                 logger.warning(f"Raw source not found: {src}")
                 continue
 
-            copy_file(src, dst)
+            copied = await run_stage(
+                manifest, f"raw:{dst}", [src], {}, [dst], copy_file, src, dst
+            )
 
-            logger.info(f"Raw data copied: {src} -> {dst}")
+            if copied:
+                logger.info(f"Raw data copied: {src} -> {dst}")
 
         logger.info("Raw data sync finished")
         return True
@@ -47,31 +117,55 @@ async def raw_data_copy_job(config):
         return False
 
 
+def _convert_and_preprocess(csv_path: str, parquet_path: str, config: dict):
+
+    parquet_name = Path(parquet_path).stem
+
+    logger.info(f"Starting CSV to Parquet sync: {csv_path} -> {parquet_path}")
+    csv_to_parquet(
+        csv_path=csv_path,
+        parquet_path=parquet_path,
+        config=config,
+        numeric_columns=get_raw_numeric_columns(config, Path(csv_path).stem),
+    )
+    logger.info(f"Finished CSV to Parquet sync: {csv_path} -> {parquet_path}")
+
+    logger.info(f"Starting dataset preprocess: {parquet_name}")
+    load_and_preprocess_dataset(config=config, parquet_name=parquet_name)
+    logger.info(f"Finished dataset preprocess: {parquet_name}")
+
+
 async def csv_to_parquet_once(
     csv_path: str,
     parquet_path: str,
     config: dict,
+    manifest: Optional[SyncManifest] = None,
 ):
 
     try:
 
-        logger.info(f"Starting CSV to Parquet sync: {csv_path} -> {parquet_path}")
-        await asyncio.to_thread(
-            csv_to_parquet,
-            csv_path=csv_path,
-            parquet_path=parquet_path,
-            config=config,
-        )
-        logger.info(f"Finished CSV to Parquet sync: {csv_path} -> {parquet_path}")
-
+        csv_name = Path(csv_path).stem
         parquet_name = Path(parquet_path).stem
-        logger.info(f"Starting dataset preprocess: {parquet_name}")
-        await asyncio.to_thread(
-            load_and_preprocess_dataset,
-            config=config,
-            parquet_name=parquet_name,
+        mapping_path = config.get("column_mapping", {}).get(parquet_name)
+        task_config = config.get("csv_to_parquet", {})
+
+        await run_stage(
+            manifest,
+            f"csv:{parquet_name}",
+            [csv_path, *([mapping_path] if mapping_path else [])],
+            {
+                "columns": config.get("columns", {}).get(csv_name),
+                "engine": task_config.get("engine"),
+                "row_limit": config.get("debug", {})
+                .get("dataset_row_limits", {})
+                .get(csv_name),
+            },
+            [parquet_path, config["raw_to_processed"][parquet_name]["processed"]],
+            _convert_and_preprocess,
+            csv_path,
+            parquet_path,
+            config,
         )
-        logger.info(f"Finished dataset preprocess: {parquet_name}")
 
         return True
 
@@ -80,30 +174,100 @@ async def csv_to_parquet_once(
         return False
 
 
-async def task_repository_once(config):
+async def task_repository_once(config, manifest: Optional[SyncManifest] = None):
+
+    task_cfg = config["task"]
+    outputs = [task_cfg["repository"], task_cfg["level2_to_level1_map"]]
+    if task_cfg.get("repository_json_export"):
+        outputs.append(task_cfg["repository_json_export"])
 
     try:
-        await asyncio.to_thread(build_task_repository_assets, config)
+        await run_stage(
+            manifest,
+            "task_repository",
+            [
+                task_cfg["training_task"],
+                config["column_mapping"][CognitiveL1DatasetName.TRAINING_TASK.value],
+            ],
+            {},
+            outputs,
+            build_task_repository_assets,
+            config,
+        )
     except Exception:
         logger.exception("Repository build failed")
 
 
-async def build_train_eval_dataset_once(config):
+async def build_train_eval_dataset_once(config, manifest: Optional[SyncManifest] = None):
+
+    dataset_cfg = config["train_eval_dataset"][
+        CognitiveL1DatasetName.USER_BRAIN_SCORE.value
+    ]
 
     try:
-        await asyncio.to_thread(build_train_eval_dataset, config)
+        await run_stage(
+            manifest,
+            "train_eval_dataset",
+            [
+                dataset_cfg["source"],
+                config["column_mapping"][CognitiveL1DatasetName.USER_BRAIN_SCORE.value],
+            ],
+            {},
+            [dataset_cfg["dataset"]],
+            build_train_eval_dataset,
+            config,
+        )
     except Exception:
         logger.exception("Train/eval dataset build failed")
 
 
-async def run_sync_pipeline(config: Dict[str, Any]):
+async def user_profile_store_refresh_once(config, manifest: Optional[SyncManifest] = None):
+
+    try:
+        # 用户画像存储在进程内，按本进程上次构建时的输入哈希判断是否需要重建
+        input_hash = None
+        if manifest is not None and manifest.skip_unchanged:
+            # 快照版本目录内容不可变，直接以版本号作为输入标识
+            input_hash = config.get("snapshot", {}).get("version")
+            if input_hash is None:
+                signature = await asyncio.to_thread(
+                    manifest.signature, config["task"]["user_brain_score"]
+                )
+                input_hash = signature["sha256"] if signature else None
+            if input_hash and _in_process_input_hashes.get("user_profile_store") == input_hash:
+                logger.info("[SYNC_STAGE_SKIPPED] stage=user_profile_store")
+                return
+
+        await asyncio.to_thread(refresh_user_profile_store, config)
+
+        if input_hash:
+            _in_process_input_hashes["user_profile_store"] = input_hash
+    except Exception:
+        logger.exception("User profile store refresh failed")
+
+
+async def plan_store_precompute_once(config, model_manager):
+
+    try:
+        store = get_plan_store(config)
+        if store is not None and store.data_version == compute_data_version(config):
+            logger.info("[SYNC_STAGE_SKIPPED] stage=plan_store_precompute")
+            return
+
+        await asyncio.to_thread(precompute_ai_plans_v2, config, model_manager)
+    except Exception:
+        logger.exception("Plan store precompute failed")
+
+
+async def run_sync_pipeline(config: Dict[str, Any], model_manager=None):
 
     task_config = config.get("csv_to_parquet", {})
     raw_files = task_config.get("raw_files", [])
+    manifest = SyncManifest.from_config(config)
 
     logger.info("Starting scheduled sync pipeline")
 
-    raw_data_ready = await raw_data_copy_job(config)
+    raw_data_ready = await raw_data_copy_job(config, manifest)
     if not raw_data_ready:
         logger.warning("Skip scheduled sync pipeline because raw data sync failed")
         return
@@ -114,6 +278,7 @@ async def run_sync_pipeline(config: Dict[str, Any]):
                 csv_path=item["csv"],
                 parquet_path=item["parquet"],
                 config=config,
+                manifest=manifest,
             )
             for item in raw_files
         )
@@ -124,8 +289,47 @@ async def run_sync_pipeline(config: Dict[str, Any]):
         return
 
     await asyncio.gather(
-        task_repository_once(config),
-        build_train_eval_dataset_once(config),
+        task_repository_once(config, manifest),
+        build_train_eval_dataset_once(config, manifest),
+    )
+
+    plan_store_cfg = config.get("plan_store", {})
+    precompute = plan_store_cfg.get("enabled", False) and plan_store_cfg.get(
+        "precompute_on_sync", True
     )
 
+    # 启用快照时先准备新版本目录（current 尚未切换），进程内资源与方案存储在其中构建完成后再切换
+    staged = None
+    if snapshots_enabled(config):
+        try:
+            staged = await asyncio.to_thread(
+                stage_snapshot, config, precompute and model_manager is not None
+            )
+        except Exception:
+            logger.exception("Snapshot staging failed")
+
+    serving_config = staged.config if staged is not None else pin_snapshot(config)
+
+    await user_profile_store_refresh_once(serving_config, manifest)
+
+    if precompute:
+        if model_manager is None:
+            logger.warning("Skip plan store precompute because no model manager is available")
+        elif snapshots_enabled(config) and staged is None:
+            # 已发布的版本目录不再写入
+            logger.info("[SYNC_STAGE_SKIPPED] stage=plan_store_precompute")
+        else:
+            await plan_store_precompute_once(serving_config, model_manager)
+
+    if staged is not None:
+        try:
+            await asyncio.to_thread(commit_snapshot, config, staged)
+        except Exception:
+            logger.exception("Snapshot publish failed")
+            await asyncio.to_thread(discard_snapshot, staged)
+
+    # 通知其它进程（API worker）重新加载数据快照
+    await asyncio.to_thread(publish_sync_version, config)
+    SYNC_PIPELINE_LAST_SUCCESS.set(time.time())
+
     logger.info("Scheduled sync pipeline finished")
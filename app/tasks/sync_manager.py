@@ -1,7 +1,15 @@
 # services/sync_tasks.py
 
 import asyncio
+import fcntl
+import os
+from pathlib import Path
+from typing import IO, Optional
 
+from app.core.snapshots import pin_snapshot
+from app.core.sync_state import read_sync_version, resolve_sync_version_path
+from app.repositories.user_repo import get_user_profile_store, refresh_user_profile_store
+from app.services.task_processor import get_task_repository
 from app.tasks.data_sync_task import run_sync_pipeline
 from utils.logger import get_logger
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
@@ -9,19 +17,69 @@ from apscheduler.triggers.cron import CronTrigger
 
 logger = get_logger(__name__)
 
+SYNC_MODE_EMBEDDED = "embedded"
+SYNC_MODE_WORKER = "worker"
+
+DEFAULT_LOCK_FILE = "data/internal/sync_worker.lock"
+
 _sync_pipeline_lock = asyncio.Lock()
 
 
-async def _run_sync_pipeline_locked(config):
+def acquire_worker_lock(path: str | Path) -> Optional[IO]:
+    """
+    非阻塞获取单实例文件锁（flock），已被其它进程持有时返回 None
+
+    返回的文件对象需保持打开直到流水线结束（或进程退出），关闭即释放锁
+    """
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    lock_file = open(path, "a+")
+    try:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        return None
+
+    lock_file.seek(0)
+    lock_file.truncate()
+    lock_file.write(str(os.getpid()))
+    lock_file.flush()
+    return lock_file
+
+
+def resolve_worker_lock_path(config) -> str:
+    return config.get("sync_tasks", {}).get("worker", {}).get("lock_file", DEFAULT_LOCK_FILE)
+
+
+async def _run_sync_pipeline_locked(config, model_manager=None, process_lock=True):
     if _sync_pipeline_lock.locked():
         logger.warning("Sync pipeline is already running; skip this trigger")
         return
 
     async with _sync_pipeline_lock:
-        await run_sync_pipeline(config)
+        if not process_lock:
+            await run_sync_pipeline(config, model_manager=model_manager)
+            return
+
+        # 嵌入模式下每个 uvicorn worker 都有调度器，用文件锁保证同一时间只有一个进程运行流水线
+        lock_path = resolve_worker_lock_path(config)
+        lock_file = acquire_worker_lock(lock_path)
+        if lock_file is None:
+            logger.info(f"[SYNC_PIPELINE_LOCKED] another process holds {lock_path}; skip this trigger")
+            return
 
+        try:
+            await run_sync_pipeline(config, model_manager=model_manager)
+        finally:
+            lock_file.close()
 
-def start_sync_tasks(config):
+
+def start_sync_tasks(config, model_manager=None, process_lock=True):
+    """
+    定时运行同步流水线；process_lock 为 False 时调用方已持有单实例文件锁（独立 worker）
+    """
 
     schedule_config = config.get("sync_tasks", {}).get("schedule", {})
     hour = schedule_config.get("hour", 2)
@@ -35,7 +93,7 @@ def start_sync_tasks(config):
     scheduler.add_job(
         _run_sync_pipeline_locked,
         trigger=trigger,
-        args=[config],
+        args=[config, model_manager, process_lock],
         id="sync_pipeline",
         name="sync_pipeline",
         coalesce=True,
@@ -51,6 +109,66 @@ def start_sync_tasks(config):
 
     if run_on_startup:
         logger.info("Starting initial sync pipeline")
-        asyncio.create_task(_run_sync_pipeline_locked(config))
+        asyncio.create_task(_run_sync_pipeline_locked(config, model_manager, process_lock))
 
     return scheduler
+
+
+def resolve_sync_mode(config) -> str:
+    """
+    embedded：API 进程内调度同步流水线
+    worker：由独立进程（scripts/start_worker.sh）运行，API 只监听版本文件
+    """
+
+    mode = config.get("sync_tasks", {}).get("mode", SYNC_MODE_EMBEDDED)
+    if mode not in (SYNC_MODE_EMBEDDED, SYNC_MODE_WORKER):
+        raise ValueError(f"Unsupported sync_tasks.mode: {mode}")
+    return mode
+
+
+def reload_data_snapshot(config):
+    """
+    同步完成后重新加载进程内数据：用户画像存储重建，任务仓库按文件版本重新加载
+
+    方案存储在文件替换后由 get_plan_store 自动重新打开；启用快照时加载 current 指向的版本
+    """
+
+    config = pin_snapshot(config)
+    if "snapshot" in config:
+        # 版本目录不可变：同一版本的存储已构建（如嵌入模式下由流水线构建）时直接复用
+        get_user_profile_store(config)
+    else:
+        refresh_user_profile_store(config)
+    get_task_repository(config)
+
+
+async def _watch_sync_version(config):
+    worker_cfg = config.get("sync_tasks", {}).get("worker", {})
+    poll_interval = float(worker_cfg.get("poll_interval_seconds", 5))
+    path = resolve_sync_version_path(config)
+
+    current = read_sync_version(config)
+    logger.info(f"[SYNC_VERSION_WATCH] path={path} current={current}")
+
+    while True:
+        await asyncio.sleep(poll_interval)
+
+        latest = read_sync_version(config)
+        if latest is None or latest == current:
+            continue
+
+        logger.info(f"[SYNC_VERSION_CHANGED] {current} -> {latest}")
+        try:
+            await asyncio.to_thread(reload_data_snapshot, config)
+            current = latest
+        except Exception:
+            # 下一轮继续重试
+            logger.exception("Reload data snapshot failed")
+
+
+def start_sync_version_watcher(config) -> asyncio.Task:
+    """
+    worker 模式下 API 进程轮询版本文件，变化时重新加载数据快照
+    """
+
+    return asyncio.create_task(_watch_sync_version(config))
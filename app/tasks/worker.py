@@ -0,0 +1,110 @@
+# app/tasks/worker.py
+"""
+独立数据同步 worker
+
+与 API 进程分离运行同步流水线（pandas 重计算不再与请求处理争抢 GIL / 内存），
+多个 uvicorn worker 时也只有一个流水线实例：
+
+    python -m app.tasks.worker          # 按 sync_tasks.schedule 定时运行
+    python -m app.tasks.worker --once   # 运行一次后退出
+
+流水线完成后写入 sync_tasks.worker.version_file，API 进程据此重新加载数据
+"""
+
+import argparse
+import asyncio
+import os
+import signal
+import sys
+from typing import Any, Dict, Optional
+
+from app.core.metrics import configure_metrics, registry as metrics_registry, run_metrics_flusher
+from app.tasks.data_sync_task import run_sync_pipeline
+from app.tasks.sync_manager import (
+    acquire_worker_lock,
+    resolve_worker_lock_path,
+    start_sync_tasks,
+)
+from configs.loader import load_config
+from models.model_factory import ModelManager
+from utils.logger import get_logger, setup_logging
+
+logger = get_logger(__name__)
+
+def _load_model_manager(config: Dict[str, Any]) -> Optional[ModelManager]:
+    # 只有方案预计算需要模型
+    plan_store_cfg = config.get("plan_store", {})
+    if not (
+        plan_store_cfg.get("enabled", False)
+        and plan_store_cfg.get("precompute_on_sync", True)
+    ):
+        return None
+
+    try:
+        model_manager = ModelManager()
+        model_manager.load_models(config)
+    except Exception:
+        # 模型不可用时仍然同步数据，只跳过方案预计算
+        logger.exception("Model loading failed, plan store precompute disabled")
+        return None
+    return model_manager
+
+
+async def _serve(config: Dict[str, Any], model_manager: Optional[ModelManager]):
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop_event.set)
+
+    scheduler = start_sync_tasks(config, model_manager=model_manager, process_lock=False)
+    metrics_flusher = (
+        asyncio.create_task(run_metrics_flusher(config))
+        if metrics_registry.multiprocess_dir is not None
+        else None
+    )
+    try:
+        await stop_event.wait()
+    finally:
+        scheduler.shutdown(wait=False)
+        if metrics_flusher is not None:
+            metrics_flusher.cancel()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Data sync worker")
+    parser.add_argument("--once", action="store_true", help="运行一次同步流水线后退出")
+    args = parser.parse_args(argv)
+
+    setup_logging()
+    config = load_config()
+
+    lock_path = resolve_worker_lock_path(config)
+    lock_file = acquire_worker_lock(lock_path)
+    if lock_file is None:
+        logger.warning(f"[SYNC_WORKER_LOCKED] another worker holds {lock_path}, exit")
+        return 1
+
+    logger.info(f"[SYNC_WORKER_START] pid={os.getpid()} once={args.once}")
+
+    # 同步阶段指标写入多进程目录，由 API 进程的 /api/metrics 合并输出
+    if config.get("metrics", {}).get("enabled", False):
+        configure_metrics(config)
+
+    model_manager = _load_model_manager(config)
+    try:
+        if args.once:
+            asyncio.run(run_sync_pipeline(config, model_manager=model_manager))
+        else:
+            asyncio.run(_serve(config, model_manager))
+    finally:
+        if model_manager is not None:
+            model_manager.close()
+        metrics_registry.flush()
+        lock_file.close()
+
+    logger.info("[SYNC_WORKER_STOP]")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
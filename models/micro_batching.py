@@ -0,0 +1,190 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class MicroBatchPredictor:
+    """
+    单个模型的微批推理包装
+
+    - 并发请求先进入队列，由后台线程在 window_ms 内（或凑满 max_batch_rows 行）合并
+    - 合并后的矩阵只调用一次 model.predict，再按行数拆回各调用方
+    - 合并预测失败时逐个请求重试，只有出错的请求收到异常
+    - 没有其它请求在途时直接在调用线程预测，不引入等待
+    """
+
+    def __init__(
+        self,
+        model,
+        name: str,
+        window_ms: float = 2.0,
+        max_batch_rows: int = 256,
+    ):
+        self.model = model
+        self.name = name
+        self.window_seconds = max(float(window_ms), 0.0) / 1000
+        self.max_batch_rows = max(int(max_batch_rows), 1)
+
+        self._queue: "queue.Queue[Tuple[np.ndarray, Future] | None]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._closed = False
+        # 放不进上一批的请求，作为下一批的首个请求（只由后台线程读写）
+        self._carry: Tuple[np.ndarray, Future] | None = None
+
+        self._direct_calls = 0
+        self._batches = 0
+        self._batched_requests = 0
+        self._batched_rows = 0
+        self._max_queue_depth = 0
+        self._max_batch_requests = 0
+
+        self._worker = threading.Thread(
+            target=self._run,
+            name=f"micro-batch-{name}",
+            daemon=True,
+        )
+        self._worker.start()
+
+    def predict(self, X) -> np.ndarray:
+        X = np.asarray(X, dtype=float)
+
+        with self._lock:
+            if self._closed:
+                raise RuntimeError(f"MicroBatchPredictor [{self.name}] is closed")
+
+            bypass = self._in_flight == 0
+            self._in_flight += 1
+
+            if bypass:
+                self._direct_calls += 1
+            else:
+                future: Future = Future()
+                self._queue.put((X, future))
+                self._max_queue_depth = max(
+                    self._max_queue_depth, self._queue.qsize()
+                )
+
+        if bypass:
+            try:
+                return self.model.predict(X)
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+
+        return future.result()
+
+    def _collect_batch(self, first: Tuple[np.ndarray, Future]) -> List[Tuple[np.ndarray, Future]]:
+        batch = [first]
+        rows = len(first[0])
+        deadline = time.monotonic() + self.window_seconds
+
+        while rows < self.max_batch_rows:
+            remaining = deadline - time.monotonic()
+            try:
+                item = (
+                    self._queue.get(timeout=remaining)
+                    if remaining > 0
+                    else self._queue.get_nowait()
+                )
+            except queue.Empty:
+                break
+
+            if item is None:
+                # 关闭信号留给主循环处理
+                self._queue.put(None)
+                break
+
+            if rows + len(item[0]) > self.max_batch_rows:
+                self._carry = item
+                break
+
+            batch.append(item)
+            rows += len(item[0])
+
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            first, self._carry = self._carry, None
+            if first is None:
+                first = self._queue.get()
+            if first is None:
+                return
+
+            batch = self._collect_batch(first)
+
+            try:
+                stacked = np.vstack([X for X, _ in batch])
+                preds = np.asarray(self.model.predict(stacked))
+            except Exception as e:
+                if len(batch) == 1:
+                    batch[0][1].set_exception(e)
+                else:
+                    logger.warning(
+                        "[MICRO_BATCH_RETRY_ITEMS] model=%s requests=%s error=%s",
+                        self.name,
+                        len(batch),
+                        e,
+                    )
+                    self._predict_items(batch)
+            else:
+                offset = 0
+                for X, future in batch:
+                    future.set_result(preds[offset: offset + len(X)])
+                    offset += len(X)
+
+                with self._lock:
+                    self._batches += 1
+                    self._batched_requests += len(batch)
+                    self._batched_rows += len(stacked)
+                    self._max_batch_requests = max(
+                        self._max_batch_requests, len(batch)
+                    )
+            finally:
+                with self._lock:
+                    self._in_flight -= len(batch)
+
+    def _predict_items(self, batch: List[Tuple[np.ndarray, Future]]) -> None:
+        for X, future in batch:
+            try:
+                future.set_result(np.asarray(self.model.predict(X)))
+            except Exception as e:
+                future.set_exception(e)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self._max_queue_depth,
+                "in_flight": self._in_flight,
+                "direct_calls": self._direct_calls,
+                "batches": self._batches,
+                "batched_requests": self._batched_requests,
+                "batched_rows": self._batched_rows,
+                "max_batch_requests": self._max_batch_requests,
+                "avg_batch_requests": (
+                    round(self._batched_requests / self._batches, 2)
+                    if self._batches
+                    else 0.0
+                ),
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+
+        self._queue.put(None)
+        self._worker.join(timeout=1)
+
+        logger.info("[MICRO_BATCH_CLOSED] model=%s stats=%s", self.name, self.stats())
@@ -1,18 +1,50 @@
+import importlib
+import sys
+import time
 from pathlib import Path
 from typing import Dict, Any
 
 from utils.logger import get_logger
-from models.lightgbm_model import LightGBMModel
-from models.mlp_model import MLPModel
-from models.xgboost_model import XGBoostModel
+from models.micro_batching import MicroBatchPredictor
 
 logger = get_logger(__name__)
 
+# 模型后端按需导入：只加载 score_prediction.type 对应的实现，
+# 未使用的 torch / xgboost 不会在 API 启动时被导入
+MODEL_BACKENDS = {
+    "lightgbm": ("models.lightgbm_model", "LightGBMModel"),
+    "xgboost": ("models.xgboost_model", "XGBoostModel"),
+    "mlp": ("models.mlp_model", "MLPModel"),
+}
+
+
+def get_model_class(model_name: str):
+    """
+    导入并返回模型后端类，首次导入时记录耗时
+    """
+
+    if model_name not in MODEL_BACKENDS:
+        raise ValueError(f"Unknown model: {model_name}")
+
+    module_name, class_name = MODEL_BACKENDS[model_name]
+
+    if module_name in sys.modules:
+        return getattr(sys.modules[module_name], class_name)
+
+    started_at = time.perf_counter()
+    module = importlib.import_module(module_name)
+    logger.info(
+        f"[MODEL_BACKEND_IMPORTED] model={model_name} module={module_name} "
+        f"seconds={time.perf_counter() - started_at:.3f}"
+    )
+    return getattr(module, class_name)
+
 
 class ModelManager:
 
     def __init__(self):
         self.models: Dict[str, object] = {}
+        self.batchers: Dict[str, MicroBatchPredictor] = {}
 
     def load_models(self, config: Dict[str, Any]) -> None:
         """
@@ -59,6 +91,24 @@ class ModelManager:
 
         logger.info(f"{len(self.models)} models loaded successfully")
 
+        batching_cfg = score_cfg.get("micro_batching", {})
+
+        if batching_cfg.get("enabled", False):
+            window_ms = float(batching_cfg.get("window_ms", 2))
+            max_batch_rows = int(batching_cfg.get("max_batch_rows", 256))
+
+            for name, model in self.models.items():
+                self.batchers[name] = MicroBatchPredictor(
+                    model,
+                    name=name,
+                    window_ms=window_ms,
+                    max_batch_rows=max_batch_rows,
+                )
+
+            logger.info(
+                f"Micro-batching enabled: window_ms={window_ms} max_batch_rows={max_batch_rows}"
+            )
+
     def get(self, name: str):
         """
         获取指定能力的模型
@@ -66,18 +116,26 @@ class ModelManager:
         if name not in self.models:
             raise KeyError(f"Model '{name}' not found")
 
-        return self.models[name]
+        # 开启微批时返回包装器，predict 接口不变
+        return self.batchers.get(name) or self.models[name]
 
-    @staticmethod
-    def build_model(model_name, params=None):
+    def batching_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        各模型微批队列指标
+        """
+        return {name: batcher.stats() for name, batcher in self.batchers.items()}
 
-        if model_name == "lightgbm":
-            return LightGBMModel(params)
+    def close(self) -> None:
+        for batcher in self.batchers.values():
+            batcher.close()
+        self.batchers.clear()
 
-        if model_name == "xgboost":
-            return XGBoostModel(params)
+    @staticmethod
+    def build_model(model_name, params=None, backend=None):
 
-        if model_name == "mlp":
-            return MLPModel(params)
+        model_cls = get_model_class(model_name)
 
-        raise ValueError(f"Unknown model: {model_name}")
+        if model_name == "lightgbm":
+            return model_cls(params, backend=backend or "booster")
+
+        return model_cls(params)
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+"""Compare sampled and expected L2 treemap distribution latency.
+
+Uses the task repository configured in configs/config.yaml when it exists,
+otherwise a synthetic repository with random sub cognitive domains. The
+sampled mode is run with several seeds to show how far its ratios drift from
+the closed-form expected distribution (KL(expected || sampled)).
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.core.cognitive_l1.constants import L1_INDEX, L2_INDEX  # noqa: E402
+from app.schemas.common import Task  # noqa: E402
+from app.services.plan_rule_engine import build_L2_brain_ability_treemap  # noqa: E402
+from app.services.task_processor import _assemble_task_repository, get_task_repository  # noqa: E402
+from configs.loader import load_config  # noqa: E402
+from utils.metrics_utils import kl_divergence  # noqa: E402
+
+
+def load_task_repo(config: dict, synthetic_tasks: int) -> dict:
+    if Path(config["task"]["repository"]).exists():
+        return get_task_repository(config=config)
+
+    print(f"No task repository found, using {synthetic_tasks} synthetic tasks")
+    rng = random.Random(0)
+    l1_names = list(L1_INDEX)
+    l2_names = list(L2_INDEX)
+    tasks = [
+        Task(
+            task_id=str(i),
+            task_name=f"task_{i}",
+            age_min=rng.choice([None, 3, 6]),
+            age_max=rng.choice([None, 12, 18]),
+            cognitive_domain=l1_names[i % len(l1_names)],
+            sub_cognitive_domain=f"{rng.choice(l1_names)}_{rng.choice(l2_names)}",
+        )
+        for i in range(synthetic_tasks)
+    ]
+    return _assemble_task_repository(tasks, {})
+
+
+def build_profile() -> tuple[dict, dict]:
+    l1_scores = {name: 80 + 10 * i for i, name in enumerate(L1_INDEX)}
+    profile = {
+        "age_value": 8.0,
+        "brain_distribution": [
+            {"l1": 0, "l2": 1, "ratio": 0.4},
+            {"l1": 2, "l2": 5, "ratio": 0.3},
+        ],
+    }
+    return profile, l1_scores
+
+
+def to_vector(l2_stats) -> np.ndarray:
+    vec = np.zeros(len(L2_INDEX))
+    for item in l2_stats:
+        vec[L2_INDEX[item.name]] = item.ratio
+    return vec
+
+
+def time_mode(task_repo: dict, profile: dict, l1_scores: dict, config: dict, repeat: int, **kwargs) -> float:
+    build_L2_brain_ability_treemap(profile, l1_scores, task_repo, config=config, **kwargs)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        build_L2_brain_ability_treemap(profile, l1_scores, task_repo, config=config, **kwargs)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--seeds", type=int, default=20)
+    parser.add_argument("--synthetic-tasks", type=int, default=2000)
+    args = parser.parse_args()
+
+    config = load_config()
+    task_repo = load_task_repo(config, args.synthetic_tasks)
+    profile, l1_scores = build_profile()
+
+    sampled_cfg = {"l2_treemap": {**config.get("l2_treemap", {}), "mode": "sampled"}}
+    expected_cfg = {"l2_treemap": {**config.get("l2_treemap", {}), "mode": "expected"}}
+
+    rows = [
+        ("sampled", time_mode(task_repo, profile, l1_scores, sampled_cfg, args.repeat)),
+        ("expected", time_mode(task_repo, profile, l1_scores, expected_cfg, args.repeat)),
+        (
+            "expected (no tasks)",
+            time_mode(task_repo, profile, l1_scores, expected_cfg, args.repeat, with_tasks=False),
+        ),
+    ]
+
+    print(f"{'mode':<22}{'latency_ms':>12}{'speedup':>10}")
+    print("-" * 44)
+    for name, ms in rows:
+        print(f"{name:<22}{ms:>12.3f}{rows[0][1] / ms:>10.2f}")
+
+    _, expected_stats = build_L2_brain_ability_treemap(
+        profile, l1_scores, task_repo, config=expected_cfg, with_tasks=False
+    )
+    expected_vec = to_vector(expected_stats)
+    kls = [
+        kl_divergence(
+            expected_vec,
+            to_vector(
+                build_L2_brain_ability_treemap(
+                    profile, l1_scores, task_repo, config=sampled_cfg, seed=seed
+                )[1]
+            ),
+        )
+        for seed in range(args.seeds)
+    ]
+    print(
+        f"\nKL(expected || sampled) over {args.seeds} seeds: "
+        f"mean={np.mean(kls):.4f} max={np.max(kls):.4f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+"""Compare LightGBM booster and pure-NumPy tree evaluator latency.
+
+By default the script benchmarks the checkpoints configured under
+score_prediction.lightgbm in configs/config.yaml. When they are not present it
+trains a synthetic booster with a similar feature count so the comparison can
+still be run.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import lightgbm as lgb
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from configs.loader import load_config  # noqa: E402
+from models.lightgbm_numpy import NumpyTreeEnsemble  # noqa: E402
+
+
+DEFAULT_BATCH_SIZES = (1, 64, 4096)
+
+
+def load_boosters(synthetic_trees: int) -> dict[str, lgb.Booster]:
+    checkpoints = (
+        load_config()
+        .get("score_prediction", {})
+        .get("lightgbm", {})
+        .get("checkpoints", {})
+    )
+    boosters = {
+        name: lgb.Booster(model_file=str(path))
+        for name, path in checkpoints.items()
+        if Path(path).exists()
+    }
+    if boosters:
+        return boosters
+
+    print("No lightgbm checkpoints found, using a synthetic booster")
+    rng = np.random.default_rng(0)
+    X = rng.uniform(0, 160, size=(5000, 32))
+    y = X[:, -1] + rng.normal(scale=5, size=len(X))
+    booster = lgb.train(
+        {"verbose": -1, "num_leaves": 31},
+        lgb.Dataset(X, y),
+        num_boost_round=synthetic_trees,
+    )
+    return {"synthetic": booster}
+
+
+def time_call(fn, X: np.ndarray, repeat: int) -> float:
+    fn(X)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(X)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=DEFAULT_BATCH_SIZES)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--synthetic-trees", type=int, default=300)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1)
+
+    print(f"{'model':<20}{'batch':>8}{'booster_ms':>14}{'numpy_ms':>12}{'speedup':>10}{'max_abs_diff':>16}")
+    print("-" * 80)
+
+    for name, booster in load_boosters(args.synthetic_trees).items():
+        ensemble = NumpyTreeEnsemble(booster.model_to_string())
+
+        for batch_size in args.batch_sizes:
+            X = rng.uniform(0, 160, size=(batch_size, booster.num_feature()))
+            X[rng.random(X.shape) < 0.1] = np.nan
+
+            repeat = max(1, args.repeat if batch_size < 1024 else args.repeat // 10)
+            booster_ms = time_call(booster.predict, X, repeat)
+            numpy_ms = time_call(ensemble.predict, X, repeat)
+            diff = np.max(np.abs(booster.predict(X) - ensemble.predict(X)))
+
+            print(
+                f"{name:<20}{batch_size:>8}{booster_ms:>14.3f}{numpy_ms:>12.3f}"
+                f"{booster_ms / numpy_ms:>10.2f}{diff:>16.2e}"
+            )
+
+
+if __name__ == "__main__":
+    main()
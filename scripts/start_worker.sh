@@ -0,0 +1,12 @@
+#!/usr/bin/env bash
+# 独立数据同步 worker（配合 configs/config.yaml 中 sync_tasks.mode: worker 使用）
+#
+#   scripts/start_worker.sh          按 sync_tasks.schedule 定时运行
+#   scripts/start_worker.sh --once   运行一次后退出
+#
+# 同一时间只允许一个 worker 持有 sync_tasks.worker.lock_file
+set -euo pipefail
+
+cd "$(dirname "$0")/.."
+
+exec python -m app.tasks.worker "$@"
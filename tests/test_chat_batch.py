@@ -0,0 +1,250 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from app.core.cognitive_l1.constants import CognitiveL1DatasetName, UserTrainingColumnName
+from app.core.constants import LEVEL1_DOMAIN_KEY_MAP, Level1BrainDomain
+from app.schemas.chat import AIRecPlanRequest
+from app.schemas.chat_v2 import AIRecPlanBatchItemV2
+from app.schemas.common import Task
+from app.services.chat_service import generate_ai_plan_v2, generate_ai_plans_v2_batch
+from app.services.task_processor import (
+    _serialize_task_for_repository,
+    _write_task_repository_arrow,
+)
+from app.core.errors.exceptions import BizError
+
+DOMAIN_SUFFIXES = {
+    "memory": Level1BrainDomain.MEMORY.value,
+    "executive": Level1BrainDomain.EXECUTIVE.value,
+    "attention": Level1BrainDomain.ATTENTION.value,
+    "perception": Level1BrainDomain.PERCEPTION.value,
+}
+
+
+class _SumModel:
+    def predict(self, X):
+        return np.nan_to_num(np.asarray(X)).sum(axis=1) / 10
+
+
+class _ModelManager:
+    def get(self, name):
+        return _SumModel()
+
+
+def _user_row(user_id, patient_code, n_weeks, rng):
+    row = {e.value: None for e in UserTrainingColumnName}
+    row[UserTrainingColumnName.USER_ID.value] = user_id
+    row[UserTrainingColumnName.PATIENT_CODE.value] = patient_code
+    row[UserTrainingColumnName.AGE.value] = "8岁"
+    for suffix in DOMAIN_SUFFIXES:
+        row[getattr(UserTrainingColumnName, f"LATEST_{suffix.upper()}").value] = float(rng.integers(70, 110))
+        row[getattr(UserTrainingColumnName, f"LAST_84D_LATEST_{suffix.upper()}").value] = 80.0
+        for week in range(1, 24):
+            value = float(rng.integers(70, 110)) if week <= n_weeks else None
+            row[getattr(UserTrainingColumnName, f"WEEK{week}_{suffix.upper()}").value] = value
+    row[UserTrainingColumnName.LAST_DAY_TASK.value] = ["1_a"]
+    row[UserTrainingColumnName.LAST_7_DAYS_NO_TASK.value] = ["2_b", "3_c"]
+    row[UserTrainingColumnName.LAST_84_DAYS_TASK.value] = ["1_a", "2_b", "2_b", "3_c"]
+    row[UserTrainingColumnName.LAST_84_DAYS_FIRST_TASK.value] = ["1_a", "3_c"]
+    return row
+
+
+def _config(tmp_path):
+    rng = np.random.default_rng(0)
+    rows = [_user_row(f"u{i}", f"p{i}", 12, rng) for i in range(6)]
+    rows.append(_user_row("u_new", "p_new", 2, rng))
+    rows[1][UserTrainingColumnName.WEEK5_MEMORY.value] = None
+    rows[2][UserTrainingColumnName.LATEST_ATTENTION.value] = None
+
+    column_mapping = {e.value: e.value for e in UserTrainingColumnName}
+    (tmp_path / "mapping.json").write_text(json.dumps(column_mapping, ensure_ascii=False))
+    pd.DataFrame(rows).to_parquet(tmp_path / "users.parquet")
+
+    tasks = [
+        Task(task_id="1", task_name="a", cognitive_domain="注意力", sub_cognitive_domain="注意力_选择注意"),
+        Task(task_id="2", task_name="b", cognitive_domain="记忆力", sub_cognitive_domain="记忆力_工作记忆"),
+        Task(task_id="3", task_name="c", cognitive_domain="感知觉", sub_cognitive_domain="感知觉_空间知觉"),
+    ]
+    _write_task_repository_arrow(
+        tmp_path / "task_repository.arrow",
+        [_serialize_task_for_repository(t) for t in tasks],
+        {},
+    )
+
+    feature_columns = {key: ["current", "mean", "slope", "hist_len"] for key in LEVEL1_DOMAIN_KEY_MAP.values()}
+    (tmp_path / "feature_columns.json").write_text(json.dumps(feature_columns))
+
+    return {
+        "task": {
+            "user_brain_score": str(tmp_path / "users.parquet"),
+            "repository": str(tmp_path / "task_repository.arrow"),
+        },
+        "column_mapping": {
+            CognitiveL1DatasetName.USER_BRAIN_SCORE.value: str(tmp_path / "mapping.json"),
+        },
+        "score_prediction": {
+            "min_history_len": 3,
+            "max_history_len": 12,
+            "lightgbm": {"feature_columns": str(tmp_path / "feature_columns.json")},
+        },
+        "l2_treemap": {"random_state": 0},
+        "plan_store": {"enabled": False},
+        "chat_batch": {"chunk_size": 3},
+    }
+
+
+def test_batch_matches_single_requests_with_per_item_errors(tmp_path):
+    config = _config(tmp_path)
+    items = [
+        AIRecPlanBatchItemV2(user_id="u0"),
+        AIRecPlanBatchItemV2(patient_code="p1"),
+        AIRecPlanBatchItemV2(user_id="u2", patient_code="p2"),
+        AIRecPlanBatchItemV2(user_id="missing"),
+        AIRecPlanBatchItemV2(),
+        AIRecPlanBatchItemV2(user_id="u_new"),
+        AIRecPlanBatchItemV2(user_id="u3", patient_code="p4"),
+        AIRecPlanBatchItemV2(user_id="u5"),
+    ]
+
+    results = list(generate_ai_plans_v2_batch(items, _ModelManager(), config))
+
+    assert [r.index for r in results] == list(range(len(items)))
+    for item, result in zip(items, results):
+        try:
+            expected = generate_ai_plan_v2(
+                AIRecPlanRequest(user_id=item.user_id, patient_code=item.patient_code),
+                model_manager=_ModelManager(),
+                config=config,
+            )
+        except BizError as e:
+            assert not result.success
+            assert result.error.code == e.code.value
+            continue
+
+        assert result.success
+        assert result.data == expected
+
+    assert [r.success for r in results] == [True, True, False, False, False, False, False, True]
+
+
+def test_batch_prediction_failure_falls_back_per_user(tmp_path, monkeypatch):
+    from app.services import chat_service
+
+    config = _config(tmp_path)
+    items = [AIRecPlanBatchItemV2(user_id=user_id) for user_id in ("u0", "u3", "u4")]
+    expected = [
+        generate_ai_plan_v2(
+            AIRecPlanRequest(user_id=item.user_id), model_manager=_ModelManager(), config=config
+        )
+        for item in items
+    ]
+
+    single = chat_service.build_score_prediction
+
+    def failing_batch(profiles, model_manager, config):
+        raise ValueError("batch predict failed")
+
+    def failing_single(profile, model_manager, config):
+        if profile["user_id"] == "u3":
+            raise ValueError("bad features")
+        return single(profile, model_manager, config=config)
+
+    monkeypatch.setattr(chat_service, "build_score_predictions_batch", failing_batch)
+    monkeypatch.setattr(chat_service, "build_score_prediction", failing_single)
+
+    results = list(generate_ai_plans_v2_batch(items, _ModelManager(), config))
+
+    assert [r.success for r in results] == [True, False, True]
+    assert results[0].data == expected[0]
+    assert results[2].data == expected[2]
+
+
+class _ColumnModel(_SumModel):
+    # 与 MLPModel 一致：predict 输出 (N, 1)
+    def predict(self, X):
+        return super().predict(X).reshape(-1, 1)
+
+
+class _ColumnModelManager:
+    def get(self, name):
+        return _ColumnModel()
+
+
+def test_models_returning_column_vectors_are_flattened(tmp_path):
+    from app.services.plan_rule_engine import build_score_predictions_batch
+
+    config = _config(tmp_path)
+    rng = np.random.default_rng(1)
+    profiles = [
+        {
+            "domain_histories": {
+                domain.value: [float(v) for v in rng.integers(70, 110, size=8)]
+                for domain in Level1BrainDomain
+            },
+            "latest_level1_scores": {},
+        }
+        for _ in range(3)
+    ]
+
+    expected = build_score_predictions_batch(profiles, _ModelManager(), config)
+    assert build_score_predictions_batch(profiles, _ColumnModelManager(), config) == expected
+
+
+def test_batch_endpoint_runs_chunks_on_cpu_executor(tmp_path, monkeypatch):
+    import asyncio
+    import threading
+    from types import SimpleNamespace
+
+    import pytest
+
+    from app.controllers import chat_controller_v2
+    from app.core import executor as executor_module
+    from app.core.errors.error_codes import ErrorCode
+    from app.core.executor import CpuExecutor
+    from app.schemas.chat_v2 import AIRecPlanBatchRequestV2
+
+    config = {**_config(tmp_path), "chat_batch": {"chunk_size": 3, "max_items": 100}}
+    request = SimpleNamespace(app=SimpleNamespace(state=SimpleNamespace(
+        config=config, model_manager=_ModelManager(),
+    )))
+    batch = AIRecPlanBatchRequestV2(
+        items=[AIRecPlanBatchItemV2(user_id=f"u{i}") for i in range(7)]
+    )
+
+    cpu_executor = CpuExecutor(max_workers=1, max_queue=0)
+    monkeypatch.setattr(executor_module, "_executor", cpu_executor)
+
+    worker_threads = set()
+    chunk_fn = chat_controller_v2.generate_ai_plans_v2_chunk
+
+    def recording_chunk(*args, **kwargs):
+        worker_threads.add(threading.current_thread().name)
+        return chunk_fn(*args, **kwargs)
+
+    monkeypatch.setattr(chat_controller_v2, "generate_ai_plans_v2_chunk", recording_chunk)
+
+    response = asyncio.run(chat_controller_v2.chat_batch_api_v2(batch, request))
+
+    assert [r.index for r in response.results] == list(range(7))
+    assert response.results == list(generate_ai_plans_v2_batch(batch.items, _ModelManager(), config))
+    assert all(name.startswith("cpu-executor") for name in worker_threads)
+    assert cpu_executor.in_flight == 0
+
+    # 线程池已满时与单用户接口一样直接返回 SERVER_BUSY
+    release = threading.Event()
+
+    async def saturated():
+        running = asyncio.ensure_future(cpu_executor.run("test", release.wait))
+        await asyncio.sleep(0.05)
+        try:
+            with pytest.raises(BizError) as exc_info:
+                await chat_controller_v2.chat_batch_api_v2(batch, request)
+        finally:
+            release.set()
+            await running
+        return exc_info.value
+
+    assert asyncio.run(saturated()).code == ErrorCode.SERVER_BUSY
+    cpu_executor.shutdown()
@@ -0,0 +1,42 @@
+import asyncio
+import contextvars
+import threading
+
+import pytest
+
+from app.core.errors.error_codes import ErrorCode
+from app.core.errors.error_handler import biz_error_handler
+from app.core.errors.exceptions import BizError
+from app.core.executor import CpuExecutor
+
+request_id = contextvars.ContextVar("request_id", default=None)
+
+
+def test_executor_rejects_when_queue_is_full():
+    executor = CpuExecutor(max_workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def scenario():
+        request_id.set("req-1")
+        running = asyncio.ensure_future(executor.run("test", release.wait))
+        queued = asyncio.ensure_future(executor.run("test", request_id.get))
+        await asyncio.sleep(0.05)
+
+        with pytest.raises(BizError) as exc_info:
+            await executor.run("test", request_id.get)
+
+        release.set()
+        await running
+        return exc_info.value, await queued
+
+    error, queued_result = asyncio.run(scenario())
+    executor.shutdown()
+
+    assert error.code == ErrorCode.SERVER_BUSY
+    # 调用方的 contextvars 传递到工作线程
+    assert queued_result == "req-1"
+    assert executor.in_flight == 0
+
+    response = asyncio.run(biz_error_handler(None, error))
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
@@ -0,0 +1,94 @@
+import json
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from app.core.cognitive_l1.constants import CognitiveL1DatasetName
+from app.data.datasets.cognitive_l1_dataset import get_numeric_fields, get_raw_numeric_columns
+from app.data.preprocess import preprocess_dataframe
+from configs.loader import load_config
+from utils.csv_utils import csv_to_parquet
+
+DATASET = CognitiveL1DatasetName.TRAINING_TASK.value
+
+
+def _write_csv(tmp_path, rows):
+    csv_path = tmp_path / f"{DATASET}.csv"
+    csv_path.write_text("\n".join(",".join(row) for row in rows) + "\n", encoding="utf-8")
+    return csv_path
+
+
+def _rows(n):
+    rows = []
+    for i in range(n):
+        rows.append(
+            [
+                f"00{i}", f"任务{i}", "3" if i % 2 else "", "12.5", "范式", "注意力",
+                "注意力_选择注意", "2", "1", "\\N", "0.5", f'"说明,{i}"', "5", "10", "NULL",
+            ]
+        )
+    return rows
+
+
+def _convert(tmp_path, csv_path, engine, name, chunksize=None, **task_config):
+    config = load_config()
+    config["csv_to_parquet"] = {"engine": engine, "block_size_mb": 0.001, **task_config}
+    parquet_path = csv_to_parquet(
+        csv_path,
+        tmp_path / f"{name}.parquet",
+        chunksize=chunksize,
+        config=config,
+        numeric_columns=get_raw_numeric_columns(config, DATASET),
+    )
+    with open(config["column_mapping"][DATASET], encoding="utf-8") as f:
+        mapping = json.load(f)
+    df = preprocess_dataframe(
+        pd.read_parquet(parquet_path),
+        column_mapping=mapping,
+        numeric_fields=get_numeric_fields(DATASET, mapping),
+    )
+    return parquet_path, df
+
+
+def test_arrow_streaming_matches_pandas_after_preprocess(tmp_path):
+    csv_path = _write_csv(tmp_path, _rows(300))
+
+    arrow_path, arrow_df = _convert(tmp_path, csv_path, "pyarrow", "arrow")
+    _, pandas_df = _convert(tmp_path, csv_path, "pandas", "pandas")
+    _, chunked_df = _convert(tmp_path, csv_path, "pandas", "chunked", chunksize=64)
+
+    parquet_file = pq.ParquetFile(arrow_path)
+    schema = parquet_file.schema_arrow
+    assert parquet_file.metadata.num_row_groups > 1
+    assert schema.field("难度").type == pa.float64()
+    assert schema.field("任务id").type == pa.string()
+
+    pd.testing.assert_frame_equal(arrow_df, pandas_df, check_dtype=False)
+    pd.testing.assert_frame_equal(chunked_df, pandas_df)
+    assert arrow_df["task_id"].iloc[0] == "000"
+
+
+def test_arrow_falls_back_to_pandas_on_bad_numeric(tmp_path):
+    rows = _rows(5)
+    rows[3][7] = "高"
+    csv_path = _write_csv(tmp_path, rows)
+
+    arrow_path, arrow_df = _convert(tmp_path, csv_path, "pyarrow", "arrow")
+    _, pandas_df = _convert(tmp_path, csv_path, "pandas", "pandas")
+
+    assert pq.ParquetFile(arrow_path).schema_arrow.field("难度").type == pa.string()
+    pd.testing.assert_frame_equal(arrow_df, pandas_df)
+    assert not list(tmp_path.glob(".*.tmp"))
+
+
+def test_arrow_type_error_can_fail_the_stage(tmp_path):
+    rows = _rows(5)
+    rows[3][7] = "高"
+    csv_path = _write_csv(tmp_path, rows)
+
+    with pytest.raises(pa.ArrowInvalid):
+        _convert(tmp_path, csv_path, "pyarrow", "arrow", fallback_on_type_error=False)
+    assert not (tmp_path / "arrow.parquet").exists()
+    assert not list(tmp_path.glob(".*.tmp"))
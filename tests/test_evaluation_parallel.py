@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+
+from app.core.cognitive_l1.constants import UserTrainingColumnName
+from app.schemas.common import Task
+from app.services.evaluation_service import (
+    EvaluationService,
+    derive_user_seed,
+    resolve_evaluation_seed,
+)
+from app.services.task_processor import _assemble_task_repository
+from utils.dataframe_utils import ColumnAccessor
+
+
+def _task_repo():
+    sub_domains = ["注意力_选择注意", "记忆力_工作记忆", "感知觉_空间知觉", "执行功能_认知灵活性"]
+    tasks = [
+        Task(task_id=str(i), task_name=f"t{i}", sub_cognitive_domain=sub_domains[i % 4])
+        for i in range(12)
+    ]
+    return _assemble_task_repository(tasks, {})
+
+
+def _users(n=9):
+    rng = np.random.default_rng(0)
+    rows = []
+    for i in range(n):
+        row = {e.value: None for e in UserTrainingColumnName}
+        row[UserTrainingColumnName.USER_ID.value] = f"u{i}"
+        for name in ["MEMORY", "EXECUTIVE", "ATTENTION", "PERCEPTION"]:
+            row[getattr(UserTrainingColumnName, f"LAST_84D_LATEST_{name}").value] = float(rng.integers(70, 110))
+        tasks = [f"{t}_x" for t in rng.integers(0, 12, size=int(rng.integers(3, 15)))]
+        row[UserTrainingColumnName.LAST_84_DAYS_TASK.value] = tasks
+        row[UserTrainingColumnName.LAST_84_DAYS_FIRST_TASK.value] = tasks[:3]
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def test_parallel_evaluation_matches_serial_when_seeded():
+    service = EvaluationService(config={"l2_treemap": {"sampler": "numpy"}})
+    users = _users()
+    task_repo = _task_repo()
+    column_mapping = {e.value: e.value for e in UserTrainingColumnName}
+    cols = ColumnAccessor(column_mapping, UserTrainingColumnName)
+    metric_names = ["kl_value", "expected_kl_value"]
+
+    serial = service._evaluate_rows(
+        users,
+        start_position=0,
+        task_repo=task_repo,
+        cols=cols,
+        metric_names=metric_names,
+        base_seed=7,
+    )
+    parallel = service._evaluate_parallel(
+        users,
+        task_repo=task_repo,
+        column_mapping=column_mapping,
+        metric_names=metric_names,
+        base_seed=7,
+        workers=2,
+        chunk_size=4,
+    )
+
+    assert len(serial[0]) == len(users)
+    assert parallel == serial
+
+
+def test_evaluation_seed_falls_back_to_treemap_seed():
+    assert resolve_evaluation_seed(
+        {"recommendation_evaluation": {"random_state": 7}, "l2_treemap": {"random_state": 3}}
+    ) == 7
+    assert resolve_evaluation_seed(
+        {"recommendation_evaluation": {"random_state": None}, "l2_treemap": {"random_state": 3}}
+    ) == 3
+    assert resolve_evaluation_seed({"recommendation_evaluation": {"random_state": None}}) is None
+
+    # 回退后仍按用户行号派生，各用户 seed 不同
+    assert derive_user_seed(3, 0) != derive_user_seed(3, 1)
+
+
+def test_parallel_evaluation_matches_serial_with_treemap_seed_only():
+    config = {
+        "l2_treemap": {"sampler": "numpy", "random_state": 11},
+        "recommendation_evaluation": {"random_state": None},
+    }
+    service = EvaluationService(config=config)
+    users = _users()
+    task_repo = _task_repo()
+    column_mapping = {e.value: e.value for e in UserTrainingColumnName}
+    cols = ColumnAccessor(column_mapping, UserTrainingColumnName)
+    metric_names = ["kl_value", "expected_kl_value"]
+    base_seed = resolve_evaluation_seed(config)
+
+    serial = service._evaluate_rows(
+        users,
+        start_position=0,
+        task_repo=task_repo,
+        cols=cols,
+        metric_names=metric_names,
+        base_seed=base_seed,
+    )
+    parallel = service._evaluate_parallel(
+        users,
+        task_repo=task_repo,
+        column_mapping=column_mapping,
+        metric_names=metric_names,
+        base_seed=base_seed,
+        workers=2,
+        chunk_size=4,
+    )
+
+    assert base_seed == 11
+    assert parallel == serial
@@ -0,0 +1,37 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from configs.loader import load_config
+from models.model_factory import ModelManager
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def test_app_main_does_not_import_unused_backends(tmp_path):
+    assert load_config()["score_prediction"]["type"] not in ("mlp", "xgboost")
+
+    code = (
+        "import sys, app.main; "
+        "print('LOADED=' + ','.join(m for m in ('torch', 'xgboost') if m in sys.modules))"
+    )
+    completed = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT,
+        # app.main 导入时会初始化日志，写到临时目录而不是仓库的 logs/
+        env={**os.environ, "LOG_DIR": str(tmp_path)},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # 日志同样输出到 stdout，按标记行取结果
+    loaded = [line for line in completed.stdout.splitlines() if line.startswith("LOADED=")]
+    assert loaded == ["LOADED="]
+
+
+def test_build_model_rejects_unknown_backend():
+    with pytest.raises(ValueError):
+        ModelManager.build_model("unknown")
@@ -0,0 +1,122 @@
+from pathlib import Path
+
+import lightgbm as lgb
+import numpy as np
+import pytest
+
+from models.lightgbm_model import LightGBMModel
+from models.lightgbm_numpy import NumpyTreeEnsemble
+
+
+ROOT = Path(__file__).resolve().parents[1]
+CHECKPOINT_DIR = ROOT / "checkpoints/cognitive_l1"
+
+
+def _training_data(seed: int = 0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(2000, 8))
+    y = X[:, 0] * 3 + np.sin(X[:, 1]) + rng.normal(scale=0.1, size=len(X))
+
+    X[rng.random(X.shape) < 0.1] = np.nan
+    X[rng.random(X.shape) < 0.05] = 0.0
+    return X, y
+
+
+def _eval_data(seed: int = 1):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(500, 8))
+    X[rng.random(X.shape) < 0.15] = np.nan
+    X[rng.random(X.shape) < 0.1] = 0.0
+    return X
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"objective": "regression"},
+        {"objective": "regression", "zero_as_missing": True},
+        {"objective": "regression", "use_missing": False},
+        {"objective": "binary"},
+        {"objective": "poisson"},
+        {"objective": "regression", "num_leaves": 100, "min_data_in_leaf": 5},
+        {
+            "objective": "regression",
+            "boosting": "rf",
+            "bagging_fraction": 0.8,
+            "bagging_freq": 1,
+        },
+    ],
+)
+def test_numpy_backend_matches_booster(params):
+    X, y = _training_data()
+    if params["objective"] == "binary":
+        y = (y > 0).astype(float)
+    if params["objective"] == "poisson":
+        y = np.abs(y)
+
+    booster = lgb.train(
+        {"verbose": -1, "num_leaves": 15, **params},
+        lgb.Dataset(X, y),
+        num_boost_round=30,
+    )
+    ensemble = NumpyTreeEnsemble(booster.model_to_string())
+
+    X_eval = _eval_data()
+    np.testing.assert_allclose(
+        ensemble.predict(X_eval), booster.predict(X_eval), rtol=1e-9, atol=1e-9
+    )
+    np.testing.assert_allclose(
+        ensemble.predict(X_eval[:1]), booster.predict(X_eval[:1]), rtol=1e-9, atol=1e-9
+    )
+    if ensemble.bitvector_supported:
+        np.testing.assert_allclose(
+            ensemble._predict_bitvector(X_eval),
+            ensemble._predict_traversal(X_eval),
+            rtol=1e-9,
+            atol=1e-9,
+        )
+
+
+def _assert_checkpoint_parity(checkpoint):
+    booster_model = LightGBMModel(backend="booster")
+    booster_model.load(str(checkpoint))
+    numpy_model = LightGBMModel(backend="numpy")
+    numpy_model.load(str(checkpoint))
+
+    rng = np.random.default_rng(0)
+    X = rng.uniform(0, 160, size=(256, booster_model.model.num_feature()))
+    X[rng.random(X.shape) < 0.2] = np.nan
+
+    np.testing.assert_allclose(
+        numpy_model.predict(X), booster_model.predict(X), rtol=1e-9, atol=1e-9
+    )
+    np.testing.assert_allclose(
+        numpy_model.predict(X[:1]), booster_model.predict(X[:1]), rtol=1e-9, atol=1e-9
+    )
+
+
+def test_numpy_backend_matches_saved_checkpoint_file(tmp_path):
+    # 与线上分数模型同形态：分值特征 + 缺失值，经 save_model 写出后由两种后端分别加载
+    rng = np.random.default_rng(3)
+    X = rng.uniform(0, 160, size=(3000, 20))
+    X[rng.random(X.shape) < 0.2] = np.nan
+    y = np.nan_to_num(X[:, 0], nan=90.0) * 0.8 + rng.normal(scale=2.0, size=len(X))
+
+    booster = lgb.train(
+        {"objective": "regression", "verbose": -1, "num_leaves": 31},
+        lgb.Dataset(X, y),
+        num_boost_round=50,
+    )
+    checkpoint = tmp_path / "memory_lightgbm.txt"
+    booster.save_model(str(checkpoint))
+
+    _assert_checkpoint_parity(checkpoint)
+
+
+SAVED_CHECKPOINTS = sorted(CHECKPOINT_DIR.glob("*_lightgbm.txt")) if CHECKPOINT_DIR.exists() else []
+
+
+@pytest.mark.skipif(not SAVED_CHECKPOINTS, reason="checkpoints/cognitive_l1 不在仓库中")
+def test_numpy_backend_matches_deployed_checkpoints():
+    for checkpoint in SAVED_CHECKPOINTS:
+        _assert_checkpoint_parity(checkpoint)
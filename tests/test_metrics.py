@@ -0,0 +1,89 @@
+import os
+
+from app.core.metrics import (
+    GAUGE_MODE_MAX,
+    Counter,
+    Gauge,
+    Histogram,
+    MetricsRegistry,
+    merge_snapshots,
+    render_prometheus,
+)
+
+
+def _registry():
+    registry = MetricsRegistry()
+    requests = registry.register(Counter("requests_total", "requests", ("route",)))
+    latency = registry.register(Histogram("latency_seconds", "latency", buckets=(0.1, 1.0)))
+    in_flight = registry.register(Gauge("in_flight", "in flight"))
+    last_sync = registry.register(
+        Gauge("last_sync_timestamp_seconds", "last sync", multiprocess_mode=GAUGE_MODE_MAX)
+    )
+    return registry, requests, latency, in_flight, last_sync
+
+
+def test_merge_sums_counters_and_drops_dead_live_gauges():
+    registry, requests, latency, in_flight, last_sync = _registry()
+    requests.inc(route="/api/v2/chat")
+    latency.observe(0.05)
+    in_flight.set(2)
+    last_sync.set(100)
+    live = {"pid": os.getpid(), "metrics": registry.dump()}
+
+    requests.inc(2, route="/api/v2/chat")
+    latency.observe(5.0)
+    in_flight.set(7)
+    last_sync.set(200)
+    # 已退出的进程：计数保留，livesum gauge 丢弃，max gauge 保留
+    dead = {"pid": 2**22 + 12345, "metrics": registry.dump()}
+
+    merged = merge_snapshots([live, dead])
+    assert merged["requests_total"]["values"] == [[["/api/v2/chat"], 4.0]]
+    assert merged["latency_seconds"]["values"] == [[[], [2, 0, 1, 5.1]]]
+    assert merged["in_flight"]["values"] == [[[], 2.0]]
+    assert merged["last_sync_timestamp_seconds"]["values"] == [[[], 200.0]]
+
+    text = render_prometheus(merged)
+    assert 'requests_total{route="/api/v2/chat"} 4.0' in text
+    assert 'latency_seconds_bucket{le="1.0"} 2' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in text
+    assert "latency_seconds_count 3" in text
+
+
+def test_multiprocess_dir_collects_all_process_files(tmp_path):
+    registry, requests, *_ = _registry()
+    registry.multiprocess_dir = tmp_path
+    requests.inc(route="/api/health")
+
+    other, other_requests, *_ = _registry()
+    other_requests.inc(3, route="/api/health")
+    (tmp_path / "metrics-1.json").write_text(
+        '{"pid": 1, "metrics": %s}' % __import__("json").dumps(other.dump())
+    )
+
+    merged = registry.collect()
+    assert merged["requests_total"]["values"] == [[["/api/health"], 4.0]]
+    assert (tmp_path / f"metrics-{os.getpid()}.json").exists()
+
+
+def test_dead_process_files_are_compacted(tmp_path):
+    registry, requests, *_ = _registry()
+    registry.multiprocess_dir = tmp_path
+    requests.inc(route="/api/health")
+
+    other, other_requests, _, other_in_flight, _ = _registry()
+    other_requests.inc(3, route="/api/health")
+    other_in_flight.set(5)
+    for pid in (2**22 + 1, 2**22 + 2):
+        (tmp_path / f"metrics-{pid}.json").write_text(
+            '{"pid": %s, "metrics": %s}' % (pid, __import__("json").dumps(other.dump()))
+        )
+
+    for _ in range(2):
+        merged = registry.collect()
+        assert merged["requests_total"]["values"] == [[["/api/health"], 7.0]]
+        assert merged["in_flight"]["values"] == []
+
+    assert sorted(p.name for p in tmp_path.glob("metrics-*.json")) == sorted(
+        ["metrics-aggregate.json", f"metrics-{os.getpid()}.json"]
+    )
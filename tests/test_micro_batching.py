@@ -0,0 +1,101 @@
+import threading
+import time
+
+import numpy as np
+
+from models.micro_batching import MicroBatchPredictor
+
+
+class _SlowModel:
+    def __init__(self):
+        self.batch_sizes = []
+
+    def predict(self, X):
+        self.batch_sizes.append(len(X))
+        time.sleep(0.005)
+        return X[:, 0] * 2
+
+
+def test_concurrent_predictions_are_coalesced_and_fanned_out():
+    model = _SlowModel()
+    predictor = MicroBatchPredictor(model, name="demo", window_ms=3, max_batch_rows=64)
+    results = {}
+
+    def call(i):
+        results[i] = predictor.predict(np.array([[i, 0.0]]))
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(50)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    predictor.close()
+
+    assert all(results[i].tolist() == [2 * i] for i in range(50))
+    assert sum(model.batch_sizes) == 50
+    assert len(model.batch_sizes) < 50
+    assert max(model.batch_sizes) <= 64
+    assert predictor.stats()["in_flight"] == 0
+
+
+def test_idle_predictor_bypasses_queue():
+    model = _SlowModel()
+    predictor = MicroBatchPredictor(model, name="demo")
+
+    assert predictor.predict(np.array([[3.0]])).tolist() == [6.0]
+    assert predictor.stats()["direct_calls"] == 1
+    assert predictor.stats()["batches"] == 0
+
+    predictor.close()
+
+
+class _RejectingModel(_SlowModel):
+    def predict(self, X):
+        if np.isnan(X).any():
+            self.batch_sizes.append(len(X))
+            raise ValueError("nan input")
+        return super().predict(X)
+
+
+def _run_concurrently(predictor, inputs):
+    results = {}
+
+    def call(i):
+        try:
+            results[i] = predictor.predict(inputs[i])
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(len(inputs))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_failing_request_does_not_fail_coalesced_callers():
+    model = _RejectingModel()
+    predictor = MicroBatchPredictor(model, name="demo", window_ms=5, max_batch_rows=64)
+    inputs = [np.array([[np.nan if i == 7 else float(i)]]) for i in range(20)]
+
+    results = _run_concurrently(predictor, inputs)
+    predictor.close()
+
+    assert isinstance(results[7], ValueError)
+    assert all(results[i].tolist() == [2 * i] for i in range(20) if i != 7)
+    assert predictor.stats()["in_flight"] == 0
+
+
+def test_batches_never_exceed_max_rows():
+    model = _SlowModel()
+    predictor = MicroBatchPredictor(model, name="demo", window_ms=5, max_batch_rows=10)
+    inputs = [np.full((3, 1), float(i)) for i in range(30)]
+
+    results = _run_concurrently(predictor, inputs)
+    predictor.close()
+
+    assert all(results[i].tolist() == [2.0 * i] * 3 for i in range(30))
+    assert max(model.batch_sizes) <= 10
+    assert sum(model.batch_sizes) == 90
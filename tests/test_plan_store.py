@@ -0,0 +1,36 @@
+from app.repositories.plan_repo import PlanStoreWriter, get_plan_store
+
+
+def _write_store(path, data_version, rows):
+    writer = PlanStoreWriter(path, data_version)
+    writer.write_many(rows)
+    writer.commit()
+
+
+def test_plan_store_lookup_and_reopen_after_replace(tmp_path):
+    path = tmp_path / "plan_store.sqlite"
+    config = {"plan_store": {"path": str(path)}}
+
+    assert get_plan_store(config) is None
+
+    _write_store(
+        path,
+        "v1",
+        [("u1", "p1", '{"n": 1}'), ("u2", "p2", '{"n": 2}'), (None, "p3", '{"n": 3}')],
+    )
+
+    store = get_plan_store(config)
+    assert store.data_version == "v1"
+    assert store.count == 3
+    assert store.get("u1", None) == '{"n": 1}'
+    assert store.get(None, "p3") == '{"n": 3}'
+    assert store.get("u2", "p2") == '{"n": 2}'
+    assert store.get("u1", "p2") is None
+    assert store.get("missing", None) is None
+
+    _write_store(path, "v2", [("u1", "p1", '{"n": 10}')])
+
+    store = get_plan_store(config)
+    assert store.data_version == "v2"
+    assert store.get("u1", "p1") == '{"n": 10}'
+    assert store.get("u2", None) is None
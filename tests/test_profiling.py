@@ -0,0 +1,67 @@
+import threading
+
+import pytest
+from starlette.requests import Request
+
+from app.core.errors.error_codes import ErrorCode
+from app.core.errors.exceptions import BizError
+from app.core.profiling import profile_call, sample_stacks, to_collapsed, to_speedscope
+from app.core.security import is_request_profile_allowed, verify_admin_token
+
+
+def _busy_loop(stop_event):
+    while not stop_event.is_set():
+        sum(range(1000))
+
+
+def _request(headers=(), client=("10.0.0.1", 1234)):
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": "/api/admin/profile",
+            "headers": [(k.lower().encode(), v.encode()) for k, v in headers],
+            "client": client,
+        }
+    )
+
+
+def test_sampler_collects_request_thread_stacks():
+    stop_event = threading.Event()
+    worker = threading.Thread(target=_busy_loop, args=(stop_event,), name="cpu-executor-test")
+    worker.start()
+    try:
+        samples = sample_stacks(0.2, rate_hz=200)
+    finally:
+        stop_event.set()
+        worker.join()
+
+    collapsed = to_collapsed(samples)
+    assert "cpu-executor-test;" in collapsed
+    assert "_busy_loop (test_profiling.py" in collapsed
+
+    speedscope = to_speedscope(samples, rate_hz=200)
+    profile = speedscope["profiles"][0]
+    assert profile["type"] == "sampled"
+    assert len(profile["samples"]) == len(profile["weights"])
+    assert all(i < len(speedscope["shared"]["frames"]) for s in profile["samples"] for i in s)
+
+
+def test_profile_call_returns_result_and_summary():
+    result, summary = profile_call(sorted, [3, 1, 2], top_n=5)
+    assert result == [1, 2, 3]
+    assert "cumulative" in summary
+
+
+def test_admin_token_and_allowlist():
+    verify_admin_token(_request([("X-Admin-Token", "secret")]), "secret")
+
+    for headers, expected in [([("X-Admin-Token", "wrong")], "secret"), ([], "secret"), ([], "")]:
+        with pytest.raises(BizError) as exc_info:
+            verify_admin_token(_request(headers), expected)
+        assert exc_info.value.code == ErrorCode.FORBIDDEN
+
+    config = {"profiling": {"enabled": True, "request_profile_allowlist": ["10.0.0.1"]}}
+    assert is_request_profile_allowed(_request(), config)
+    assert not is_request_profile_allowed(_request(client=("10.0.0.2", 1)), config)
+    assert not is_request_profile_allowed(_request(), {"profiling": {"request_profile_allowlist": ["10.0.0.1"]}})
@@ -0,0 +1,34 @@
+import json
+
+from app.core.cognitive_l1.constants import CognitiveL1DatasetName, UserTrainingColumnName
+from app.core.registry import ResourceRegistry
+from app.services.evaluation_service import EvaluationService
+from app.services.score_prediction_evaluation_service import ScorePredictionEvaluationService
+from models.model_factory import ModelManager
+
+
+def test_evaluation_services_share_registry_resources(tmp_path):
+    mapping_path = tmp_path / "mapping.json"
+    mapping_path.write_text(
+        json.dumps({e.value: e.value for e in UserTrainingColumnName}, ensure_ascii=False)
+    )
+    config = {
+        "column_mapping": {
+            CognitiveL1DatasetName.USER_BRAIN_SCORE.value: str(mapping_path),
+        },
+    }
+    model_manager = ModelManager()
+    registry = ResourceRegistry(config=config, model_manager=model_manager)
+
+    cols = registry.column_accessor(CognitiveL1DatasetName.USER_BRAIN_SCORE)
+    assert registry.column_accessor(CognitiveL1DatasetName.USER_BRAIN_SCORE) is cols
+    assert cols.user_id == UserTrainingColumnName.USER_ID.value
+
+    score_service = ScorePredictionEvaluationService(registry=registry)
+    assert score_service.config is config
+    assert score_service._get_model_manager() is model_manager
+    assert score_service._load_column_accessor() is cols
+
+    evaluation_service = EvaluationService(registry=registry)
+    assert evaluation_service.config is config
+    assert evaluation_service._column_accessor() is cols
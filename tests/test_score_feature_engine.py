@@ -0,0 +1,49 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from app.services.plan_rule_engine import build_features
+from app.services.score_feature_engine import build_feature_matrix
+
+
+def _reference_matrix(histories, currents, max_history_len, feature_cols):
+    rows = []
+    for history, current in zip(histories, currents):
+        effective_history = history[-max_history_len:]
+        feats = build_features(effective_history, max_history_len)
+        feats["hist_len"] = len(effective_history)
+        feats["current"] = current
+        rows.append(feats)
+
+    return (
+        pd.DataFrame(rows)
+        .reindex(columns=feature_cols, fill_value=np.nan)
+        .to_numpy(dtype=float)
+    )
+
+
+def test_feature_matrix_matches_build_features():
+    rng = np.random.default_rng(0)
+    max_history_len = 12
+
+    histories = [
+        list(rng.uniform(40, 150, size=length).round(rng.integers(0, 3)))
+        for length in [1, 2, 3, 4, 5, 7, 8, 11, 12, 13, 20] * 5
+    ]
+    histories.append([80.0] * 12)
+    currents = list(rng.uniform(40, 150, size=len(histories)))
+
+    feature_cols = list(build_features(histories[0], max_history_len))
+    feature_cols += ["hist_len", "current", "not_a_feature"]
+
+    expected = _reference_matrix(histories, currents, max_history_len, feature_cols)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        actual = build_feature_matrix(
+            histories, currents, max_history_len, feature_cols
+        )
+
+    assert actual.shape == expected.shape
+    np.testing.assert_allclose(actual, expected, rtol=1e-9, atol=1e-9)
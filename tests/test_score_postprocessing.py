@@ -0,0 +1,121 @@
+import math
+
+import numpy as np
+import pytest
+
+from app.core.constants import Level1Score
+from app.services.plan_rule_engine import (
+    CALIBRATION_DOMAINS,
+    MAX_PREDICTED_LEVEL1_SCORE,
+    SCORE_PREDICTION_CALIBRATION,
+    calibrate_predicted_score,
+    calibrate_predicted_score_array,
+    clamp_predicted_scores,
+    compute_baseline_prediction,
+    compute_baseline_predictions,
+    compute_M,
+    compute_M_array,
+    encode_domains,
+    finalize_horizon_prediction,
+)
+
+
+# ---------------------------------------------------------------------------
+# 向量化之前的标量实现（冻结副本，作为对照基准；勿随被测代码修改）
+# ---------------------------------------------------------------------------
+
+def _reference_compute_M(N, current, range_val, alpha_c=150, n_model_weight=0.8, growth_scale=0.5):
+    range_val = max(range_val, 0.0)
+    k = 1 + 1 / (1 + np.exp((current - alpha_c) / 10))
+    min_increase = max(1e-6, range_val)
+    N = math.ceil(n_model_weight * N + (1 - n_model_weight) * (current + min_increase))
+    max_cap = 160 - 1
+    delta = min(N - current, max_cap - current)
+    M = current + growth_scale * k * delta
+    return max(M, current + 1e-6)
+
+
+def _reference_calibrate(predicted, current, domain):
+    cfg = SCORE_PREDICTION_CALIBRATION
+    predicted_delta = predicted - current
+    scaled_current = current / 100
+    scaled_delta = predicted_delta / 20
+    calibrated = (
+        cfg["intercept"]
+        + cfg["domain_offsets"].get(domain, 0.0)
+        + cfg["current_score_coef"] * current
+        + cfg["predicted_delta_coef"] * predicted_delta
+        + cfg["current_score_squared_coef"] * scaled_current * scaled_current
+        + cfg["predicted_delta_squared_coef"] * scaled_delta * scaled_delta
+        + cfg["current_delta_interaction_coef"] * scaled_current * scaled_delta
+    )
+    return max(calibrated, current + 1e-6)
+
+
+def _reference_baseline(history, current, horizon_weeks=12, min_decay=3, max_decay=10, max_decay_ratio=0.12):
+    if not history:
+        return int(round(current))
+    history_arr = np.array(history, dtype=float)
+    range_val = max(history_arr.max() - history_arr.min(), min_decay)
+    hist_len = max(len(history_arr), 1)
+    decay = max((horizon_weeks / hist_len) * range_val, min_decay)
+    max_allowed_decay = max(min(max_decay, current * max_decay_ratio), min_decay)
+    decay = min(decay, max_allowed_decay)
+    baseline = max(min(current - decay, current), 0)
+    return int(round(baseline))
+
+
+# hypothesis 未安装，用多组随机种子生成样本做性质测试
+@pytest.mark.parametrize("seed", range(5))
+def test_array_postprocessing_matches_scalar_path(seed):
+    rng = np.random.default_rng(seed)
+    n = 500
+    preds = rng.uniform(-50, 250, n)
+    currents = rng.uniform(0, 170, n)
+    ranges = rng.uniform(-20, 80, n)
+    # 整数分值与舍入边界
+    currents[::5] = np.round(currents[::5])
+    preds[::7] = np.round(preds[::7]) + 0.5
+    domains = rng.choice(CALIBRATION_DOMAINS + ["未知"], n)
+    params = dict(alpha_c=float(rng.uniform(100, 160)), n_model_weight=float(rng.uniform()), growth_scale=float(rng.uniform(0, 2)))
+
+    M = compute_M_array(preds, currents, ranges, **params)
+    calibrated = calibrate_predicted_score_array(M, currents, encode_domains(domains))
+    clamped = clamp_predicted_scores(calibrated)
+
+    for i in range(n):
+        m = _reference_compute_M(float(preds[i]), float(currents[i]), float(ranges[i]), **params)
+        c = _reference_calibrate(m, float(currents[i]), str(domains[i]))
+        assert m == M[i]
+        assert c == calibrated[i]
+        assert min(Level1Score.clamp(c), MAX_PREDICTED_LEVEL1_SCORE) == clamped[i]
+        # 标量入口与原实现一致
+        assert compute_M(float(preds[i]), float(currents[i]), float(ranges[i]), **params) == m
+        assert calibrate_predicted_score(m, float(currents[i]), str(domains[i])) == c
+
+    histories = [list(rng.uniform(0, 160, int(rng.integers(0, 15)))) for _ in range(n)]
+    baselines = compute_baseline_predictions(
+        [max(h) - min(h) if h else 0.0 for h in histories],
+        [len(h) for h in histories],
+        currents,
+    )
+    expected = [_reference_baseline(h, float(c)) for h, c in zip(histories, currents)]
+    assert baselines.tolist() == expected
+    assert [compute_baseline_prediction(h, float(c)) for h, c in zip(histories, currents)] == expected
+
+
+def test_compute_M_rejects_non_finite_predictions():
+    with pytest.raises(ValueError):
+        compute_M_array([100.0, np.nan], [90.0, 90.0], [5.0, 5.0])
+
+
+def test_scalar_finalize_matches_reference():
+    rng = np.random.default_rng(11)
+    for _ in range(200):
+        pred, current, range_val = rng.uniform(-50, 250), rng.uniform(0, 170), rng.uniform(-20, 80)
+        domain = str(rng.choice(CALIBRATION_DOMAINS))
+        params = dict(alpha_c=140.0, n_model_weight=0.8, growth_scale=0.5)
+        expected = _reference_calibrate(
+            _reference_compute_M(pred, current, range_val, **params), current, domain
+        )
+        assert finalize_horizon_prediction(pred, current, range_val, domain, **params) == expected
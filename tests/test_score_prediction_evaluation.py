@@ -0,0 +1,77 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from app.core.cognitive_l1.constants import CognitiveL1DatasetName, UserTrainingColumnName
+from app.core.constants import LEVEL1_DOMAIN_KEY_MAP
+from app.services.score_prediction_evaluation_service import ScorePredictionEvaluationService
+
+SUFFIXES = ["MEMORY", "EXECUTIVE", "ATTENTION", "PERCEPTION"]
+
+
+class _SumModel:
+    def predict(self, X):
+        return np.asarray(X, dtype=float).sum(axis=1) / 10
+
+
+class _ModelManager:
+    def __init__(self, model):
+        self.model = model
+
+    def get(self, name):
+        return self.model
+
+
+def _users(n, rng):
+    rows = []
+    for i in range(n):
+        row = {e.value: None for e in UserTrainingColumnName}
+        row[UserTrainingColumnName.USER_ID.value] = f"u{i}"
+        row[UserTrainingColumnName.PATIENT_CODE.value] = f"p{i}"
+        for suffix in SUFFIXES:
+            row[getattr(UserTrainingColumnName, f"LATEST_{suffix}").value] = float(rng.integers(90, 120))
+            for week in range(1, 24):
+                row[getattr(UserTrainingColumnName, f"WEEK{week}_{suffix}").value] = float(rng.integers(60, 90))
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def _config(tmp_path):
+    column_mapping = {e.value: e.value for e in UserTrainingColumnName}
+    (tmp_path / "mapping.json").write_text(json.dumps(column_mapping, ensure_ascii=False))
+    feature_columns = {key: ["current", "mean_4", "trend", "hist_len"] for key in LEVEL1_DOMAIN_KEY_MAP.values()}
+    (tmp_path / "feature_columns.json").write_text(json.dumps(feature_columns))
+    return {
+        "column_mapping": {
+            CognitiveL1DatasetName.USER_BRAIN_SCORE.value: str(tmp_path / "mapping.json"),
+        },
+        "score_prediction": {
+            "min_history_len": 3,
+            "max_history_len": 12,
+            "lightgbm": {"feature_columns": str(tmp_path / "feature_columns.json")},
+        },
+    }
+
+
+def test_batch_backtest_falls_back_and_skips_failed_users(tmp_path):
+    config = _config(tmp_path)
+    users = _users(5, np.random.default_rng(0))
+    # 第 2 个用户的当前分为 130，预测值置为 nan，批量失败后只跳过该用户
+    users.loc[2, UserTrainingColumnName.WEEK12_MEMORY.value] = 130.0
+
+    class _NanModel(_SumModel):
+        def predict(self, X):
+            pred = super().predict(X)
+            return np.where(np.asarray(X)[:, 0] == 130.0, np.nan, pred)
+
+    eval_cfg = {"tolerance": 5}
+    details = ScorePredictionEvaluationService(
+        config=config, model_manager=_ModelManager(_NanModel())
+    )._build_evaluation_details(eval_cfg, users)
+    expected = ScorePredictionEvaluationService(
+        config=config, model_manager=_ModelManager(_SumModel())
+    )._build_evaluation_details(eval_cfg, users.drop(index=2))
+
+    assert {d["user_id"] for d in details} == {"u0", "u1", "u3", "u4"}
+    assert details == expected
@@ -0,0 +1,97 @@
+import os
+
+from app.core.snapshots import commit_snapshot, pin_snapshot, publish_snapshot, stage_snapshot
+
+
+def _replace(path, text):
+    # 与流水线写入方式一致：临时文件 + rename
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    tmp_path.write_text(text)
+    os.replace(tmp_path, path)
+
+
+def _config(tmp_path):
+    work = tmp_path / "work"
+    work.mkdir()
+    users = work / "users.parquet"
+    repo = work / "repo.arrow"
+    users.write_text("users-v1")
+    repo.write_text("repo-v1")
+    return {
+        "task": {"user_brain_score": str(users), "repository": str(repo)},
+        "plan_store": {"path": str(work / "plan_store.sqlite")},
+        "sync_state": {"manifest": str(tmp_path / "sync_manifest.json")},
+        "snapshots": {"enabled": True, "root": str(tmp_path / "snapshots"), "keep": 2},
+    }
+
+
+def test_pinned_config_survives_republish_and_prune(tmp_path):
+    config = _config(tmp_path)
+    assert pin_snapshot(config) is config
+
+    first = publish_snapshot(config)
+    assert first is not None
+    assert publish_snapshot(config) is None
+
+    pinned = pin_snapshot(config)
+    assert pinned["snapshot"]["version"] == first
+    users_v1 = pinned["task"]["user_brain_score"]
+    assert users_v1.startswith(str(tmp_path / "snapshots" / first))
+    assert pinned["plan_store"]["path"].startswith(str(tmp_path / "snapshots" / first))
+
+    # 工作目录原子替换后发布新版本，已固定的版本内容不变
+    _replace(tmp_path / "work" / "users.parquet", "users-v2")
+    second = publish_snapshot(config)
+    assert second not in (None, first)
+    with open(users_v1) as f:
+        assert f.read() == "users-v1"
+    with open(pin_snapshot(config)["task"]["user_brain_score"]) as f:
+        assert f.read() == "users-v2"
+
+    _replace(tmp_path / "work" / "repo.arrow", "repo-v2")
+    third = publish_snapshot(config)
+
+    versions = sorted(
+        p.name for p in (tmp_path / "snapshots").iterdir() if not p.name.startswith(".")
+    )
+    assert versions == sorted([second, third, "current"])
+    assert pin_snapshot(config)["snapshot"]["version"] == third
+
+
+def test_disabled_snapshots_keep_work_paths(tmp_path):
+    config = _config(tmp_path)
+    config["snapshots"]["enabled"] = False
+    publish_snapshot(config)
+    assert pin_snapshot(config) is config
+
+
+def test_staged_snapshot_is_invisible_until_commit(tmp_path):
+    config = _config(tmp_path)
+    first = publish_snapshot(config)
+
+    _replace(tmp_path / "work" / "users.parquet", "users-v2")
+    staged = stage_snapshot(config, require_local=True)
+    assert staged is not None
+
+    # 准备期间读取方仍固定在旧版本，方案存储写入新版本目录
+    assert pin_snapshot(config)["snapshot"]["version"] == first
+    plan_store_path = staged.config["plan_store"]["path"]
+    assert plan_store_path.startswith(str(staged.path))
+    with open(plan_store_path, "w") as f:
+        f.write("plans-v2")
+
+    assert commit_snapshot(config, staged) == staged.version
+    pinned = pin_snapshot(config)
+    assert pinned["snapshot"]["version"] == staged.version
+    assert pinned["plan_store"]["path"] == plan_store_path
+
+    # 当前版本已包含方案存储，输入不变时不再准备新版本
+    assert stage_snapshot(config, require_local=True) is None
+
+
+def test_unchanged_snapshot_without_plan_store_is_restaged(tmp_path):
+    config = _config(tmp_path)
+    publish_snapshot(config)
+
+    assert stage_snapshot(config) is None
+    assert stage_snapshot(config, require_local=True) is not None
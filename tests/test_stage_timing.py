@@ -0,0 +1,55 @@
+import asyncio
+
+from app.core.metrics import PLAN_STAGE_DURATION
+from app.core.timing import StageHistograms, stage, stage_histograms
+from app.middlewares.timing import StageTimingMiddleware
+
+
+def _stage_count(name):
+    for key, value in PLAN_STAGE_DURATION.dump()["values"]:
+        if key == [name]:
+            return sum(value[:-1])
+    return 0
+
+
+def test_stage_is_noop_without_timer():
+    with stage("fetch_user_profile") as span:
+        pass
+    assert span is stage("other")
+
+
+def test_middleware_emits_server_timing_and_histograms():
+    async def app(scope, receive, send):
+        with stage("fetch_user_profile"):
+            pass
+        with stage("build_score_prediction"):
+            await asyncio.sleep(0.01)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": "/api/v2/chat"}
+    before = stage_histograms.snapshot().get("build_score_prediction", {}).get("count", 0)
+    asyncio.run(StageTimingMiddleware(app)(scope, None, send))
+
+    headers = dict(messages[0]["headers"])
+    server_timing = headers[b"server-timing"].decode()
+    assert server_timing.startswith("fetch_user_profile;dur=")
+    assert "build_score_prediction;dur=" in server_timing
+    assert "total;dur=" in server_timing
+    assert stage_histograms.snapshot()["build_score_prediction"]["count"] == before + 1
+    assert _stage_count("build_score_prediction") == before + 1
+
+
+def test_histogram_buckets():
+    histograms = StageHistograms(buckets=(0.01, 0.1))
+    histograms.observe({"a": 0.005})
+    histograms.observe({"a": 0.05})
+    histograms.observe({"a": 5.0})
+    snapshot = histograms.snapshot()["a"]
+    assert snapshot["counts"] == [1, 1, 1]
+    assert snapshot["count"] == 3
@@ -0,0 +1,59 @@
+import os
+
+from app.core.sync_state import SyncManifest, compute_data_version
+
+
+def _touch(path, mtime_ns):
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_manifest_skips_only_unchanged_stages(tmp_path):
+    src = tmp_path / "tasks.csv"
+    out = tmp_path / "tasks.parquet"
+    src.write_text("a,b\n1,2\n")
+    out.write_text("parquet")
+
+    manifest = SyncManifest(tmp_path / "manifest.json")
+    manifest.record("csv:tasks", [src], {"engine": "pyarrow"}, [out])
+
+    reloaded = SyncManifest(tmp_path / "manifest.json")
+    assert reloaded.is_fresh("csv:tasks", [src], {"engine": "pyarrow"}, [out])
+    assert not reloaded.is_fresh("csv:tasks", [src], {"engine": "pandas"}, [out])
+
+    # 只改 mtime、内容不变：仍视为未变化
+    _touch(src, 1_000_000_000)
+    assert reloaded.is_fresh("csv:tasks", [src], {"engine": "pyarrow"}, [out])
+
+    src.write_text("a,b\n1,3\n")
+    assert not reloaded.is_fresh("csv:tasks", [src], {"engine": "pyarrow"}, [out])
+
+    reloaded.record("csv:tasks", [src], {"engine": "pyarrow"}, [out])
+    out.unlink()
+    assert not reloaded.is_fresh("csv:tasks", [src], {"engine": "pyarrow"}, [out])
+    assert not SyncManifest(tmp_path / "manifest.json", skip_unchanged=False).is_fresh(
+        "csv:tasks", [src], {"engine": "pyarrow"}, [out]
+    )
+
+
+def test_data_version_follows_content_hash_in_manifest(tmp_path):
+    users = tmp_path / "users.parquet"
+    repo = tmp_path / "repo.arrow"
+    users.write_text("users")
+    repo.write_text("repo")
+    config = {
+        "task": {"user_brain_score": str(users), "repository": str(repo)},
+        "sync_state": {"manifest": str(tmp_path / "manifest.json")},
+    }
+    manifest = SyncManifest.from_config(config)
+    manifest.record("users", [], {}, [users, repo])
+    version = compute_data_version(config)
+
+    # 重新生成相同内容的文件：记录后版本不变
+    users.write_text("users")
+    _touch(users, 2_000_000_000)
+    manifest.record("users", [], {}, [users, repo])
+    assert compute_data_version(config) == version
+
+    users.write_text("users v2")
+    manifest.record("users", [], {}, [users, repo])
+    assert compute_data_version(config) != version
@@ -0,0 +1,72 @@
+import asyncio
+
+from app.core.sync_state import publish_sync_version, read_sync_version
+from app.tasks import sync_manager
+from app.tasks.worker import acquire_worker_lock
+
+
+def test_worker_lock_allows_single_runner(tmp_path):
+    lock_path = tmp_path / "worker.lock"
+
+    first = acquire_worker_lock(lock_path)
+    assert first is not None
+    assert acquire_worker_lock(lock_path) is None
+
+    first.close()
+    second = acquire_worker_lock(lock_path)
+    assert second is not None
+    second.close()
+
+
+def test_version_watcher_reloads_after_publish(tmp_path, monkeypatch):
+    config = {
+        "task": {
+            "user_brain_score": str(tmp_path / "users.parquet"),
+            "repository": str(tmp_path / "repo.arrow"),
+        },
+        "sync_state": {"manifest": str(tmp_path / "manifest.json")},
+        "sync_tasks": {
+            "worker": {
+                "version_file": str(tmp_path / "sync_version.json"),
+                "poll_interval_seconds": 0.01,
+            }
+        },
+    }
+    reloads = []
+    monkeypatch.setattr(sync_manager, "reload_data_snapshot", reloads.append)
+
+    async def run():
+        watcher = sync_manager.start_sync_version_watcher(config)
+        await asyncio.sleep(0.05)
+        assert reloads == []
+
+        publish_sync_version(config)
+        for _ in range(100):
+            if reloads:
+                break
+            await asyncio.sleep(0.01)
+        watcher.cancel()
+
+    asyncio.run(run())
+
+    assert reloads == [config]
+    assert read_sync_version(config)["data_version"]
+
+
+def test_embedded_pipeline_skips_while_lock_is_held(tmp_path, monkeypatch):
+    config = {"sync_tasks": {"worker": {"lock_file": str(tmp_path / "sync.lock")}}}
+    runs = []
+
+    async def fake_pipeline(config, model_manager=None):
+        runs.append(config)
+
+    monkeypatch.setattr(sync_manager, "run_sync_pipeline", fake_pipeline)
+
+    # 模拟另一个 uvicorn worker 正在运行流水线
+    holder = acquire_worker_lock(tmp_path / "sync.lock")
+    asyncio.run(sync_manager._run_sync_pipeline_locked(config))
+    assert runs == []
+
+    holder.close()
+    asyncio.run(sync_manager._run_sync_pipeline_locked(config))
+    assert runs == [config]
@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+
+from app.schemas.common import Task
+from app.services.task_processor import (
+    _assemble_task_repository,
+    _build_level2_to_level1_mapping,
+    _load_task_repository_file,
+    _serialize_task_for_repository,
+    _write_task_repository_arrow,
+    _write_task_repository_json,
+)
+
+
+def _tasks():
+    return [
+        Task(
+            task_id="1",
+            task_name="舒尔特方格",
+            age_min=4,
+            age_max=12,
+            cognitive_domain="注意力",
+            sub_cognitive_domain="注意力_注意广度;感知觉_视觉搜索",
+            start_level=1,
+            training_time=5,
+        ),
+        Task(task_id="2", task_name="记忆翻牌", cognitive_domain="记忆力", sub_cognitive_domain="记忆力_工作记忆"),
+        Task(task_id="3", task_name="无坐标任务", cognitive_domain="执行功能"),
+        Task(task_id="2", task_name="重复ID", cognitive_domain="记忆力", sub_cognitive_domain="未知_未知"),
+    ]
+
+
+def test_arrow_artifact_loads_same_repository_as_json(tmp_path):
+    tasks = _tasks()
+    level2_to_level1_map = {"注意广度": "注意力", "工作记忆": "记忆力"}
+    repo = _assemble_task_repository(tasks, level2_to_level1_map)
+    serialized_tasks = [_serialize_task_for_repository(t) for t in tasks]
+
+    arrow_path = tmp_path / "task_repository.arrow"
+    json_path = tmp_path / "task_repository.json"
+    _write_task_repository_arrow(arrow_path, serialized_tasks, level2_to_level1_map)
+    _write_task_repository_json(json_path, repo, serialized_tasks)
+
+    from_arrow = _load_task_repository_file(arrow_path)
+    from_json = _load_task_repository_file(json_path)
+
+    assert [t.model_dump() for t in from_arrow["task_list"]] == [
+        t.model_dump() for t in from_json["task_list"]
+    ]
+    assert from_arrow["task_index"].keys() == from_json["task_index"].keys()
+    assert from_arrow["task_index"]["2"].task_name == "重复ID"
+    assert {k: [t.task_id for t in v] for k, v in from_arrow["level1_grouped_tasks"].items()} == {
+        k: [t.task_id for t in v] for k, v in from_json["level1_grouped_tasks"].items()
+    }
+    assert from_arrow["level2_to_level1_map"] == level2_to_level1_map
+
+    target_matrix = np.random.default_rng(0).random((4, 19))
+    np.testing.assert_array_equal(
+        from_arrow["task_coord_index"].score(target_matrix),
+        from_json["task_coord_index"].score(target_matrix),
+    )
+
+
+def test_level2_mapping_keeps_first_level1_per_level2():
+    task_frame = pd.DataFrame(
+        {
+            "task_id": ["1", "2", "3", "4"],
+            "sub_cognitive_domain": [
+                "注意力_注意广度; 感知觉_视觉搜索",
+                "感知觉_注意广度",
+                None,
+                "无下划线;_空一级; 记忆力 _ 工作记忆 ",
+            ],
+        }
+    )
+
+    assert _build_level2_to_level1_mapping(task_frame) == {
+        "注意广度": "注意力",
+        "视觉搜索": "感知觉",
+        "工作记忆": "记忆力",
+    }
+
+
+def _counting_loader(monkeypatch):
+    from app.services import task_processor
+
+    loads = []
+    original = task_processor._load_task_repository_file
+
+    def load(repo_path):
+        loads.append(repo_path)
+        return original(repo_path)
+
+    monkeypatch.setattr(task_processor, "_load_task_repository_file", load)
+    monkeypatch.setattr(task_processor, "_repository_cache", {})
+    return loads
+
+
+def test_get_task_repository_caches_by_file_version(tmp_path, monkeypatch):
+    from app.services.task_processor import get_task_repository
+
+    loads = _counting_loader(monkeypatch)
+    repo_path = tmp_path / "task_repository.arrow"
+    _write_task_repository_arrow(repo_path, [_serialize_task_for_repository(t) for t in _tasks()], {})
+    config = {"task": {"repository": str(repo_path)}}
+
+    first = get_task_repository(config)
+    second = get_task_repository(config)
+
+    # 文件未变化：不重新解析，返回同一个 repo 与同一批 Task 实例
+    assert len(loads) == 1
+    assert second is first
+    assert all(a is b for a, b in zip(first["task_list"], second["task_list"]))
+    assert second["task_index"]["1"] is first["task_index"]["1"]
+
+
+def test_get_task_repository_reloads_rewritten_file(tmp_path, monkeypatch):
+    from app.services.task_processor import get_task_repository
+
+    loads = _counting_loader(monkeypatch)
+    repo_path = tmp_path / "task_repository.arrow"
+    tasks = [_serialize_task_for_repository(t) for t in _tasks()]
+    _write_task_repository_arrow(repo_path, tasks, {})
+    config = {"task": {"repository": str(repo_path)}}
+
+    first = get_task_repository(config)
+    _write_task_repository_arrow(repo_path, tasks[:2], {})
+    reloaded = get_task_repository(config)
+
+    assert len(loads) == 2
+    assert reloaded is not first
+    assert len(reloaded["task_list"]) == 2
+    assert get_task_repository(config) is reloaded
+    assert len(loads) == 2
@@ -0,0 +1,109 @@
+import random
+
+import numpy as np
+
+from app.core.cognitive_l1.constants import L1_INDEX, L2_INDEX
+from app.schemas.common import Task
+from app.services.plan_rule_engine import (
+    _is_task_age_compatible,
+    build_expected_l2_distribution,
+    build_l2_distribution_from_tasks,
+    sample_tasks,
+    score_task,
+    score_tasks,
+)
+from app.services.task_processor import AgeCompatibilityIndex, TaskCoordIndex
+from utils.text_utils import parse_age_value
+
+
+def _build_tasks(n: int = 60):
+    rng = random.Random(0)
+    l1_names = list(L1_INDEX)
+    l2_names = list(L2_INDEX)
+
+    tasks = []
+    for i in range(n):
+        if i % 7 == 0:
+            sub_domain = None
+        else:
+            sub_domain = f"{rng.choice(l1_names)}_{rng.choice(l2_names)}"
+        tasks.append(
+            Task(task_id=str(i), task_name=f"task_{i}", sub_cognitive_domain=sub_domain)
+        )
+    return tasks
+
+
+def test_score_tasks_matches_score_task():
+    tasks = _build_tasks()
+    target_matrix = np.random.default_rng(1).random((len(L1_INDEX), len(L2_INDEX)))
+
+    expected = [score_task(task, target_matrix) for task in tasks]
+
+    assert score_tasks(tasks, target_matrix).tolist() == expected
+
+
+def test_legacy_sampler_matches_random_choices():
+    tasks = _build_tasks()
+    target_matrix = np.random.default_rng(2).random((len(L1_INDEX), len(L2_INDEX)))
+    weights = [max(score_task(task, target_matrix), 1e-6) for task in tasks]
+
+    expected = random.Random(42).choices(tasks, weights=weights, k=420)
+    picked = sample_tasks(
+        tasks,
+        np.maximum(score_tasks(tasks, target_matrix), 1e-6),
+        420,
+        sampler="legacy",
+        seed=42,
+    )
+
+    assert [t.task_id for t in picked] == [t.task_id for t in expected]
+
+
+def test_numpy_sampler_is_reproducible_and_skips_zero_weights():
+    tasks = _build_tasks(10)
+    weights = np.array([0.0, 1.0] * 5)
+
+    first = sample_tasks(tasks, weights, 200, seed=7)
+    second = sample_tasks(tasks, weights, 200, seed=7)
+
+    assert [t.task_id for t in first] == [t.task_id for t in second]
+    assert all(int(t.task_id) % 2 == 1 for t in first)
+
+
+def test_age_index_matches_per_task_check():
+    rng = random.Random(3)
+    bounds = [None, float("nan"), 3, 4.5, 6, 8, 12, 18]
+    tasks = [
+        Task(
+            task_id=str(i),
+            task_name=f"task_{i}",
+            age_min=rng.choice(bounds),
+            age_max=rng.choice(bounds),
+        )
+        for i in range(80)
+    ]
+    index = AgeCompatibilityIndex.from_tasks(tasks)
+
+    for age in [None, "", "未知", 2, 3, "3岁", 4, 4.5, 5.2, "6岁", 7, 8, 10, 12, 12.5, 18, 30]:
+        expected = [i for i, task in enumerate(tasks) if _is_task_age_compatible(task, age)]
+        positions, compatible = index.lookup(parse_age_value(age))
+
+        assert positions.tolist() == expected
+        assert [t.task_id for t in compatible] == [str(i) for i in expected]
+
+
+def test_expected_l2_distribution_matches_large_sample():
+    tasks = _build_tasks(200)
+    weights = np.maximum(
+        score_tasks(tasks, np.random.default_rng(4).random((len(L1_INDEX), len(L2_INDEX)))),
+        1e-6,
+    )
+    weights[::5] = 0.0
+
+    expected = build_expected_l2_distribution(weights, TaskCoordIndex.from_tasks(tasks), k=420)
+    sampled = build_l2_distribution_from_tasks(sample_tasks(tasks, weights, 200_000, seed=5))
+
+    assert abs(sum(item["ratio"] for item in expected) - 1) < 0.01
+    sampled_ratio = {item["l2_index"]: item["ratio"] for item in sampled}
+    for item in expected:
+        assert abs(item["ratio"] - sampled_ratio.get(item["l2_index"], 0.0)) < 0.01
@@ -0,0 +1,133 @@
+import json
+import os
+import threading
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from app.core.cognitive_l1.constants import UserTrainingColumnName
+from app.core.errors.error_codes import ErrorCode
+from app.core.errors.exceptions import BizError
+from app.repositories.user_repo import UserProfileStore
+from utils.dataframe_utils import ColumnAccessor
+
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def _build_store() -> UserProfileStore:
+    with open(
+        ROOT / "app/core/cognitive_l1/alg_cogtrain_brainscore_task_child_column_mapping.json",
+        encoding="utf-8",
+    ) as f:
+        mapping = json.load(f)
+
+    cols = ColumnAccessor(mapping, UserTrainingColumnName)
+    df = pd.DataFrame(
+        {
+            cols.user_id: ["u1", "u2", "u1", None],
+            cols.patient_code: ["p1", "p2", "p9", "p4"],
+            cols.age: ["7岁", "8岁", "9岁", "10岁"],
+        }
+    )
+    return UserProfileStore(df=df, cols=cols)
+
+
+def test_lookup_keeps_first_row_and_counts_hits():
+    store = _build_store()
+
+    assert store.size == 4
+    assert store.find_user_row("u1", None)["age"] == "7岁"
+    assert store.find_user_row(None, "p4")["age"] == "10岁"
+    assert store.find_user_row("u2", "p2")["age"] == "8岁"
+
+    stats = store.stats()
+    assert stats["hits"] == 4
+    assert stats["misses"] == 0
+
+
+def test_lookup_keeps_biz_error_semantics():
+    store = _build_store()
+
+    with pytest.raises(BizError) as exc_info:
+        store.find_user_row("u1", "p2")
+    assert exc_info.value.code == ErrorCode.USER_ID_PATIENT_CODE_MISMATCH
+
+    with pytest.raises(BizError) as exc_info:
+        store.find_user_row("u1", "missing")
+    assert exc_info.value.code == ErrorCode.USER_ID_PATIENT_CODE_MISMATCH
+
+    with pytest.raises(BizError) as exc_info:
+        store.find_user_row("missing", None)
+    assert exc_info.value.code == ErrorCode.USER_NOT_FOUND
+
+
+def test_store_for_new_path_is_built_outside_lock(monkeypatch):
+    from app.repositories import user_repo
+
+    monkeypatch.setattr(user_repo, "_stores", {})
+    monkeypatch.setattr(user_repo, "_building", {})
+
+    old_store = _build_store()
+    old_store.source_path = "v1.parquet"
+    user_repo._install_store(old_store)
+
+    started = threading.Event()
+    release = threading.Event()
+    new_store = _build_store()
+    new_store.source_path = "v2.parquet"
+
+    def slow_build(config):
+        started.set()
+        release.wait(5)
+        return new_store
+
+    monkeypatch.setattr(UserProfileStore, "from_config", staticmethod(slow_build))
+    config = {"task": {"user_brain_score": "v2.parquet"}}
+
+    builder = threading.Thread(target=user_repo.get_user_profile_store, args=(config,))
+    builder.start()
+    assert started.wait(5)
+
+    # 构建期间其它请求不阻塞，继续使用旧 store
+    assert user_repo.get_user_profile_store(config) is old_store
+
+    release.set()
+    builder.join(5)
+    assert user_repo.get_user_profile_store(config) is new_store
+    assert user_repo.get_user_profile_store({"task": {"user_brain_score": "v1.parquet"}}) is old_store
+
+
+def test_store_reloads_when_source_file_is_rewritten(tmp_path, monkeypatch):
+    from app.core.cognitive_l1.constants import CognitiveL1DatasetName
+    from app.repositories import user_repo
+
+    monkeypatch.setattr(user_repo, "_stores", {})
+    monkeypatch.setattr(user_repo, "_building", {})
+
+    df = _build_store()._df
+    users = tmp_path / "users.parquet"
+    df.to_parquet(users)
+    config = {
+        "task": {"user_brain_score": str(users)},
+        "column_mapping": {
+            CognitiveL1DatasetName.USER_BRAIN_SCORE.value: str(
+                ROOT / "app/core/cognitive_l1/alg_cogtrain_brainscore_task_child_column_mapping.json"
+            )
+        },
+    }
+
+    first = user_repo.get_user_profile_store(config)
+    assert user_repo.get_user_profile_store(config) is first
+    assert first.size == 4
+
+    # 其它进程（持有同步锁的 worker）原子替换了同一路径的文件
+    tmp_file = tmp_path / ".users.parquet.tmp"
+    df.iloc[:2].to_parquet(tmp_file)
+    os.replace(tmp_file, users)
+
+    second = user_repo.get_user_profile_store(config)
+    assert second is not first
+    assert second.size == 2
+    assert user_repo.get_user_profile_store(config) is second
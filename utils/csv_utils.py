@@ -2,18 +2,51 @@
 utils/csv_utils.py
 
 CSV 文件相关工具：
-- CSV 转 Parquet
+- CSV 转 Parquet（pandas / pyarrow 流式两种引擎）
 """
 
+import csv
+import os
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List
+
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
 
 from utils.logger import get_logger
 
 
 logger = get_logger(__name__)
 
+# 与 pandas.read_csv 默认缺失值保持一致，另外把 \N 也视为缺失
+CSV_NULL_VALUES = [
+    "",
+    "#N/A",
+    "#N/A N/A",
+    "#NA",
+    "-1.#IND",
+    "-1.#QNAN",
+    "-NaN",
+    "-nan",
+    "1.#IND",
+    "1.#QNAN",
+    "<NA>",
+    "N/A",
+    "NA",
+    "NULL",
+    "NaN",
+    "None",
+    "n/a",
+    "nan",
+    "null",
+    "\\N",
+]
+DEFAULT_ARROW_BLOCK_SIZE_MB = 16
+# pyarrow 解析失败回退 pandas 时的分块行数（不一次性读入整个文件）
+DEFAULT_FALLBACK_CHUNKSIZE = 100_000
+
 
 def csv_to_parquet(
     csv_path: str,
@@ -22,9 +55,17 @@ def csv_to_parquet(
     sep: str = ",",
     chunksize: int | None = None,
     config: Dict[str, Any] = None,
+    numeric_columns: List[str] | None = None,
 ) -> str:
     """
     将 CSV 文件转换为 Parquet 文件，并在转换后检查行数一致性
+
+    engine（config.csv_to_parquet.engine）：
+    - pandas：全部按字符串读取
+    - pyarrow：open_csv + ParquetWriter 按块流式写出，内存受 block_size 限制；
+      numeric_columns 写为 float64，其余列为 string；类型转换失败时回退到 pandas 分块写出，
+      此时数值列降级为 string（记录 [CSV_ARROW_FALLBACK] 错误日志）；
+      config.csv_to_parquet.fallback_on_type_error 为 false 时直接抛出异常
     """
     csv_path = Path(csv_path)
 
@@ -43,65 +84,211 @@ def csv_to_parquet(
     # =========================
     columns = None
     max_rows = None
+    engine = "pandas"
+    block_size_mb = DEFAULT_ARROW_BLOCK_SIZE_MB
+    fallback_on_type_error = True
     csv_name = csv_path.stem
     if config is not None:
         columns = config.get("columns", {}).get(csv_name)
         max_rows = config.get("debug", {}).get("dataset_row_limits", {}).get(csv_name)
-
-    read_csv_kwargs = dict(
-        encoding=encoding,
-        sep=sep,
-        dtype=str,
-    )
+        task_config = config.get("csv_to_parquet", {})
+        engine = task_config.get("engine", engine)
+        block_size_mb = task_config.get("block_size_mb", block_size_mb)
+        fallback_on_type_error = task_config.get("fallback_on_type_error", True)
 
     if max_rows is not None:
         logger.info(f"Applying debug row limit for {csv_name}: {max_rows}")
 
-    if columns:
-        read_csv_kwargs["header"] = None
-        read_csv_kwargs["names"] = columns
+    total_csv_rows = None
 
-    total_csv_rows = 0  # 用于统计 CSV 行数
+    if engine == "pyarrow":
+        try:
+            total_csv_rows = _csv_to_parquet_arrow(
+                csv_path,
+                parquet_path,
+                encoding=encoding,
+                sep=sep,
+                columns=columns,
+                numeric_columns=numeric_columns or [],
+                max_rows=max_rows,
+                block_size=int(block_size_mb * 1024 * 1024),
+            )
+        except pa.ArrowInvalid as e:
+            if not fallback_on_type_error:
+                raise
+            logger.error(
+                f"[CSV_ARROW_FALLBACK] {csv_path} 按类型解析失败，回退 pandas 分块写出，"
+                f"数值列降级为 string: {sorted(numeric_columns or [])} error={e}"
+            )
+            # 回退时同样分块写出，避免整个文件读入内存
+            chunksize = chunksize or DEFAULT_FALLBACK_CHUNKSIZE
 
-    # =========================
-    # 小文件直接读取
-    # =========================
-    if chunksize is None:
-        df = pd.read_csv(csv_path, nrows=max_rows, **read_csv_kwargs)
-        df.to_parquet(parquet_path, index=False)
-        total_csv_rows = len(df)
+    if total_csv_rows is None:
+        total_csv_rows = _csv_to_parquet_pandas(
+            csv_path,
+            parquet_path,
+            encoding=encoding,
+            sep=sep,
+            columns=columns,
+            max_rows=max_rows,
+            chunksize=chunksize,
+        )
 
     # =========================
-    # 大文件分块读取
+    # 检查 Parquet 行数（只读 footer 元数据）
     # =========================
+    total_parquet_rows = pq.ParquetFile(parquet_path).metadata.num_rows
+
+    if total_csv_rows != total_parquet_rows:
+        logger.warning(
+            f"[CSV->Parquet] 行数不一致: CSV={total_csv_rows}, Parquet={total_parquet_rows}"
+        )
+
+    return str(parquet_path)
+
+
+def _csv_to_parquet_arrow(
+    csv_path: Path,
+    parquet_path: Path,
+    *,
+    encoding: str,
+    sep: str,
+    columns: List[str] | None,
+    numeric_columns: List[str],
+    max_rows: int | None,
+    block_size: int,
+) -> int:
+    """
+    pyarrow 流式转换：逐个 RecordBatch 读取并写入，返回写出的行数
+
+    先写临时文件，完成后再替换目标文件，失败时不会留下半个 parquet
+    """
+
+    if columns:
+        # config 指定了列名时 CSV 没有表头
+        column_names = list(columns)
     else:
-        writer_initialized = False
-        for chunk in pd.read_csv(csv_path, chunksize=chunksize, **read_csv_kwargs):
+        # utf-8-sig 去掉 BOM，与 pyarrow 解析出的表头一致
+        header_encoding = "utf-8-sig" if encoding.lower() in ("utf-8", "utf8") else encoding
+        with open(csv_path, encoding=header_encoding, newline="") as f:
+            column_names = next(csv.reader(f, delimiter=sep), [])
+
+    numeric_columns = set(numeric_columns)
+    read_options = pa_csv.ReadOptions(
+        encoding=encoding,
+        block_size=block_size,
+        column_names=columns or None,
+    )
+    parse_options = pa_csv.ParseOptions(delimiter=sep, newlines_in_values=True)
+    convert_options = pa_csv.ConvertOptions(
+        # 非数值列显式按字符串读取，避免类型推断改写原值（如前导 0）
+        column_types={
+            column: pa.float64() if column in numeric_columns else pa.string()
+            for column in column_names
+        },
+        null_values=CSV_NULL_VALUES,
+        strings_can_be_null=True,
+    )
+
+    tmp_path = parquet_path.with_name(f".{parquet_path.name}.{os.getpid()}.tmp")
+    total_rows = 0
+    writer = None
+
+    try:
+        reader = pa_csv.open_csv(
+            csv_path,
+            read_options=read_options,
+            parse_options=parse_options,
+            convert_options=convert_options,
+        )
+        writer = pq.ParquetWriter(tmp_path, reader.schema)
+
+        for batch in reader:
             if max_rows is not None:
-                remaining_rows = max_rows - total_csv_rows
+                remaining_rows = max_rows - total_rows
                 if remaining_rows <= 0:
                     break
-                chunk = chunk.iloc[:remaining_rows]
+                batch = batch.slice(0, remaining_rows)
 
-            total_csv_rows += len(chunk)
-            if not writer_initialized:
-                chunk.to_parquet(parquet_path, index=False)
-                writer_initialized = True
-            else:
-                chunk.to_parquet(parquet_path, index=False, append=True)
+            writer.write_batch(batch)
+            total_rows += batch.num_rows
 
-            if max_rows is not None and total_csv_rows >= max_rows:
-                break
+        writer.close()
+        writer = None
+        os.replace(tmp_path, parquet_path)
+    finally:
+        if writer is not None:
+            writer.close()
+        if tmp_path.exists():
+            tmp_path.unlink()
 
-    # =========================
-    # 检查 Parquet 行数
-    # =========================
-    df_parquet = pd.read_parquet(parquet_path)
-    total_parquet_rows = len(df_parquet)
+    return total_rows
 
-    if total_csv_rows != total_parquet_rows:
-        logger.warning(
-            f"[CSV->Parquet] 行数不一致: CSV={total_csv_rows}, Parquet={total_parquet_rows}"
-        )
 
-    return str(parquet_path)
+def _csv_to_parquet_pandas(
+    csv_path: Path,
+    parquet_path: Path,
+    *,
+    encoding: str,
+    sep: str,
+    columns: List[str] | None,
+    max_rows: int | None,
+    chunksize: int | None,
+) -> int:
+    read_csv_kwargs = dict(
+        encoding=encoding,
+        sep=sep,
+        dtype=str,
+    )
+
+    if columns:
+        read_csv_kwargs["header"] = None
+        read_csv_kwargs["names"] = columns
+
+    tmp_path = parquet_path.with_name(f".{parquet_path.name}.{os.getpid()}.tmp")
+
+    try:
+        # =========================
+        # 小文件直接读取
+        # =========================
+        if chunksize is None:
+            df = pd.read_csv(csv_path, nrows=max_rows, **read_csv_kwargs)
+            df.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, parquet_path)
+            return len(df)
+
+        # =========================
+        # 大文件分块读取（ParquetWriter 逐块追加 row group）
+        # =========================
+        total_csv_rows = 0
+        writer = None
+        try:
+            for chunk in pd.read_csv(csv_path, chunksize=chunksize, **read_csv_kwargs):
+                if max_rows is not None:
+                    remaining_rows = max_rows - total_csv_rows
+                    if remaining_rows <= 0:
+                        break
+                    chunk = chunk.iloc[:remaining_rows]
+
+                if writer is None:
+                    table = pa.Table.from_pandas(chunk, preserve_index=False)
+                    # 首块整列为空时推断为 null 类型，统一按字符串写出
+                    schema = pa.schema(
+                        [pa.field(field.name, pa.string()) for field in table.schema],
+                        metadata=table.schema.metadata,
+                    )
+                    writer = pq.ParquetWriter(tmp_path, schema)
+                table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+                writer.write_table(table)
+
+                total_csv_rows += len(chunk)
+                if max_rows is not None and total_csv_rows >= max_rows:
+                    break
+        finally:
+            if writer is not None:
+                writer.close()
+
+        os.replace(tmp_path, parquet_path)
+        return total_csv_rows
+    finally:
+        tmp_path.unlink(missing_ok=True)
@@ -2,6 +2,7 @@ import re
 
 # 预编译正则（性能更好）
 _INVISIBLE_PATTERN = re.compile(r"[\u200b\u200c\u200d\ufeff]")
+_NUMBER_PATTERN = re.compile(r"\d+(?:\.\d+)?")
 
 
 def clean_text(text):
@@ -66,3 +67,26 @@ def deep_clean(obj):
     # 其他类型（int / float / bool / None 等）原样返回
     else:
         return obj
+
+
+def parse_age_value(age):
+    """
+    解析年龄为数值，如 "7岁" -> 7.0、8 -> 8.0
+
+    无法解析（None、空串、无数字）时返回 None
+    """
+    if age is None:
+        return None
+
+    if isinstance(age, (int, float)):
+        return float(age)
+
+    age_str = str(age).strip()
+    if not age_str:
+        return None
+
+    match = _NUMBER_PATTERN.search(age_str)
+    if not match:
+        return None
+
+    return float(match.group())